@@ -47,13 +47,12 @@ def generate_exam(bank, num_questions, professor_name= "Professor"):
     # Using random.sample() to select questions without replacement
     selected = random.sample(bank, num_questions)
 
-    exam_content = f"EXAM - Created by Professor {professor_name}\n"
-    exam_content += "="* 60 + "\n\n"
+    parts = [f"EXAM - Created by Professor {professor_name}\n", "="* 60 + "\n\n"]
     for i, pair in enumerate(selected, 1):
-        exam_content += f"Question {i}: {pair['question']}\n"
-        exam_content += f"Answer: {pair['answer']}\n\n"
+        parts.append(f"Question {i}: {pair['question']}\n")
+        parts.append(f"Answer: {pair['answer']}\n\n")
 
-    return exam_content
+    return "".join(parts)
 if __name__ == "__main__":
     bank = load_question_bank()
 
@@ -177,15 +177,13 @@ class ProfessorAssistant:
             # Core V1.0 randomization logic integrated
             selected = random.sample(self.question_bank, num_questions)
 
-            exam_content = f"EXAM - Created by Professor {self.professor_name}\n"
-            exam_content += "=" * 60 + "\n\n"
-            for i, pair in enumerate(selected, 1):
-                exam_content += f"Question {i}: {pair['question']}\n"
-                exam_content += f"Answer: ______________________\n\n"  # Student copy (no answer)
-
-            # Save to file
+            # Save to file, one question at a time
             with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(exam_content)
+                f.write(f"EXAM - Created by Professor {self.professor_name}\n")
+                f.write("=" * 60 + "\n\n")
+                for i, pair in enumerate(selected, 1):
+                    f.write(f"Question {i}: {pair['question']}\n")
+                    f.write(f"Answer: ______________________\n\n")  # Student copy (no answer)
 
             self.show_success_screen(output_file)
 
@@ -1,7 +1,18 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog
-import random
+from tkinter import messagebox, filedialog, ttk
 import os
+import sqlite3
+
+import instrumentation
+from background_tasks import BackgroundWorker, throughput_text
+from bank_editor import BankEditor
+from bank_parser import BANK_FORMATS
+from bank_registry import DEFAULT_MAX_BYTES, BankRegistry
+from exam_generator import QUESTION_DELIMITER, ExamGenerator
+from exam_render import KEY_FORMATS, companion_paths, format_for_path, replace_output, save_manifest
+from instrumentation import span
+from search_index import truncation_note
+from usage_history import DEFAULT_HISTORY_PATH, UsageHistory
 
 
 # --- 1. Configuration Class (For Constants) ---
@@ -15,66 +26,16 @@ class CONFIG:
     FONT_TITLE = ("Arial", 24, "bold")
     FONT_HEADER = ("Arial", 18, "bold")
     FONT_BODY = ("Arial", 12)
-    QUESTION_DELIMITER = "---"  # Robust separator for questions
-
-
-# --- 2. Exam Generator Class (Decoupled Logic) ---
-class ExamGenerator:
-    """Handles all data loading, parsing, and random selection logic."""
-
-    def __init__(self, delimiter=CONFIG.QUESTION_DELIMITER):
-        self.question_bank = []
-        self.delimiter = delimiter
-
-    def load_bank_robust(self, file_path):
-        """
-        Loads questions using a specific delimiter, making the parser
-        more robust than the V2.0 alternating line method.
-        """
-        self.question_bank = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-
-            # Split content by the robust delimiter "---"
-            raw_pairs = content.split(self.delimiter)
-
-            for pair in raw_pairs:
-                # Get non-empty lines, strip whitespace
-                parts = [line.strip() for line in pair.split('\n') if line.strip()]
-
-                if len(parts) >= 2:
-                    # Assume first non-empty line is question, second is answer
-                    self.question_bank.append({
-                        'question': parts[0],
-                        'answer': parts[1]
-                    })
-
-        except FileNotFoundError:
-            raise FileNotFoundError(f"File not found: {file_path}")
-        except Exception as e:
-            raise Exception(f"Failed to read file due to format error: {e}")
-
-        return len(self.question_bank)
-
-    def generate_content(self, num_questions, professor_name):
-        """Generates exam content based on V1.0 logic."""
-        if num_questions > len(self.question_bank):
-            raise ValueError("Requested questions exceed bank size.")
-
-        selected = random.sample(self.question_bank, num_questions)
-
-        exam_content = f"EXAM (STUDENT COPY) - Created by Professor {professor_name}\n"
-        exam_content += "=" * 60 + "\n\n"
-
-        for i, pair in enumerate(selected, 1):
-            exam_content += f"Question {i}: {pair['question']}\n"
-            exam_content += f"Answer: ______________________\n\n"
+    QUESTION_DELIMITER = QUESTION_DELIMITER  # Robust separator for questions
+    POLL_MS = 16  # Background task polling interval (~60 fps)
+    BANKS_DIR = os.environ.get("PROFESSOR_ASSISTANT_BANKS", "banks")  # One bank file per course
+    BANK_MEMORY_BYTES = DEFAULT_MAX_BYTES  # Loaded courses kept resident up to this size
+    HISTORY_PATH = os.environ.get("PROFESSOR_ASSISTANT_HISTORY", DEFAULT_HISTORY_PATH)
+    BROWSER_ROWS = 10  # Rows drawn by the bank browser; only these are ever read from the bank
+    BROWSER_ROW_CHARS = 90
 
-        return exam_content
 
-
-# --- 3. Main Application Class (Handles State and Frame Switching) ---
+# --- 2. Main Application Class (Handles State and Frame Switching) ---
 class ProfessorAssistant(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -85,7 +46,16 @@ class ProfessorAssistant(tk.Tk):
         # State and Logic (Decoupled)
         self.professor_name = ""
         self.file_name = ""
-        self.generator = ExamGenerator()  # Instantiate the logic handler
+        self.generator = ExamGenerator(dedup="report")  # Instantiate the logic handler
+        # Every course bank, loaded on first use; switching to a resident one is instant.
+        # Duplicates are only reported on load; removing them is up to the user
+        self.registry = BankRegistry(CONFIG.BANK_MEMORY_BYTES, dedup="report")
+        if os.path.isdir(CONFIG.BANKS_DIR):
+            self.registry.scan(CONFIG.BANKS_DIR)
+        # Runs slow generator calls off the event loop. A single thread, so tasks run one
+        # at a time in submission order and never share the generator mid-call
+        self.worker = BackgroundWorker(max_workers=1)
+        self.history = None  # UsageHistory, opened for the first exam that asks for it
 
         # Container Frame: All screens will be placed here
         container = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
@@ -93,28 +63,115 @@ class ProfessorAssistant(tk.Tk):
         container.grid_rowconfigure(0, weight=1)
         container.grid_columnconfigure(0, weight=1)
 
+        self.container = container
         self.frames = {}
-
-        # Create all screens as Frame objects
-        for F in (WelcomeFrame, AskCreateFrame, UploadFrame, DetailsFrame, SuccessFrame):
-            frame_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[frame_name] = frame
-            # Place all frames in the same grid spot (0,0)
-            frame.grid(row=0, column=0, sticky="nsew")
+        # Screens are created the first time they are shown, so startup only builds the first one
+        self.frame_classes = {F.__name__: F for F in (WelcomeFrame, AskCreateFrame, UploadFrame,
+                                                      CourseFrame, DetailsFrame, SuccessFrame,
+                                                      SearchFrame, BankFrame)}
 
         self.show_frame("WelcomeFrame")
 
     def show_frame(self, frame_name):
         """Frame-per-Screen Logic: Raises the desired frame to the top."""
-        frame = self.frames[frame_name]
+        frame = self.frames.get(frame_name)
+        if frame is None:
+            frame = self.frame_classes[frame_name](parent=self.container, controller=self)
+            self.frames[frame_name] = frame
+            # Place all frames in the same grid spot (0,0)
+            frame.grid(row=0, column=0, sticky="nsew")
         frame.tkraise()
 
+    def run_task(self, func, *args, on_done, on_error, on_cancel=None, on_progress=None, name=None):
+        """
+        Queues func(task, *args) on the background worker and polls its result
+        queue with after(), so the window keeps repainting. Callbacks run on
+        the Tk thread. Returns the TaskHandle (use it to cancel).
+        """
+        task = self.worker.submit(func, *args)
+
+        def poll():
+            progress, final = task.poll()
+            if progress is not None and on_progress is not None:
+                on_progress(task, *progress)
+
+            if final is None:
+                self.after(CONFIG.POLL_MS, poll)
+                return
+
+            # Submit-to-result time as the user saw it, polling delay included
+            instrumentation.complete(f"task.{name or func.__name__}", task.started, outcome=final[0])
+            if final[0] == 'done':
+                on_done(final[1])
+            elif final[0] == 'error':
+                on_error(final[1])
+            elif on_cancel is not None:
+                on_cancel()
+
+        self.after(CONFIG.POLL_MS, poll)
+        return task
+
+    def usage_history(self):
+        """
+        The usage history that steers exams away from recently used
+        questions, opened on first use. None if it cannot be opened
+        (e.g. a read-only or corrupt database); exams then sample plainly.
+        """
+        if self.history is None:
+            try:
+                self.history = UsageHistory(CONFIG.HISTORY_PATH)
+            except (OSError, sqlite3.Error):
+                return None
+        return self.history
+
     def quit_program(self):
+        self.worker.shutdown()
         self.destroy()
 
 
-# --- 4. Specialized Frame Classes (The Views) ---
+# --- 3. Specialized Frame Classes (The Views) ---
+
+class ProgressPanel(tk.Frame):
+    """Progress bar, record count/throughput line and Cancel button for a background task."""
+
+    def __init__(self, parent, unit="questions"):
+        super().__init__(parent, bg=CONFIG.BG_PRIMARY)
+        self.unit = unit
+        self.task = None
+
+        self.bar = ttk.Progressbar(self, length=400, mode="indeterminate")
+        self.bar.pack(pady=5)
+
+        self.status = tk.Label(self, text="", font=CONFIG.FONT_BODY,
+                               bg=CONFIG.BG_PRIMARY, fg=CONFIG.FG_TEXT)
+        self.status.pack(pady=5)
+
+        tk.Button(self, text="Cancel", font=CONFIG.FONT_BODY, bg="#f44336", fg="white",
+                  padx=20, command=self.cancel).pack(pady=5)
+
+    def start(self, task):
+        self.task = task
+        self.bar.configure(mode="indeterminate", value=0)
+        self.bar.start(CONFIG.POLL_MS)
+        self.status.configure(text="Working...")
+        self.pack(pady=10)
+
+    def update_progress(self, task, done, total=None):
+        if total:
+            self.bar.stop()
+            self.bar.configure(mode="determinate", maximum=total, value=done)
+        self.status.configure(text=throughput_text(done, task.elapsed(), self.unit))
+
+    def finish(self):
+        self.task = None
+        self.bar.stop()
+        self.pack_forget()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status.configure(text="Cancelling...")
+
 
 class WelcomeFrame(tk.Frame):
     """Screen 1: Welcome and Name Input"""
@@ -176,6 +233,12 @@ class AskCreateFrame(tk.Frame):
                   padx=40, pady=10, command=lambda: self.controller.show_frame("UploadFrame")).pack(side=tk.LEFT,
                                                                                                     padx=10)
 
+        if len(self.controller.registry):
+            tk.Button(button_frame, text="Choose Course",
+                      font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY, fg="white",
+                      padx=20, pady=10, command=lambda: self.controller.show_frame("CourseFrame")).pack(side=tk.LEFT,
+                                                                                                        padx=10)
+
         tk.Button(button_frame, text="Exit",
                   font=CONFIG.FONT_BODY, bg="#f44336", fg="white",
                   padx=40, pady=10, command=self.controller.quit_program).pack(side=tk.LEFT, padx=10)
@@ -189,14 +252,19 @@ class UploadFrame(tk.Frame):
         self.controller = controller
 
         # Button to trigger file dialog
-        tk.Button(self, text="Select Question Bank (.txt)",
-                  font=CONFIG.FONT_HEADER, bg=CONFIG.BTN_PRIMARY, fg="white",
-                  padx=40, pady=20, command=self.load_question_bank).pack(pady=50)
+        self.select_btn = tk.Button(self, text="Select Question Bank (.txt)",
+                                    font=CONFIG.FONT_HEADER, bg=CONFIG.BTN_PRIMARY, fg="white",
+                                    padx=40, pady=20, command=self.load_question_bank)
+        self.select_btn.pack(pady=50)
+
+        # Shown only while a bank is loading in the background
+        self.progress = ProgressPanel(self, unit="questions loaded")
 
     def load_question_bank(self):
         file_path = filedialog.askopenfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Question banks", "*.txt *.csv *.tsv *.jsonl"), ("Compiled banks", "*.qbank"),
+                       ("All files", "*.*")],
             title="Select Question Bank File"
         )
 
@@ -205,23 +273,168 @@ class UploadFrame(tk.Frame):
             self.controller.show_frame("AskCreateFrame")
             return
 
-        try:
-            # Use the decoupled generator logic
-            num_loaded = self.controller.generator.load_bank_robust(file_path)
-
-            if num_loaded > 0:
-                self.controller.file_name = os.path.basename(file_path)
-                messagebox.showinfo("Success",
-                                    f"Loaded {num_loaded} questions from the bank! (Using DELIMITER: {CONFIG.QUESTION_DELIMITER})")
-                self.controller.show_frame("DetailsFrame")
-            else:
-                messagebox.showerror("Error",
-                                     f"Loaded 0 questions. Check file format, ensure Q/A pairs are separated by '{CONFIG.QUESTION_DELIMITER}'.")
-                self.controller.show_frame("AskCreateFrame")
-
-        except Exception as e:
-            messagebox.showerror("File Error", str(e))
+        # Uploaded banks join the course registry, so switching back to them is instant.
+        # Loaded through the parse cache on the background worker, so the window
+        # stays responsive on large banks
+        course = self.course_name(file_path)
+        self.controller.registry.add(course, file_path)
+        with span("ui.upload.submit", path=file_path):
+            self.select_btn.configure(state=tk.DISABLED)
+            task = self.controller.run_task(
+                lambda task, name: self.controller.registry.get(name, progress=task.report),
+                course,
+                on_done=lambda generator: self.on_loaded(file_path, generator),
+                on_error=self.on_error,
+                on_cancel=self.on_cancelled,
+                on_progress=self.progress.update_progress,
+                name="load_bank",
+            )
+            self.progress.start(task)
+
+    def course_name(self, file_path):
+        """
+        The registry name for an uploaded bank: its file name without the
+        extension. If another file already has that name, the user either
+        re-points the course to this file or keeps both under a new name.
+        """
+        registry = self.controller.registry
+        course = os.path.splitext(os.path.basename(file_path))[0]
+        current = registry.paths.get(course)
+        if current is None or os.path.abspath(current) == os.path.abspath(file_path):
+            return course
+        if messagebox.askyesno("Course Already Exists",
+                               f"The course '{course}' already uses\n{current}.\n\n"
+                               f"Replace it with\n{file_path}?\n\n"
+                               "Choose No to keep both courses."):
+            return course
+        number = 2
+        while f"{course} ({number})" in registry:
+            number += 1
+        return f"{course} ({number})"
+
+    def on_loaded(self, file_path, generator):
+        self.reset()
+        self.controller.generator = generator
+        if len(generator.question_bank) == 0:
+            messagebox.showerror("Error",
+                                 "Loaded 0 questions. Check the file format: '---' delimited blocks, "
+                                 "alternating question/answer lines, CSV, TSV or JSON lines.")
             self.controller.show_frame("AskCreateFrame")
+            return
+
+        self.controller.file_name = os.path.basename(file_path)
+        if not self.ask_collapse(generator):
+            self.show_loaded(generator)
+            return
+        # Copying the bank and re-indexing it is slow on large banks: keep it off the event loop
+        self.select_btn.configure(state=tk.DISABLED)
+        task = self.controller.run_task(
+            lambda task, generator: generator.collapse_duplicates(),
+            generator,
+            on_done=lambda removed: self.show_loaded(generator, removed),
+            on_error=self.on_error,
+            on_cancel=self.on_cancelled,
+            name="collapse_duplicates",
+        )
+        self.progress.start(task)
+
+    def ask_collapse(self, generator):
+        """Whether the user wants the duplicates with matching answers removed."""
+        report = generator.duplicate_report
+        if generator.dedup == 'collapse' or not report or not report['removable']:
+            return False
+        return messagebox.askyesno("Duplicate Questions",
+                                   f"The bank repeats {report['removable']} questions with the same answer. "
+                                   "Remove the duplicates from this bank?")
+
+    def show_loaded(self, generator, removed=0):
+        self.reset()
+        note = f" Removed {removed} duplicate questions." if removed else ""
+        bank_format = BANK_FORMATS[generator.bank_format]
+        messagebox.showinfo("Success", f"Loaded {len(generator.question_bank)} questions from the bank! "
+                                       f"(Format: {bank_format}){note}")
+        self.controller.show_frame("DetailsFrame")
+
+    def on_error(self, error):
+        self.reset()
+        messagebox.showerror("File Error", str(error))
+        self.controller.show_frame("AskCreateFrame")
+
+    def on_cancelled(self):
+        self.reset()
+        self.controller.show_frame("AskCreateFrame")
+
+    def reset(self):
+        self.progress.finish()
+        self.select_btn.configure(state=tk.NORMAL)
+
+
+class CourseFrame(tk.Frame):
+    """Screen 3b: Switch between the course banks in the registry"""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg=CONFIG.BG_PRIMARY)
+        self.controller = controller
+
+        tk.Label(self, text="Choose a Course",
+                 font=CONFIG.FONT_HEADER, bg=CONFIG.BG_PRIMARY, fg=CONFIG.FG_TEXT).pack(pady=15)
+
+        self.courses = tk.Listbox(self, font=CONFIG.FONT_BODY, height=12)
+        self.courses.pack(padx=20, fill=tk.BOTH, expand=True)
+        self.courses.bind("<Double-Button-1>", lambda event: self.open_course())
+        self.bind("<Visibility>", lambda event: self.refresh())
+
+        self.open_btn = tk.Button(self, text="Open Course", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_SUCCESS,
+                                  fg="white", padx=30, command=self.open_course)
+        self.open_btn.pack(pady=10)
+
+        self.progress = ProgressPanel(self, unit="questions loaded")
+        self.refresh()
+
+    def refresh(self):
+        registry = self.controller.registry
+        self.names = registry.names()
+        self.courses.delete(0, tk.END)
+        for name in self.names:
+            self.courses.insert(tk.END, f"{name}  (loaded)" if registry.is_loaded(name) else name)
+
+    def open_course(self):
+        selection = self.courses.curselection()
+        if not selection or self.progress.task is not None:
+            return
+        name = self.names[selection[0]]
+
+        # Resident courses come straight back; others load on the background worker
+        with span("ui.course.open", course=name):
+            self.open_btn.configure(state=tk.DISABLED)
+            task = self.controller.run_task(
+                lambda task, course: self.controller.registry.get(course, progress=task.report),
+                name,
+                on_done=lambda generator: self.on_opened(name, generator),
+                on_error=self.on_error,
+                on_cancel=self.reset,
+                on_progress=self.progress.update_progress,
+                name="open_course",
+            )
+            self.progress.start(task)
+
+    def on_opened(self, name, generator):
+        self.reset()
+        if len(generator.question_bank) == 0:
+            messagebox.showerror("Error", f"The {name} bank has no questions.")
+            return
+        self.controller.generator = generator
+        self.controller.file_name = os.path.basename(generator.bank_path)
+        self.controller.show_frame("DetailsFrame")
+
+    def on_error(self, error):
+        self.reset()
+        messagebox.showerror("File Error", str(error))
+
+    def reset(self):
+        self.progress.finish()
+        self.open_btn.configure(state=tk.NORMAL)
+        self.refresh()
 
 
 class DetailsFrame(tk.Frame):
@@ -241,17 +454,31 @@ class DetailsFrame(tk.Frame):
         self.num_entry = tk.Entry(self, font=CONFIG.FONT_BODY, width=10)
         self.num_entry.pack(pady=5)
 
-        tk.Label(self, text="Enter output filename (e.g., Exam1.txt):",
+        tk.Label(self, text="Enter output filename (Exam1.txt, .html, .pdf or .docx):",
                  font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY).pack(pady=15)
 
         self.output_entry = tk.Entry(self, font=CONFIG.FONT_BODY, width=30)
         self.output_entry.insert(0, "Generated_Exam.txt")
         self.output_entry.pack(pady=5)
 
-        generate_btn = tk.Button(self, text="Generate Exam",
-                                 font=CONFIG.FONT_BODY, bg=CONFIG.BTN_SUCCESS, fg="white",
-                                 padx=30, pady=10, command=self.generate_exam)
-        generate_btn.pack(pady=30)
+        self.use_history = tk.BooleanVar(value=True)
+        tk.Checkbutton(self, text="Prefer questions not used on recent exams", variable=self.use_history,
+                       font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY).pack(pady=5)
+
+        self.generate_btn = tk.Button(self, text="Generate Exam",
+                                      font=CONFIG.FONT_BODY, bg=CONFIG.BTN_SUCCESS, fg="white",
+                                      padx=30, pady=10, command=self.generate_exam)
+        self.generate_btn.pack(pady=30)
+
+        tk.Button(self, text="Search Question Bank",
+                  font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY, fg="white",
+                  padx=20, command=lambda: self.controller.show_frame("SearchFrame")).pack()
+
+        tk.Button(self, text="Browse / Edit Bank",
+                  font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY, fg="white",
+                  padx=20, command=lambda: self.controller.show_frame("BankFrame")).pack(pady=5)
+
+        self.progress = ProgressPanel(self, unit="questions")
 
     def generate_exam(self):
         try:
@@ -267,23 +494,72 @@ class DetailsFrame(tk.Frame):
                 messagebox.showerror("Error", "Please enter a valid output file name.")
                 return
 
-            # Use the decoupled generator logic
-            exam_content = self.controller.generator.generate_content(
-                num_questions,
-                self.controller.professor_name
-            )
-
-            # Save to file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(exam_content)
-
-            self.controller.file_name = output_file
-            self.controller.show_frame("SuccessFrame")
-
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid integer for the number of questions.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error during generation: {e}")
+            return
+
+        # Generation and the file write run on the background worker
+        with span("ui.details.submit", questions=num_questions):
+            self.generate_btn.configure(state=tk.DISABLED)
+            task = self.controller.run_task(
+                self.write_exam, num_questions, output_file, self.controller.professor_name,
+                self.use_history.get(),
+                on_done=self.on_generated,
+                on_error=self.on_error,
+                on_cancel=self.reset,
+                on_progress=self.progress.update_progress,
+            )
+            self.progress.start(task)
+
+    def write_exam(self, task, num_questions, output_file, professor_name, use_history=True):
+        """
+        Runs on the worker thread: streams the student copy to the file and
+        the answer key and manifest of the same selection next to it. With
+        `use_history`, questions are weighted by and recorded in the usage
+        history; if it cannot be read, the exam is sampled plainly. The file
+        extension picks the format: plain text, or printable HTML, PDF or DOCX.
+        """
+        generator = self.controller.generator
+        history = self.controller.usage_history() if use_history else None
+        sampler = None
+        if history is not None:
+            try:
+                sampler = generator.usage_sampler(num_questions, history)
+            except (OSError, sqlite3.Error):
+                history = None
+        task.report(0)  # Last chance to cancel before anything is written
+        fmt = format_for_path(output_file)
+        if fmt not in KEY_FORMATS:
+            fmt = 'text'
+        key_format = KEY_FORMATS[fmt]
+        key_file, manifest_file = companion_paths(output_file, key_format)
+
+        # Use the decoupled generator logic
+        with span("write", path=output_file, questions=num_questions, format=fmt):
+            with replace_output(output_file, fmt) as student, replace_output(key_file, key_format) as key:
+                manifest = generator.write_exam_set(
+                    {fmt: student, key_format: key}, num_questions, professor_name, sampler)
+            save_manifest(manifest_file, manifest)
+        if history is not None:
+            try:
+                generator.record_usage(history, [manifest['indexes']])
+            except (OSError, sqlite3.Error):
+                pass  # The exam is written; it just won't count as a recent use
+
+        return output_file
+
+    def on_generated(self, output_file):
+        self.reset()
+        self.controller.file_name = output_file
+        self.controller.show_frame("SuccessFrame")
+
+    def on_error(self, error):
+        self.reset()
+        messagebox.showerror("Error", f"Error during generation: {error}")
+
+    def reset(self):
+        self.progress.finish()
+        self.generate_btn.configure(state=tk.NORMAL)
 
 
 class SuccessFrame(tk.Frame):
@@ -309,6 +585,263 @@ class SuccessFrame(tk.Frame):
                   padx=30, pady=10, command=lambda: self.controller.show_frame("WelcomeFrame")).pack(pady=20)
 
 
+class SearchFrame(tk.Frame):
+    """Screen 6: Full-text search over the loaded bank"""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg=CONFIG.BG_PRIMARY)
+        self.controller = controller
+        self.task = None
+
+        tk.Label(self, text="Search Question Bank",
+                 font=CONFIG.FONT_HEADER, bg=CONFIG.BG_PRIMARY, fg=CONFIG.FG_TEXT).pack(pady=15)
+
+        search_row = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
+        search_row.pack(pady=5)
+
+        self.query_entry = tk.Entry(search_row, font=CONFIG.FONT_BODY, width=35)
+        self.query_entry.pack(side=tk.LEFT, padx=5)
+        self.query_entry.bind("<Return>", lambda event: self.run_search())
+
+        tk.Button(search_row, text="Search", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_SUCCESS, fg="white",
+                  padx=15, command=self.run_search).pack(side=tk.LEFT)
+
+        self.status = tk.Label(self, text="Words match any word they start with.",
+                               font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY, fg="#666")
+        self.status.pack(pady=5)
+
+        results_box = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
+        results_box.pack(padx=20, fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(results_box)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results = tk.Listbox(results_box, font=CONFIG.FONT_BODY, yscrollcommand=scrollbar.set)
+        self.results.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.results.yview)
+
+        tk.Button(self, text="Back", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY, fg="white",
+                  padx=30, command=lambda: self.controller.show_frame("DetailsFrame")).pack(pady=10)
+
+    def run_search(self):
+        query = self.query_entry.get().strip()
+        if not query or self.task is not None:
+            return
+
+        # The first search may have to build the index, so it runs off the event loop
+        self.status.configure(text="Searching...")
+        self.task = self.controller.run_task(
+            lambda task, text: self.controller.generator.search_bank(text, limit=100),
+            query,
+            on_done=self.show_results,
+            on_error=self.on_error,
+            name="search",
+        )
+
+    def show_results(self, results):
+        self.task = None
+        self.results.delete(0, tk.END)
+        for result in results:
+            self.results.insert(tk.END, f"#{result['index'] + 1}  {result['question']}  ->  {result['answer']}")
+        note = truncation_note(results)
+        self.status.configure(text=f"{len(results)} matching questions. {note}".strip())
+
+    def on_error(self, error):
+        self.task = None
+        self.status.configure(text="")
+        messagebox.showerror("Search Error", str(error))
+
+
+class BankFrame(tk.Frame):
+    """Screen 7: Browse and edit the loaded bank"""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg=CONFIG.BG_PRIMARY)
+        self.controller = controller
+        self.generator = None
+        self.bank_path = None
+        self.editor = None  # None when the bank cannot be edited (read-only browsing)
+        self.first = 0  # Bank index of the top visible row
+        self.selected = None
+        self.task = None
+
+        tk.Label(self, text="Browse Question Bank",
+                 font=CONFIG.FONT_HEADER, bg=CONFIG.BG_PRIMARY, fg=CONFIG.FG_TEXT).pack(pady=10)
+
+        # The listbox only ever holds the visible rows; the scrollbar spans the whole bank
+        rows_box = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
+        rows_box.pack(padx=20, fill=tk.X)
+        self.scrollbar = tk.Scrollbar(rows_box, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.rows = tk.Listbox(rows_box, font=CONFIG.FONT_BODY, height=CONFIG.BROWSER_ROWS,
+                               activestyle="none", exportselection=False)
+        self.rows.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.rows.bind("<<ListboxSelect>>", lambda event: self.on_select())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.rows.bind(sequence, self.on_wheel)
+        for sequence, step in (("<Up>", -1), ("<Down>", 1),
+                               ("<Prior>", -CONFIG.BROWSER_ROWS), ("<Next>", CONFIG.BROWSER_ROWS)):
+            self.rows.bind(sequence, lambda event, step=step: self.move_selection(step))
+        self.bind("<Visibility>", lambda event: self.refresh())
+
+        fields = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
+        fields.pack(padx=20, pady=5, fill=tk.X)
+        fields.grid_columnconfigure(1, weight=1)
+        tk.Label(fields, text="Question:", font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY).grid(row=0, column=0,
+                                                                                          sticky="w")
+        self.question_entry = tk.Entry(fields, font=CONFIG.FONT_BODY)
+        self.question_entry.grid(row=0, column=1, sticky="ew", pady=2)
+        tk.Label(fields, text="Answer:", font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY).grid(row=1, column=0,
+                                                                                        sticky="w")
+        self.answer_entry = tk.Entry(fields, font=CONFIG.FONT_BODY)
+        self.answer_entry.grid(row=1, column=1, sticky="ew", pady=2)
+        self.answer_entry.bind("<Return>", lambda event: self.apply_edit())
+
+        buttons = tk.Frame(self, bg=CONFIG.BG_PRIMARY)
+        buttons.pack(pady=5)
+        self.apply_btn = tk.Button(buttons, text="Apply Edit", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY,
+                                   fg="white", padx=15, command=self.apply_edit)
+        self.apply_btn.pack(side=tk.LEFT, padx=5)
+        self.save_btn = tk.Button(buttons, text="Save to File", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_SUCCESS,
+                                  fg="white", padx=15, command=self.save_edits)
+        self.save_btn.pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Back", font=CONFIG.FONT_BODY, bg=CONFIG.BTN_PRIMARY, fg="white",
+                  padx=15, command=lambda: self.controller.show_frame("DetailsFrame")).pack(side=tk.LEFT, padx=5)
+
+        self.status = tk.Label(self, text="", font=CONFIG.FONT_BODY, bg=CONFIG.BG_PRIMARY, fg="#666")
+        self.status.pack(pady=5)
+
+    def refresh(self):
+        """Picks up a newly loaded bank, then redraws the visible rows."""
+        generator = self.controller.generator
+        if generator is not self.generator or generator.bank_path != self.bank_path:
+            # Another bank was loaded: staged edits of the old one are dropped
+            self.generator = generator
+            self.bank_path = generator.bank_path
+            self.first = 0
+            self.selected = None
+            try:
+                self.editor = BankEditor(generator)
+                self.show_status()
+            except ValueError as e:
+                self.editor = None
+                self.status.configure(text=str(e))
+        self.draw()
+
+    def pair(self, index):
+        if self.editor is not None:
+            return self.editor.pair(index)
+        return self.generator.question_bank.pair(index)
+
+    def draw(self):
+        """Fills the listbox with the rows from self.first on; O(visible rows), whatever the bank size."""
+        total = len(self.generator.question_bank)
+        self.first = max(0, min(self.first, total - CONFIG.BROWSER_ROWS))
+        last = min(total, self.first + CONFIG.BROWSER_ROWS)
+        edits = self.editor.edits if self.editor is not None else {}
+
+        self.rows.delete(0, tk.END)
+        for index in range(self.first, last):
+            question, answer = self.pair(index)
+            marker = "* " if index in edits else ""
+            self.rows.insert(tk.END, f"{marker}#{index + 1}  {question}  ->  {answer}"[:CONFIG.BROWSER_ROW_CHARS])
+        if self.selected is not None and self.first <= self.selected < last:
+            self.rows.selection_set(self.selected - self.first)
+        if total:
+            self.scrollbar.set(self.first / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, first):
+        self.first = first
+        self.draw()
+
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: 'moveto FRACTION' or 'scroll N units|pages'."""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.generator.question_bank)))
+        elif action == "scroll":
+            step = CONFIG.BROWSER_ROWS if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def on_wheel(self, event):
+        up = event.num == 4 or event.delta > 0
+        self.scroll_to(self.first + (-3 if up else 3))
+        return "break"
+
+    def move_selection(self, step):
+        total = len(self.generator.question_bank)
+        if not total:
+            return "break"
+        current = self.first if self.selected is None else self.selected
+        self.selected = max(0, min(total - 1, current + step))
+        if self.selected < self.first:
+            self.first = self.selected
+        elif self.selected >= self.first + CONFIG.BROWSER_ROWS:
+            self.first = self.selected - CONFIG.BROWSER_ROWS + 1
+        self.draw()
+        self.load_fields()
+        return "break"
+
+    def on_select(self):
+        selection = self.rows.curselection()
+        if selection:
+            self.selected = self.first + selection[0]
+            self.load_fields()
+
+    def load_fields(self):
+        question, answer = self.pair(self.selected)
+        for entry, text in ((self.question_entry, question), (self.answer_entry, answer)):
+            entry.delete(0, tk.END)
+            entry.insert(0, text)
+
+    def show_status(self):
+        edits = len(self.editor.edits) if self.editor is not None else 0
+        total = len(self.generator.question_bank)
+        self.status.configure(text=f"{total} questions; {edits} unsaved edits.")
+
+    def apply_edit(self):
+        if self.editor is None or self.selected is None or self.task is not None:
+            return
+        try:
+            self.editor.stage(self.selected, self.question_entry.get(), self.answer_entry.get())
+        except (ValueError, IndexError) as e:
+            messagebox.showerror("Edit Error", str(e))
+            return
+        self.draw()
+        self.show_status()
+
+    def save_edits(self):
+        if self.editor is None or not self.editor.edits or self.task is not None:
+            return
+
+        # The first save scans the file for block offsets, so it runs off the event loop
+        self.apply_btn.configure(state=tk.DISABLED)
+        self.save_btn.configure(state=tk.DISABLED)
+        self.status.configure(text="Saving...")
+        self.task = self.controller.run_task(
+            lambda task, editor: editor.save(progress=task.report),
+            self.editor,
+            on_done=self.on_saved,
+            on_error=self.on_error,
+            name="save_bank",
+        )
+
+    def on_saved(self, saved):
+        self.reset()
+        self.draw()
+        self.show_status()
+        messagebox.showinfo("Saved", f"Saved {saved} edited questions to {os.path.basename(self.editor.path)}.")
+
+    def on_error(self, error):
+        self.reset()
+        self.show_status()
+        messagebox.showerror("Save Error", str(error))
+
+    def reset(self):
+        self.task = None
+        self.apply_btn.configure(state=tk.NORMAL)
+        self.save_btn.configure(state=tk.NORMAL)
+
+
 # --- Main Execution ---
 if __name__ == "__main__":
     # Note: To test this version, ensure your question bank file has questions
@@ -322,5 +855,8 @@ if __name__ == "__main__":
     # Answer: Shakespeare
     # ---
 
-    app = ProfessorAssistant()
-    app.mainloop()
\ No newline at end of file
+    # PROFESSOR_ASSISTANT_TRACE=trace.json records timing spans for this session
+    profile_mode = instrumentation.configure_from_env()
+    with instrumentation.profile(profile_mode):
+        app = ProfessorAssistant()
+        app.mainloop()
\ No newline at end of file
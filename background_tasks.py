@@ -0,0 +1,108 @@
+"""
+Background worker subsystem for running slow ExamGenerator operations off
+the Tk event loop.
+
+Tasks run on a small thread pool and talk to the UI only through a queue:
+the UI polls it with `after()` and never blocks. This module does not
+import tkinter, so it can be used (and reasoned about) on its own.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised inside a task when the user has asked to cancel it. Like
+    asyncio.CancelledError it is not an Exception, so the broad
+    `except Exception` handlers in the loaders don't swallow it.
+    """
+
+
+class TaskHandle:
+    """
+    Shared state between one running task and the UI. The task calls
+    report() as it makes progress; the UI calls cancel() and poll().
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._cancel_event = threading.Event()
+        self._messages = queue.Queue()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def report(self, done, total=None):
+        """
+        Called from the worker with the number of records handled so far.
+        Doubles as the cancellation checkpoint.
+        """
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+        self._messages.put(('progress', done, total))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def _finish(self, kind, value=None):
+        self._messages.put((kind, value))
+
+    def poll(self):
+        """
+        Drains pending messages without blocking. Returns the latest progress
+        as (done, total) or None, and the final (kind, value) message or None,
+        where kind is 'done', 'error' or 'cancelled'.
+        """
+        progress = None
+        final = None
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if message[0] == 'progress':
+                progress = message[1:]  # Only the newest count matters
+            else:
+                final = message
+
+        return progress, final
+
+
+class BackgroundWorker:
+    """Runs tasks on a thread pool; each task receives its TaskHandle first."""
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="assistant-worker")
+
+    def submit(self, func, *args, **kwargs):
+        handle = TaskHandle()
+        self._pool.submit(self._run, handle, func, args, kwargs)
+        return handle
+
+    @staticmethod
+    def _run(handle, func, args, kwargs):
+        try:
+            result = func(handle, *args, **kwargs)
+        except TaskCancelled:
+            handle._finish('cancelled')
+        except Exception as e:
+            handle._finish('error', e)
+        else:
+            handle._finish('done', result)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def throughput_text(done, elapsed, unit="questions"):
+    """Formats a progress line such as '12,000 questions (48,000/s)'."""
+    rate = done / elapsed if elapsed > 0 else 0
+    return f"{done:,} {unit} ({rate:,.0f}/s)"
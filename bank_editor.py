@@ -0,0 +1,212 @@
+"""
+In-place editing of '---' delimited bank files.
+
+Edits are staged in memory and shown through the editor at once; save()
+writes them back without re-serializing the bank. Each record's block
+boundaries come from one scan of the file. An edited block of the same
+byte length is overwritten where it is; otherwise the new file is
+written next to the old one and moved over it, so an interrupted save
+never leaves a truncated bank. Only the question and answer lines of an
+edited block are replaced, so metadata lines and the file's line endings
+are kept. Before writing, every edited block is checked against the
+loaded entry, so a file edited elsewhere is never patched blindly.
+"""
+import os
+import re
+import shutil
+import tempfile
+from array import array
+
+from bank_parser import file_stamp
+from bank_reindex import READ_CHUNK_SIZE, iter_raw_blocks, parse_block
+from compiled_bank import COMPILED_EXTENSION
+from dedup import dropped_indexes
+
+_LINE_BREAK = re.compile(r"(\r\n|\r|\n)")
+_CHANGED_ON_DISK = "The bank file changed since it was loaded; reload it first."
+
+
+def rewrite_block(raw, question, answer):
+    """A block's bytes with its first two non-empty lines replaced by `question` and `answer`."""
+    pieces = _LINE_BREAK.split(raw.decode('utf-8'))
+    replacements = [question, answer]
+    for position in range(0, len(pieces), 2):  # Even positions are line contents
+        if pieces[position].strip():
+            pieces[position] = replacements.pop(0)
+            if not replacements:
+                break
+    if replacements:
+        raise ValueError("The block no longer holds a question and answer.")
+    return "".join(pieces).encode('utf-8')
+
+
+class BankEditor:
+    """Staged edits to the loaded bank of an ExamGenerator, saved back to its '---' file."""
+
+    def __init__(self, generator):
+        if generator.bank_path is None or generator.bank_path.endswith(COMPILED_EXTENSION):
+            raise ValueError("Only banks loaded from a '---' text file can be edited.")
+        if generator.bank_format != 'delimited':
+            raise ValueError("Only '---' delimited banks can be edited; convert the bank first.")
+        self.generator = generator
+        self.path = generator.bank_path
+        self.delimiter = generator.delimiter
+        self.edits = {}  # Bank index -> (question, answer), not saved yet
+        self._starts = None  # File offset and length of each record's block, from scan()
+        self._lengths = None
+        self._stamp = None  # file_stamp() at the last scan or save
+
+    def __len__(self):
+        return len(self.generator.question_bank)
+
+    def pair(self, index):
+        """(question, answer) of an entry, with staged edits applied."""
+        edited = self.edits.get(index)
+        return edited if edited is not None else self.generator.question_bank.pair(index)
+
+    def stage(self, index, question, answer):
+        """Records an edit to entry `index`; nothing is written until save()."""
+        if not 0 <= index < len(self):
+            raise IndexError("Question index out of range.")
+        question = question.strip()
+        answer = answer.strip()
+        if not question or not answer:
+            raise ValueError("Both the question and the answer are required.")
+        for text in (question, answer):
+            if "\n" in text or "\r" in text or self.delimiter in text:
+                raise ValueError(f"Questions and answers must be one line without '{self.delimiter}'.")
+
+        if (question, answer) == self.generator.question_bank.pair(index):
+            self.edits.pop(index, None)
+        else:
+            self.edits[index] = (question, answer)
+
+    def discard(self):
+        self.edits.clear()
+
+    def scan(self, progress=None):
+        """Finds the block of every record in the file (one pass, no decoding of text)."""
+        stamp = file_stamp(self.path)
+        starts = array('q')
+        lengths = array('q')
+        with open(self.path, 'rb') as file:
+            for offset, raw in iter_raw_blocks(file, self.delimiter.encode('utf-8')):
+                if parse_block(raw) is not None:
+                    starts.append(offset)
+                    lengths.append(len(raw))
+                    if progress is not None and len(starts) % 5000 == 0:
+                        progress(len(starts))
+        self._starts = starts
+        self._lengths = lengths
+        self._stamp = stamp
+
+    def _file_records(self):
+        """File record number of each bank index (they differ once duplicates were collapsed)."""
+        generator = self.generator
+        report = generator.duplicate_report
+        total = len(self._starts)
+        if generator.dedup == 'collapse' and report is not None and report['removable']:
+            dropped = set(dropped_indexes(report))
+            records = [record for record in range(total) if record not in dropped]
+        else:
+            records = range(total)
+        if len(records) != len(generator.question_bank):
+            raise ValueError(_CHANGED_ON_DISK)
+        return records
+
+    def save(self, progress=None):
+        """
+        Writes the staged edits to the file and the loaded bank. Returns
+        the number of entries saved. Block offsets are found again if the
+        file changed since the last scan, and every edited block must still
+        hold the entry it had when the bank was loaded; otherwise nothing is
+        written and ValueError is raised.
+        """
+        if not self.edits:
+            return 0
+        if self._starts is None or file_stamp(self.path) != self._stamp:
+            self.scan(progress)
+        records = self._file_records()
+        starts = self._starts
+        lengths = self._lengths
+        bank = self.generator.question_bank
+
+        new_blocks = {}  # File record -> new bytes
+        with open(self.path, 'rb') as file:
+            for index, (question, answer) in self.edits.items():
+                record = records[index]
+                file.seek(starts[record])
+                raw = file.read(lengths[record])
+                if parse_block(raw) != bank.pair(index):
+                    raise ValueError(_CHANGED_ON_DISK)
+                new_blocks[record] = rewrite_block(raw, question, answer)
+
+        resized = [record for record, raw in new_blocks.items() if len(raw) != lengths[record]]
+        try:
+            if resized:
+                self._rewrite_file(new_blocks)
+            else:
+                with open(self.path, 'r+b') as file:
+                    for record, raw in new_blocks.items():
+                        file.seek(starts[record])
+                        file.write(raw)  # Same length: overwrite in place
+                    file.flush()
+                    os.fsync(file.fileno())
+        except BaseException:
+            self._starts = None  # Offsets may be half-updated: scan again next time
+            raise
+        self._stamp = file_stamp(self.path)
+
+        self.generator.replace_entries(self.edits)
+        saved = len(self.edits)
+        self.edits = {}
+        return saved
+
+    def _rewrite_file(self, new_blocks):
+        """
+        Writes the bank with its new blocks to a temporary file next to it
+        and moves that over the original, so a crash or a full disk leaves
+        the old file intact. Updates the block offsets of the records that moved.
+        """
+        starts = self._starts
+        lengths = self._lengths
+        shift = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".bank_edit_", suffix=".tmp")
+        try:
+            with open(self.path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+                position = 0  # Next byte of the old file to copy
+                for record in range(min(new_blocks), len(starts)):
+                    raw = new_blocks.get(record)
+                    if raw is None:
+                        starts[record] += shift
+                        continue
+                    _copy_range(source, target, position, starts[record])
+                    target.write(raw)
+                    position = starts[record] + lengths[record]
+                    starts[record] += shift
+                    shift += len(raw) - lengths[record]
+                    lengths[record] = len(raw)
+                source.seek(position)
+                shutil.copyfileobj(source, target, READ_CHUNK_SIZE)
+                target.flush()
+                os.fsync(target.fileno())
+            shutil.copymode(self.path, temp_path)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+
+def _copy_range(source, target, start, stop):
+    source.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        chunk = source.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        target.write(chunk)
+        remaining -= len(chunk)
@@ -0,0 +1,327 @@
+"""
+Streaming parsers for question bank files.
+
+The parsers read a bank one line at a time and yield each question/answer
+record as soon as its block is closed, so memory use stays flat no matter
+how large the file is.
+
+Besides the V3.0 '---' format, banks may use the V1.0/V2.0 alternating
+line layout, CSV, TSV or JSON lines. detect_format() sniffs which one a
+file uses from its first few KB, so every bank is parsed exactly once
+with the right parser.
+"""
+import csv
+import json
+import os
+
+QUESTION_DELIMITER = "---"  # Robust separator for questions
+PROGRESS_INTERVAL = 5000  # Records between progress callbacks
+PARSER_VERSION = 1  # Bump whenever parsing results change, to invalidate caches
+METADATA_KEYS = ('tags', 'difficulty')  # "Key: value" lines allowed after the answer
+SNIFF_SIZE = 8 * 1024  # Characters read to detect a bank's format
+
+# Format name -> description; 'delimited' is the V3.0 '---' format
+BANK_FORMATS = {
+    'delimited': "V3.0 '---' delimited blocks",
+    'lines': "V1.0/V2.0 alternating question and answer lines",
+    'csv': "CSV with question and answer columns",
+    'tsv': "Tab-separated question and answer columns",
+    'jsonl': "JSON lines with 'question' and 'answer' keys",
+}
+FORMAT_BY_EXTENSION = {'.csv': 'csv', '.tsv': 'tsv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def iter_delimited_records(lines, delimiter=QUESTION_DELIMITER):
+    """
+    Yields (question, answer) tuples from an iterable of text lines in the
+    V3.0 delimiter format.
+
+    The result is identical to splitting the whole text on the delimiter:
+    the first non-empty line of each block is the question, the second is
+    the answer, and any further lines are ignored.
+    """
+    parts = []  # At most two stripped lines of the current block
+
+    for line in lines:
+        # The delimiter may also appear mid-line, which closes the block there
+        segments = line.split(delimiter) if delimiter in line else (line,)
+
+        for index, segment in enumerate(segments):
+            if index > 0:
+                if len(parts) == 2:
+                    yield parts[0], parts[1]
+                parts = []
+
+            if len(parts) < 2:
+                segment = segment.strip()
+                if segment:
+                    parts.append(segment)
+
+    if len(parts) == 2:
+        yield parts[0], parts[1]
+
+
+def parse_metadata_line(line):
+    """Returns (key, value) for a 'Tags: ...' style line, or None."""
+    key, separator, value = line.partition(':')
+    key = key.strip().lower()
+    if separator and key in METADATA_KEYS:
+        return key, value.strip()
+    return None
+
+
+def iter_delimited_metadata(lines, delimiter=QUESTION_DELIMITER):
+    """
+    Yields a metadata dict (e.g. {'tags': 'os, memory', 'difficulty': '0.4'})
+    for every record iter_delimited_records would yield from the same lines,
+    in the same order. Metadata lines follow the answer, which older parsers
+    already ignore, so tagged banks stay readable by every loader.
+    """
+    found = 0  # Non-empty lines seen in the current block
+    metadata = {}
+
+    for line in lines:
+        segments = line.split(delimiter) if delimiter in line else (line,)
+
+        for index, segment in enumerate(segments):
+            if index > 0:
+                if found >= 2:
+                    yield metadata
+                found = 0
+                metadata = {}
+
+            segment = segment.strip()
+            if not segment:
+                continue
+            found += 1
+            if found > 2:
+                item = parse_metadata_line(segment)
+                if item is not None:
+                    metadata[item[0]] = item[1]
+
+    if found >= 2:
+        yield metadata
+
+
+def iter_alternating_records(lines):
+    """
+    Yields (question, answer) tuples from the V1.0/V2.0 layout: a question
+    line followed by its answer line. Pairs with an empty side are skipped,
+    as those apps did.
+    """
+    lines = iter(lines)
+    for question in lines:
+        answer = next(lines, None)
+        if answer is None:
+            return
+        question = question.strip()
+        answer = answer.strip()
+        if question and answer:
+            yield question, answer
+
+
+def iter_table_records(lines, dialect='excel'):
+    """
+    Yields (question, answer) tuples from CSV/TSV rows. A first row naming
+    'question' and 'answer' columns is a header that picks the columns;
+    otherwise they are the first two.
+    """
+    columns = (0, 1)
+    for number, row in enumerate(csv.reader(lines, dialect)):
+        if number == 0:
+            names = [name.strip().lower() for name in row]
+            if 'question' in names and 'answer' in names:
+                columns = names.index('question'), names.index('answer')
+                continue
+
+        if len(row) <= max(columns):
+            continue
+        question = row[columns[0]].strip()
+        answer = row[columns[1]].strip()
+        if question and answer:
+            yield question, answer
+
+
+def iter_jsonl_records(lines):
+    """Yields (question, answer) tuples from JSON objects, one per line."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number} is not a JSON object.")
+
+        question = str(record.get('question') or "").strip()
+        answer = str(record.get('answer') or "").strip()
+        if question and answer:
+            yield question, answer
+
+
+def _delimited_counts(lines, delimiter, truncated):
+    """
+    (well-formed, malformed) '---' blocks: a block is well-formed when it
+    holds a question, an answer and nothing but metadata lines after them.
+    Needs the delimiter on a line of its own.
+    """
+    if not any(line.strip() == delimiter for line in lines):
+        return 0, 0
+    blocks = [[]]
+    for line in lines:
+        if line.strip() == delimiter:
+            blocks.append([])
+        else:
+            blocks[-1].append(line.strip())
+    if truncated and len(blocks) > 1:
+        blocks.pop()  # May stop mid-record
+    good = bad = 0
+    for block in blocks:
+        if not block:
+            continue
+        if len(block) >= 2 and all(parse_metadata_line(line) for line in block[2:]):
+            good += 1
+        else:
+            bad += 1
+    return good, bad
+
+
+def _jsonl_counts(lines):
+    """(well-formed, malformed) lines: JSON objects with a question and an answer."""
+    good = bad = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            bad += 1
+            continue
+        if isinstance(record, dict) and record.get('question') and record.get('answer'):
+            good += 1
+        else:
+            bad += 1
+    return good, bad
+
+
+def _table_counts(lines, dialect):
+    """
+    (well-formed, malformed) rows under a header row that names the
+    'question' and 'answer' columns; (0, 0) without such a header.
+    """
+    rows = csv.reader(lines, dialect)
+    names = [name.strip().lower() for name in next(rows, [])]
+    if 'question' not in names or 'answer' not in names:
+        return 0, 0
+    columns = names.index('question'), names.index('answer')
+    good = bad = 0
+    for row in rows:
+        if len(row) > max(columns) and row[columns[0]].strip() and row[columns[1]].strip():
+            good += 1
+        else:
+            bad += 1
+    return good, bad
+
+
+def sniff_format(sample, delimiter=QUESTION_DELIMITER, truncated=False):
+    """
+    Guesses the format of a bank from the start of its text by parsing it
+    as each candidate format in turn ('---' blocks, JSON lines, TSV, CSV)
+    and taking the first that yields well-formed records, allowing a
+    stray malformed one (one in ten at most); CSV and TSV need a
+    question/answer header row.
+    Anything else is read as alternating lines. Pass `truncated` when the
+    sample stops mid-file, so a cut-off last line is not taken into account.
+    """
+    lines = sample.lstrip('\ufeff').splitlines()
+    if truncated and len(lines) > 1:
+        lines.pop()
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return 'delimited'
+
+    candidates = (
+        ('delimited', lambda: _delimited_counts(lines, delimiter, truncated)),
+        ('jsonl', lambda: _jsonl_counts(lines)),
+        ('tsv', lambda: _table_counts(lines, 'excel-tab')),
+        ('csv', lambda: _table_counts(lines, 'excel')),
+    )
+    for fmt, counts in candidates:
+        good, bad = counts()
+        if good > bad and (bad <= 1 or bad * 10 <= good):
+            return fmt
+    return 'lines'
+
+
+def detect_format(file_path, delimiter=QUESTION_DELIMITER):
+    """
+    The format of a bank file: from its extension for .csv/.tsv/.jsonl,
+    otherwise sniffed from its first SNIFF_SIZE characters.
+    """
+    fmt = FORMAT_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+    if fmt is not None:
+        return fmt
+
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        sample = file.read(SNIFF_SIZE)
+        truncated = bool(file.read(1))
+    return sniff_format(sample, delimiter, truncated)
+
+
+def iter_bank_file(file_path, delimiter=QUESTION_DELIMITER, fmt='delimited'):
+    """
+    Opens a bank file and streams its (question, answer) records; `fmt` is
+    a key of BANK_FORMATS, or None to detect it.
+    """
+    if fmt is None:
+        fmt = detect_format(file_path, delimiter)
+    if fmt not in BANK_FORMATS:
+        raise ValueError(f"Unknown bank format {fmt!r}; expected one of {', '.join(BANK_FORMATS)}.")
+
+    if fmt in ('csv', 'tsv'):
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as file:
+            yield from iter_table_records(file, 'excel' if fmt == 'csv' else 'excel-tab')
+        return
+
+    encoding = 'utf-8' if fmt == 'delimited' else 'utf-8-sig'
+    with open(file_path, 'r', encoding=encoding) as file:
+        if fmt == 'delimited':
+            yield from iter_delimited_records(file, delimiter)
+        elif fmt == 'lines':
+            yield from iter_alternating_records(file)
+        else:
+            yield from iter_jsonl_records(file)
+
+
+def iter_bank_metadata(file_path, delimiter=QUESTION_DELIMITER):
+    """Opens a V3.0 bank file and streams the metadata dict of each record."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        yield from iter_delimited_metadata(file, delimiter)
+
+
+def file_stamp(path):
+    """(size, mtime) of a bank file, or None if it is gone; a change means the bank changed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def iter_with_progress(records, progress=None, interval=PROGRESS_INTERVAL):
+    """
+    Passes records through, calling progress(count) every `interval`
+    records and once at the end. With no callback it only passes records
+    through.
+    """
+    if progress is None:
+        yield from records
+        return
+
+    count = 0
+    for record in records:
+        yield record
+        count += 1
+        if count % interval == 0:
+            progress(count)
+    progress(count)
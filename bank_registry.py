@@ -0,0 +1,133 @@
+"""
+Registry of every question bank a professor works with, e.g. one per
+course.
+
+Banks are registered by name (scan() picks up a whole directory) but only
+loaded the first time they are asked for. Loaded banks are kept in least
+recently used order, and once their combined size passes the memory
+budget the coldest ones are dropped; the bank just asked for always
+stays. Switching back to a resident bank costs a dict lookup and a
+stat() of its file: a file whose size or modification time changed since
+it was loaded is loaded again.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from bank_parser import FORMAT_BY_EXTENSION, file_stamp
+from exam_generator import ExamGenerator
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+BANK_EXTENSIONS = (".txt",) + tuple(FORMAT_BY_EXTENSION)
+
+
+def resident_bytes(generator):
+    """Memory a loaded bank accounts for: its buffers, or its mapping if it is memory-mapped."""
+    bank = generator.question_bank
+    mapped = getattr(bank, 'mapped_bytes', None)
+    return bank.nbytes() + (mapped() if mapped is not None else 0)
+
+
+class BankRegistry:
+    """
+    Name -> bank file, with the loaded ExamGenerators kept under
+    `max_bytes` by LRU eviction. `loader` is the ExamGenerator method used
+    to load a bank; extra keyword arguments go to each new ExamGenerator.
+    Safe to use from a background worker thread.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, loader='load_bank_cached', **generator_options):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.generator_options = generator_options
+        self.paths = {}
+        self._loaded = OrderedDict()  # Name -> (ExamGenerator, resident bytes, file stamp), coldest first
+        self._lock = threading.RLock()
+
+    def add(self, name, path):
+        """Registers (or re-points) a bank without loading it."""
+        with self._lock:
+            if self.paths.get(name) != path:
+                self.unload(name)
+            self.paths[name] = path
+
+    def scan(self, directory, extensions=BANK_EXTENSIONS):
+        """
+        Registers every bank file directly inside `directory` under its
+        file name without the extension. Returns the names found.
+        """
+        names = []
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+            stem, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension.lower() in extensions:
+                self.add(stem, entry.path)
+                names.append(stem)
+        return names
+
+    def names(self):
+        return sorted(self.paths)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def get(self, name, progress=None):
+        """
+        The ExamGenerator of bank `name`, loading it on first use. Marks it
+        most recently used and evicts cold banks if over budget.
+        """
+        with self._lock:
+            if name not in self.paths:
+                raise KeyError(f"Unknown question bank {name!r}.")
+
+            path = self.paths[name]
+            loaded = self._loaded.get(name)
+            if loaded is not None:
+                if loaded[2] == file_stamp(path):
+                    self._loaded.move_to_end(name)
+                    return loaded[0]
+                self.unload(name)  # Edited on disk since it was loaded
+
+            stamp = file_stamp(path)  # Taken before loading, so an edit during the load is seen next time
+            generator = ExamGenerator(**self.generator_options)
+            getattr(generator, self.loader)(path, progress=progress)
+            self._loaded[name] = (generator, resident_bytes(generator), stamp)
+            self.evict(keep=name)
+            return generator
+
+    def resident_bytes(self):
+        """Combined size of the loaded banks."""
+        return sum(size for _, size, _ in self._loaded.values())
+
+    def evict(self, keep=None, max_bytes=None):
+        """Unloads least recently used banks until the loaded ones fit the budget."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            total = self.resident_bytes()
+            for name in list(self._loaded):
+                if total <= max_bytes:
+                    break
+                if name == keep:
+                    continue
+                total -= self._loaded[name][1]
+                self.unload(name)
+
+    def unload(self, name):
+        """
+        Drops the registry's reference to a loaded bank; it is loaded again
+        on its next use. The generator itself is left intact, so screens or
+        tasks still holding it keep working; its memory is freed once they
+        let go of it too.
+        """
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._loaded):
+                self.unload(name)
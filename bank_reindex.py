@@ -0,0 +1,209 @@
+"""
+Incremental re-indexing of '---' delimited bank files.
+
+A BankIndex remembers where every block of the last load started and a
+checksum of its bytes. On reload only new or changed blocks are parsed:
+
+    append  the bytes before the last block are unchanged (one C-speed hash
+            of the prefix), so only the tail is scanned and parsed, and the
+            bank is extended in place
+    diff    anything else: every block is re-scanned and checksummed, but
+            blocks whose bytes match a block from the last load reuse its
+            stored text instead of being decoded and parsed again
+
+Both paths give exactly the same bank as a fresh load_bank_robust.
+"""
+import hashlib
+import os
+from array import array
+
+from bank_parser import QUESTION_DELIMITER, iter_with_progress
+from question_store import QuestionBank
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+# Block checksums only live in memory for the life of the process, so the
+# built-in 64-bit SipHash of the bytes is enough and several times faster
+# than a cryptographic digest.
+_checksum = hash
+
+
+def iter_raw_blocks(file, delimiter_bytes, start=0):
+    """
+    Yields (offset, raw_bytes) for each delimiter-separated block of a
+    binary file from `start` on. The last block runs to end of file.
+    """
+    file.seek(start)
+    offset = start
+    pending = []  # Pieces of the current block; they contain no delimiter
+    overlap = len(delimiter_bytes) - 1
+
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        # A delimiter may straddle the boundary with the previous chunk
+        edge = pending[-1][-overlap:] if pending and overlap else b""
+        if delimiter_bytes not in edge + chunk:
+            pending.append(chunk)
+            continue
+
+        parts = b"".join(pending + [chunk]).split(delimiter_bytes)
+        pending = [parts.pop()]
+        for raw in parts:
+            yield offset, raw
+            offset += len(raw) + len(delimiter_bytes)
+
+    yield offset, b"".join(pending)
+
+
+def parse_block(raw):
+    """
+    Parses one block's bytes (which contain no delimiter) into a
+    (question, answer) tuple, or None. Matches iter_delimited_records,
+    including open()'s universal-newline handling.
+    """
+    text = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    parts = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if line:
+            parts.append(line)
+            if len(parts) == 2:
+                return parts[0], parts[1]
+    return None
+
+
+def _hash_range(file, hasher, start, end):
+    file.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = file.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        hasher.update(chunk)
+        remaining -= len(chunk)
+    return hasher
+
+
+class BankIndex:
+    """Block boundaries and checksums of the last load of one bank file."""
+
+    def __init__(self, file_path, delimiter=QUESTION_DELIMITER):
+        self.file_path = os.path.abspath(file_path)
+        self.delimiter = delimiter
+        self.checksums = []  # One per block, in file order
+        self.records = array('q')  # Bank index of each block's record, or -1
+        self.tail_start = 0  # Offset of the last (possibly unfinished) block
+        self.prefix_hash = hashlib.blake2b()  # Hash of bytes [0, tail_start)
+
+    def matches(self, file_path, delimiter):
+        return self.file_path == os.path.abspath(file_path) and self.delimiter == delimiter
+
+    def file_digest(self):
+        """
+        ('blake2b', hex digest) of the whole file as of the last build or
+        refresh: the kept prefix hash plus the last block, read again.
+        """
+        hasher = self.prefix_hash.copy()
+        with open(self.file_path, 'rb') as file:
+            _hash_range(file, hasher, self.tail_start, os.fstat(file.fileno()).st_size)
+        return 'blake2b', hasher.hexdigest()
+
+    def _add_blocks(self, blocks, bank, reuse=None, progress=None):
+        """
+        Appends parsed blocks to the index and the bank. `reuse` is an
+        optional (checksum -> record index, old bank) pair; runs of
+        consecutive reused records are copied from the old bank in bulk.
+        Returns how many blocks were parsed and how many were reused.
+        """
+        old_records, old_bank = reuse or ({}, None)
+        parsed = reused = 0
+        offset = self.tail_start
+        run_start = run_stop = 0  # Old-bank records reused but not copied yet
+        records = self.records
+        checksums = self.checksums
+
+        for offset, raw in iter_with_progress(blocks, progress):
+            checksum = _checksum(raw)
+            checksums.append(checksum)
+            old_index = old_records.get(checksum)
+
+            if old_index is not None:
+                reused += 1
+                if old_index < 0:
+                    records.append(-1)
+                    continue
+                if old_index != run_stop:
+                    bank.extend_from(old_bank, run_start, run_stop)
+                    run_start = run_stop = old_index
+                records.append(len(bank) + run_stop - run_start)
+                run_stop += 1
+                continue
+
+            parsed += 1
+            record = parse_block(raw)
+            if record is None:
+                records.append(-1)
+                continue
+            bank.extend_from(old_bank, run_start, run_stop)
+            run_start = run_stop = 0
+            records.append(len(bank))
+            bank.append(*record)
+
+        bank.extend_from(old_bank, run_start, run_stop)
+        self.tail_start = offset
+        return parsed, reused
+
+    def build(self, progress=None):
+        """Parses the whole file; returns the new bank."""
+        bank = QuestionBank()
+        with open(self.file_path, 'rb') as file:
+            blocks = iter_raw_blocks(file, self.delimiter.encode('utf-8'))
+            self._add_blocks(blocks, bank, progress=progress)
+            self.prefix_hash = _hash_range(file, hashlib.blake2b(), 0, self.tail_start)
+        return bank
+
+    def refresh(self, bank, progress=None):
+        """
+        Brings `bank` up to date with the file. Returns the (possibly new)
+        bank and a stats dict with the mode used and block counts; in
+        append mode 'kept_records' entries at the front were left untouched.
+        """
+        delimiter_bytes = self.delimiter.encode('utf-8')
+
+        with open(self.file_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            prefix = None
+            if size >= self.tail_start:
+                prefix = _hash_range(file, hashlib.blake2b(), 0, self.tail_start)
+
+            if prefix is not None and prefix.digest() == self.prefix_hash.digest():
+                # Tail-append fast path: re-parse the old last block onwards
+                old_tail = self.tail_start
+                self.checksums.pop()
+                last_record = self.records.pop()
+                if last_record >= 0:
+                    bank.truncate(last_record)
+                kept_records = len(bank)
+
+                blocks = iter_raw_blocks(file, delimiter_bytes, start=old_tail)
+                parsed, _ = self._add_blocks(blocks, bank, progress=progress)
+                self.prefix_hash = _hash_range(file, prefix, old_tail, self.tail_start)
+                return bank, {'mode': 'append', 'parsed': parsed, 'reused': len(self.checksums) - parsed,
+                              'kept_records': kept_records}
+
+            # Chunk diff: reuse the text of every block whose bytes are unchanged
+            old_records = {checksum: record for checksum, record in zip(self.checksums, self.records)}
+            self.checksums = []
+            self.records = array('q')
+            self.tail_start = 0
+
+            new_bank = QuestionBank()
+            blocks = iter_raw_blocks(file, delimiter_bytes)
+            parsed, reused = self._add_blocks(blocks, new_bank, (old_records, bank), progress)
+            self.prefix_hash = _hash_range(file, hashlib.blake2b(), 0, self.tail_start)
+
+        return new_bank, {'mode': 'diff', 'parsed': parsed, 'reused': reused}
@@ -0,0 +1,248 @@
+"""
+Batch generation of many exam variants in one pass.
+
+All selections are drawn up front, then streamed out to their files. Each
+variant has its own RNG stream derived from the batch seed, so any single
+variant can be reproduced from (seed, variant number) alone. Because of
+that, a batch split across a process or thread pool produces exactly the
+same files as the serial path. A batch can also be streamed into one
+combined document (e.g. a single PDF to print), each exam on new pages.
+"""
+import os
+
+from exam_render import FORMAT_EXTENSIONS, WRITERS, replace_output, write_document
+from exam_sampling import exam_rng, exam_seed, new_seed, seed_reproduces
+from instrumentation import span
+
+DEFAULT_NAME_STEM = "Exam_{number:04d}"  # Numbered file name; the extension follows the format
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def variant_rng(seed, index):
+    """Independent, reproducible RNG for variant `index` of a batch."""
+    return exam_rng(exam_seed(seed, index))
+
+
+def sample_variants(bank_size, count, num_questions, seed, assembler=None):
+    """
+    Draws the question indexes of every variant in one step, through an
+    exam_assembly.ExamAssembler when quotas apply.
+    """
+    if num_questions > bank_size:
+        raise ValueError("Requested questions exceed bank size.")
+    if assembler is not None:
+        return [assembler.assemble(variant_rng(seed, index)) for index in range(count)]
+
+    population = range(bank_size)
+    return [variant_rng(seed, index).sample(population, num_questions)
+            for index in range(count)]
+
+
+def default_name_pattern(fmt='text'):
+    return DEFAULT_NAME_STEM + FORMAT_EXTENSIONS[fmt]
+
+
+def exam_path(output_dir, number, name_pattern):
+    return os.path.join(output_dir, name_pattern.format(number=number))
+
+
+def write_exam_file(path, selected, professor_name, fmt='text', seed=None):
+    """
+    Streams one exam (student copy by default) into a temporary file that
+    replaces `path` once complete, so a failed write never leaves a partial exam.
+    """
+    with replace_output(path, fmt, WRITE_BUFFER_SIZE) as f:
+        WRITERS[fmt](f, selected, professor_name, seed)
+
+
+def write_variants(bank, selections, professor_name, output_dir,
+                   name_pattern=None, fmt='text', progress=None, seed=None):
+    """
+    Writes each selection as a numbered exam file (default_name_pattern(fmt)
+    unless `name_pattern` is given) and returns their paths.
+    With the batch `seed`, each header carries its variant's exam seed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if name_pattern is None:
+        name_pattern = default_name_pattern(fmt)
+    paths = []
+
+    for number, indexes in enumerate(selections, 1):
+        path = exam_path(output_dir, number, name_pattern)
+        variant_seed = exam_seed(seed, number - 1) if seed is not None else None
+        write_exam_file(path, (bank[i] for i in indexes), professor_name, fmt, variant_seed)
+        paths.append(path)
+        if progress is not None:
+            progress(number)
+
+    return paths
+
+
+def write_combined(path, bank, selections, professor_name, fmt='text', progress=None, seed=None):
+    """
+    Streams every selection into the one document at `path`, in variant
+    order; the printable formats start each exam on a new page.
+    """
+    def exams():
+        for number, indexes in enumerate(selections, 1):
+            variant_seed = exam_seed(seed, number - 1) if seed is not None else None
+            yield (bank[i] for i in indexes), professor_name, variant_seed
+            if progress is not None:
+                progress(number)  # The writer asks for the next exam once this one is written
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with replace_output(path, fmt, WRITE_BUFFER_SIZE) as f:
+        write_document(f, exams(), fmt)
+    return [path]
+
+
+# --- Parallel backend ---
+_worker_bank = None  # Set once per worker process by _init_worker
+_worker_assembler = None
+
+
+def _init_worker(bank, assembler=None):
+    global _worker_bank, _worker_assembler
+    _worker_bank = bank
+    _worker_assembler = assembler
+
+
+def _generate_chunk(bank, assembler, start, stop, seed, num_questions, professor_name,
+                    output_dir, name_pattern, fmt='text', planned=None):
+    """
+    Samples, renders and writes variants start..stop-1 of a batch. With
+    `planned` (their selections, already drawn) nothing is sampled.
+    """
+    population = range(len(bank))
+    selections = []
+    paths = []
+
+    for index in range(start, stop):
+        rng = variant_rng(seed, index)
+        if planned is not None:
+            indexes = planned[index - start]
+        elif assembler is not None:
+            indexes = assembler.assemble(rng)
+        else:
+            indexes = rng.sample(population, num_questions)
+        path = exam_path(output_dir, index + 1, name_pattern)
+        variant_seed = exam_seed(seed, index) if planned is None and seed_reproduces(assembler) else None
+        write_exam_file(path, (bank[i] for i in indexes), professor_name, fmt, variant_seed)
+        selections.append(indexes)
+        paths.append(path)
+
+    return selections, paths
+
+
+def _generate_chunk_in_worker(*args):
+    return _generate_chunk(_worker_bank, _worker_assembler, *args)
+
+
+def _chunk_bounds(count, workers):
+    """Splits range(count) into a few chunks per worker for load balancing."""
+    chunk_size = max(1, -(-count // (workers * 4)))
+    return [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+
+
+def _generate_parallel(bank, assembler, count, num_questions, professor_name, output_dir, seed,
+                       workers, use_processes, name_pattern, fmt, progress, planned=None):
+    # Imported here: concurrent.futures is the slowest import of a headless run
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    os.makedirs(output_dir, exist_ok=True)
+    job_args = [(start, stop, seed, num_questions, professor_name, output_dir, name_pattern, fmt,
+                 planned[start:stop] if planned is not None else None)
+                for start, stop in _chunk_bounds(count, workers)]
+
+    if use_processes:
+        # Ship the bank to each worker once, not once per chunk
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(bank, assembler))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+    with pool:
+        if use_processes:
+            futures = [pool.submit(_generate_chunk_in_worker, *args) for args in job_args]
+        else:
+            futures = [pool.submit(_generate_chunk, bank, assembler, *args) for args in job_args]
+
+        selections = []
+        paths = []
+        try:
+            for future in futures:
+                chunk_selections, chunk_paths = future.result()
+                selections.extend(chunk_selections)
+                paths.extend(chunk_paths)
+                if progress is not None:
+                    progress(len(paths), count)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return selections, paths
+
+
+def generate_batch(bank, count, num_questions, professor_name, output_dir, seed=None,
+                   workers=1, use_processes=True, name_pattern=None,
+                   progress=None, assembler=None, planner=None, fmt='text', combined=None):
+    """
+    Generates `count` exam variants of `num_questions` questions each into
+    `output_dir`. Returns a dict with the seed used, the written file paths
+    and the selected question indexes of every variant.
+
+    With workers > 1 the variants are rendered and written by a process pool
+    (or a thread pool when use_processes is False); the output is identical
+    to the serial path for the same seed. `progress` is called with
+    (exams written, total) as the batch advances. An `assembler`
+    (exam_assembly.ExamAssembler for this bank) replaces plain sampling
+    with quota-constrained assembly; a `planner`
+    (variant_planner.VariantPlanner) plans the whole batch up front to
+    bound the overlap between variants. `fmt` picks the writer from
+    exam_render.WRITERS and, unless `name_pattern` is given, the file
+    extension. With `combined` (a file path) the whole batch is written
+    to that one document instead of `output_dir`, serially. Exam seeds
+    are left out of the headers when a variant cannot be redrawn from its
+    exam seed alone: with a planner (the plan depends on the whole batch)
+    or an assembler whose draws depend on more than the seed (see
+    exam_sampling.seed_reproduces).
+    """
+    if count <= 0 or num_questions <= 0:
+        raise ValueError("Exam count and questions per exam must be positive.")
+    if num_questions > len(bank):
+        raise ValueError("Requested questions exceed bank size.")
+    if seed is None:
+        seed = new_seed()
+    if name_pattern is None:
+        name_pattern = default_name_pattern(fmt)
+    planned = None
+    if planner is not None:
+        with span("plan_variants", count=count):
+            planned = planner.plan(count, seed)
+
+    if workers > 1 and count > 1 and combined is None:
+        with span("worker_pool", count=count, workers=workers, processes=use_processes):
+            selections, paths = _generate_parallel(bank, assembler, count, num_questions,
+                                                   professor_name, output_dir, seed, workers,
+                                                   use_processes, name_pattern, fmt, progress,
+                                                   planned)
+    else:
+        if planned is not None:
+            selections = planned
+        else:
+            with span("sample_variants", count=count, constrained=assembler is not None):
+                selections = sample_variants(len(bank), count, num_questions, seed, assembler)
+        on_written = (lambda done: progress(done, count)) if progress is not None else None
+        header_seed = seed if planned is None and seed_reproduces(assembler) else None
+        with span("render_and_write", count=count, format=fmt, combined=combined is not None):
+            if combined is not None:
+                paths = write_combined(combined, bank, selections, professor_name, fmt,
+                                       on_written, header_seed)
+            else:
+                paths = write_variants(bank, selections, professor_name, output_dir,
+                                       name_pattern, fmt, on_written, header_seed)
+
+    return {'seed': seed, 'files': paths, 'selections': selections}
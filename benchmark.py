@@ -0,0 +1,340 @@
+"""
+Benchmark suite for loading, sampling, rendering and writing exams.
+
+Synthetic banks are generated (once, then reused) in the V1.0/V2.0
+alternating-line format and the V3.0 '---' format. Every case runs in its
+own child process so peak RSS and allocation counts are not polluted by
+earlier cases, and the results are written to a JSON file that a later run
+can be compared against.
+
+Examples:
+    python benchmark.py --output bench.json
+    python benchmark.py --sizes 1k,100k,10m --output full.json
+    python benchmark.py --output new.json --compare bench.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from bank_parser import QUESTION_DELIMITER
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is reported as null
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = "1k,100k"
+DEFAULT_DATA_DIR = os.path.join(HERE, "bench_data")
+EXAM_QUESTIONS = 20  # Questions per exam in the generate/write cases
+WRITE_COUNT = 200  # Exams written per run of the write case
+TRACE_LIMIT = 1_000_000  # Largest bank measured under tracemalloc (it is slow)
+REGRESSION_THRESHOLD = 0.10  # Slowdown flagged by --compare
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+WORDS = ("memory", "processor", "network", "binary", "compiler", "protocol", "storage",
+         "kernel", "packet", "register", "cache", "thread", "device", "signal", "logic",
+         "system", "address", "database", "router", "virtual", "program", "output")
+
+
+# --- Synthetic banks ---
+def parse_size(text):
+    """'100k' -> 100000"""
+    text = text.strip().lower()
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def bank_paths(data_dir, records):
+    return {
+        'v1': os.path.join(data_dir, f"bank_{records}_v1.txt"),
+        'v3': os.path.join(data_dir, f"bank_{records}_v3.txt"),
+    }
+
+
+def synthetic_records(records, seed=0):
+    rng = random.Random(seed)
+    for number in range(1, records + 1):
+        question = " ".join(rng.choices(WORDS, k=rng.randint(5, 14)))
+        answer = " ".join(rng.choices(WORDS, k=rng.randint(1, 4)))
+        yield f"Question {number}: what is the {question}?", answer.capitalize()
+
+
+def ensure_banks(data_dir, records):
+    """Writes both bank files for a size unless they already exist."""
+    paths = bank_paths(data_dir, records)
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    os.makedirs(data_dir, exist_ok=True)
+    temp_paths = {name: path + ".tmp" for name, path in paths.items()}
+    with open(temp_paths['v1'], 'w', encoding='utf-8') as v1, \
+            open(temp_paths['v3'], 'w', encoding='utf-8') as v3:
+        for question, answer in synthetic_records(records):
+            v1.write(f"{question}\n{answer}\n")
+            v3.write(f"{question}\n{answer}\n{QUESTION_DELIMITER}\n")
+
+    for name, path in paths.items():
+        os.replace(temp_paths[name], path)
+    return paths
+
+
+# --- Cases (run inside the child process) ---
+def _load_script(file_name, module_name):
+    """Imports one of the versioned app scripts, whose file names are not valid module names."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(HERE, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def case_load_v1(paths):
+    v1 = _load_script("Professor_Asistant_v1.0.py", "professor_assistant_v1")
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = v1.load_question_bank(paths['v1'])
+    return len(bank), bank
+
+
+def case_load_v2(paths):
+    v2 = _load_script("Professor_Assistant_v2.0.py", "professor_assistant_v2")
+    # The loader only needs the question_bank attribute, not a Tk window
+    app = types.SimpleNamespace(question_bank=[])
+    count = v2.ProfessorAssistant.load_question_bank(app, paths['v1'])
+    return count, app.question_bank
+
+
+def _generator():
+    from exam_generator import ExamGenerator
+    return ExamGenerator()
+
+
+def case_load_v3(paths):
+    generator = _generator()
+    return generator.load_bank_robust(paths['v3']), generator
+
+
+def case_load_v3_parallel(paths):
+    generator = _generator()
+    return generator.load_bank_parallel(paths['v3']), generator
+
+
+def case_load_v3_compiled(paths):
+    generator = _generator()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        compiled = os.path.join(temp_dir, "bank.qbank")
+        count = generator.load_bank_compiled(paths['v3'], compiled)
+        generator._close_bank()
+    return count, None
+
+
+def _loaded_generator(paths):
+    generator = _generator()
+    generator.load_bank_robust(paths['v3'])
+    return generator
+
+
+def case_generate(paths, generator=None, exams=1000):
+    generator = generator or _loaded_generator(paths)
+    rng = random.Random(1)
+    for _ in range(exams):
+        generator.generate_content(EXAM_QUESTIONS, "Benchmark", rng=rng)
+    return exams, generator
+
+
+def case_write(paths, generator=None):
+    generator = generator or _loaded_generator(paths)
+    output_dir = tempfile.mkdtemp(prefix="bench_exams_")
+    try:
+        generator.generate_batch(WRITE_COUNT, EXAM_QUESTIONS, "Benchmark", output_dir, seed=1)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return WRITE_COUNT, generator
+
+
+def case_export_pdf(paths, generator=None):
+    generator = generator or _loaded_generator(paths)
+    output_dir = tempfile.mkdtemp(prefix="bench_exams_")
+    try:
+        generator.generate_batch(WRITE_COUNT, EXAM_QUESTIONS, "Benchmark", output_dir, seed=1,
+                                 fmt='pdf', combined=os.path.join(output_dir, "exams.pdf"))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return WRITE_COUNT, generator
+
+
+# name -> (function, throughput unit, needs a pre-loaded bank)
+CASES = {
+    'load_v1': (case_load_v1, "questions", False),
+    'load_v2': (case_load_v2, "questions", False),
+    'load_v3': (case_load_v3, "questions", False),
+    'load_v3_parallel': (case_load_v3_parallel, "questions", False),
+    'load_v3_compiled': (case_load_v3_compiled, "questions", False),
+    'generate_content': (case_generate, "exams", True),
+    'write_exams': (case_write, "exams", True),
+    'export_pdf': (case_export_pdf, "exams", True),
+}
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+def run_case(name, paths, records, repeat):
+    """Times one case (best of `repeat`) and measures its memory; returns a result dict."""
+    func, unit, preload = CASES[name]
+    setup = _loaded_generator(paths) if preload else None
+
+    def call():
+        return func(paths, setup) if preload else func(paths)
+
+    best = None
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count, keep = call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        blocks_after = sys.getallocatedblocks()
+        del keep
+    peak_rss = peak_rss_bytes()  # Taken before tracemalloc adds its own overhead
+
+    traced_peak = None
+    if records <= TRACE_LIMIT:
+        tracemalloc.start()
+        count, keep = call()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del keep
+
+    return {
+        'case': name,
+        'records': records,
+        'seconds': best,
+        'items': count,
+        'unit': unit,
+        'throughput': count / best if best else None,
+        'peak_rss_bytes': peak_rss,
+        'retained_blocks': blocks_after - blocks_before,  # Objects kept alive by the result
+        'traced_peak_bytes': traced_peak,
+    }
+
+
+# --- Driver ---
+def run_in_child(name, paths, records, repeat):
+    command = [sys.executable, os.path.abspath(__file__), "--child", name,
+               "--child-paths", json.dumps(paths), "--sizes", str(records),
+               "--repeat", str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        return {'case': name, 'records': records, 'error': error[0]}
+    return json.loads(completed.stdout)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Prints per-case speed ratios against a baseline; returns the number of regressions."""
+    previous = {(r['case'], r['records']): r for r in baseline['results'] if 'seconds' in r}
+    regressions = 0
+    for result in results:
+        old = previous.get((result['case'], result['records']))
+        if old is None or 'seconds' not in result:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"  {result['case']:<18} {result['records']:>10}  {ratio:6.2f}x time{flag}")
+    return regressions
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"{result['case']:<18} {result['records']:>10}  failed: {result['error']}"
+    rss = result['peak_rss_bytes']
+    rss_text = f"{rss / 2 ** 20:8.1f} MB" if rss is not None else "       n/a"
+    return (f"{result['case']:<18} {result['records']:>10}  {result['seconds']:9.4f} s  "
+            f"{result['throughput']:>12,.0f} {result['unit']}/s  peak RSS {rss_text}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark bank loading and exam generation.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated bank sizes, e.g. 1k,100k,10m (default: {DEFAULT_SIZES})")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help="Comma-separated cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per case; the fastest is reported (default: 3)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                        help="Where synthetic banks are generated and reused")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON file the results are written to")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="Earlier results file; exits with 1 if any case got slower")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--child-paths", default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+
+    if args.child is not None:
+        result = run_case(args.child, json.loads(args.child_paths), sizes[0], args.repeat)
+        print(json.dumps(result))
+        return 0
+
+    cases = [case.strip() for case in args.cases.split(",")]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        print(f"Error: Unknown cases: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    results = []
+    for records in sizes:
+        paths = ensure_banks(args.data_dir, records)
+        for case in cases:
+            # Large banks only get one timed run
+            repeat = args.repeat if records <= TRACE_LIMIT else 1
+            result = run_in_child(case, paths, records, repeat)
+            print(format_result(result))
+            results.append(result)
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}.")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        if compare(results, baseline):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
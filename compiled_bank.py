@@ -0,0 +1,213 @@
+"""
+Binary "compiled" question banks that open with mmap in constant time.
+
+File layout (all integers little-endian):
+
+    header   magic, format version, entry count, offset table position,
+             source size, source mtime (ns), source SHA-256, delimiter
+    blobs    UTF-8 question and answer texts, back to back
+    offsets  2 * count + 1 absolute file positions (int64), where entry i's
+             question spans offsets[2i]..offsets[2i+1] and its answer
+             spans offsets[2i+1]..offsets[2i+2]
+
+A compiled file remembers which source .txt it was built from, so it is
+rebuilt automatically when the bank changes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from bank_parser import QUESTION_DELIMITER, iter_bank_file, iter_with_progress
+from question_store import QuestionBank
+
+COMPILED_EXTENSION = ".qbank"
+FORMAT_MAGIC = b"PABANK\x00\x01"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIQQQq32s16s")
+_MTIME_POS = struct.calcsize("<8sIQQQ")  # Where the source mtime is stored
+_OFFSET_ITEMSIZE = 8
+
+
+def compiled_path_for(source_path):
+    """Default location of the compiled file for a source bank."""
+    return os.path.splitext(source_path)[0] + COMPILED_EXTENSION
+
+
+def source_digest(source_path):
+    """SHA-256 of a source bank's bytes."""
+    with open(source_path, 'rb') as file:
+        return hashlib.file_digest(file, 'sha256').digest()
+
+
+def _encode_delimiter(delimiter):
+    encoded = delimiter.encode('utf-8')
+    if len(encoded) > 16:
+        raise ValueError("Delimiter is too long to store in a compiled bank.")
+    return encoded
+
+
+def _read_header(file):
+    raw = file.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError("Not a compiled question bank (file too short).")
+
+    magic, version, count, offsets_pos, size, mtime_ns, digest, delimiter = _HEADER.unpack(raw)
+    if magic != FORMAT_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a compiled question bank (bad magic or version).")
+
+    return {
+        'count': count,
+        'offsets_pos': offsets_pos,
+        'source_size': size,
+        'source_mtime_ns': mtime_ns,
+        'source_digest': digest,
+        'delimiter': delimiter.rstrip(b"\x00").decode('utf-8'),
+    }
+
+
+def compile_bank(source_path, compiled_path=None, delimiter=QUESTION_DELIMITER, progress=None,
+                 digest=None):
+    """
+    Parses a V3.0 text bank once and writes it as a compiled bank.
+    Returns the number of entries written. `progress` is called with the
+    running entry count; `digest` skips re-hashing a source whose
+    SHA-256 the caller already knows.
+    """
+    compiled_path = compiled_path or compiled_path_for(source_path)
+    encoded_delimiter = _encode_delimiter(delimiter)
+    stat = os.stat(source_path)
+    digest = digest or source_digest(source_path)
+
+    offsets = array('q', [_HEADER.size])
+    # A unique name in the target directory: concurrent writers never share a temp file
+    fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(compiled_path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(os.path.abspath(compiled_path)))
+
+    try:
+        with open(fd, 'wb') as out:
+            out.write(b"\x00" * _HEADER.size)
+            position = _HEADER.size
+
+            records = iter_bank_file(source_path, delimiter)
+            for question, answer in iter_with_progress(records, progress):
+                for text in (question, answer):
+                    position += out.write(text.encode('utf-8'))
+                    offsets.append(position)
+
+            # Align the offset table so it can be viewed as int64 in place
+            padding = -position % _OFFSET_ITEMSIZE
+            out.write(b"\x00" * padding)
+            offsets_pos = position + padding
+            offsets.tofile(out)
+
+            count = (len(offsets) - 1) // 2
+            out.seek(0)
+            out.write(_HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, count, offsets_pos,
+                                   stat.st_size, stat.st_mtime_ns, digest, encoded_delimiter))
+
+        os.replace(temp_path, compiled_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return count
+
+
+def is_stale(source_path, compiled_path=None, delimiter=QUESTION_DELIMITER):
+    """
+    True when the compiled file is missing, was built with another delimiter
+    or format version, or no longer matches the source bank. Size and mtime
+    are checked first; the source is only hashed when they differ.
+    """
+    compiled_path = compiled_path or compiled_path_for(source_path)
+    try:
+        with open(compiled_path, 'rb') as file:
+            header = _read_header(file)
+    except (OSError, ValueError):
+        return True
+
+    if header['delimiter'] != delimiter:
+        return True
+
+    stat = os.stat(source_path)
+    if stat.st_size != header['source_size']:
+        return True
+    if stat.st_mtime_ns == header['source_mtime_ns']:
+        return False
+
+    # Touched but possibly unchanged: compare contents, and remember the new
+    # mtime on a match so the next check takes the fast path again
+    if source_digest(source_path) != header['source_digest']:
+        return True
+
+    with open(compiled_path, 'r+b') as file:
+        file.seek(_MTIME_POS)
+        file.write(struct.pack("<q", stat.st_mtime_ns))
+    return False
+
+
+def ensure_compiled(source_path, compiled_path=None, delimiter=QUESTION_DELIMITER, progress=None):
+    """Rebuilds the compiled file if needed and returns its path."""
+    compiled_path = compiled_path or compiled_path_for(source_path)
+    if is_stale(source_path, compiled_path, delimiter):
+        compile_bank(source_path, compiled_path, delimiter, progress)
+    return compiled_path
+
+
+class CompiledQuestionBank(QuestionBank):
+    """
+    Read-only QuestionBank backed by a memory-mapped compiled file. Opening
+    costs the same for any bank size; text is decoded only when an entry is
+    read.
+    """
+
+    def __init__(self, compiled_path):
+        self.path = compiled_path
+        with open(compiled_path, 'rb') as file:
+            header = _read_header(file)
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.delimiter = header['delimiter']
+        start = header['offsets_pos']
+        end = start + (2 * header['count'] + 1) * _OFFSET_ITEMSIZE
+        self._buffer = self._mmap
+        self._offsets = memoryview(self._mmap)[start:end].cast('q')
+
+    def append(self, question, answer):
+        raise TypeError("Compiled question banks are read-only.")
+
+    def clear(self):
+        raise TypeError("Compiled question banks are read-only.")
+
+    def extend_from(self, other, start, stop):
+        raise TypeError("Compiled question banks are read-only.")
+
+    def truncate(self, count):
+        raise TypeError("Compiled question banks are read-only.")
+
+    def nbytes(self):
+        return 0  # Pages are mapped from disk, not allocated
+
+    def mapped_bytes(self):
+        """Size of the mapping, all of which may be resident once read."""
+        return len(self._mmap) if self._mmap is not None else 0
+
+    def __reduce__(self):
+        # Worker processes re-map the file instead of copying its contents
+        return CompiledQuestionBank, (self.path,)
+
+    def close(self):
+        if self._mmap is not None:
+            self._offsets.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,211 @@
+"""
+Duplicate and near-duplicate detection for merged question banks.
+
+Exact duplicates are found by hashing a normalized form of each question
+(case, punctuation and spacing ignored). Near-duplicates use MinHash over
+word and word-pair shingles with locality-sensitive hashing: each question is only
+compared with the first question that shared one of its LSH bands, so the
+work grows linearly with the bank instead of quadratically.
+
+Short technical questions often differ by a single word ("Full form of RAM"
+vs "Full form of ROM"), so a near-duplicate group is only collapsed when
+its answers match too; otherwise it is just reported.
+"""
+import re
+import unicodedata
+import zlib
+
+from question_store import QuestionBank
+
+SIGNATURE_BINS = 8  # One-permutation MinHash signature length
+BAND_ROWS = 2  # Bins per LSH band, so SIGNATURE_BINS // BAND_ROWS bands
+SHINGLE_CACHE_SIZE = 4096  # Shingle sets of recent LSH candidates kept around
+DEFAULT_THRESHOLD = 0.7  # Minimum Jaccard similarity of question shingles
+
+_NON_WORD = re.compile(r"[\W_]+")
+_BIN_BITS = SIGNATURE_BINS.bit_length() - 1
+_BIN_MASK = SIGNATURE_BINS - 1
+
+
+def normalize_text(text):
+    """Case-folded text with punctuation removed and spacing collapsed."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingles(normalized):
+    """
+    Set of CRC-32 hashes of the words and word pairs of a normalized text.
+    Everything runs in C (split, join, crc32), which keeps this cheap
+    enough for million-question banks.
+    """
+    words = normalized.encode('utf-8').split()
+    hashes = set(map(zlib.crc32, words))
+    hashes.update(map(zlib.crc32, map(b" ".join, zip(words, words[1:]))))
+    return hashes
+
+
+def minhash_signature(shingle_hashes):
+    """
+    One-permutation MinHash: the low bits of each hash pick a bin and the
+    smallest remaining value per bin is kept. Empty bins borrow from the
+    next filled bin (rotation densification), so short texts still get a
+    full-length signature.
+    """
+    # Iterating from largest to smallest, the last write per bin is its minimum
+    mins = {h & _BIN_MASK: h >> _BIN_BITS for h in sorted(shingle_hashes, reverse=True)}
+    signature = [mins.get(b) for b in range(SIGNATURE_BINS)]
+
+    if len(mins) < SIGNATURE_BINS:
+        for b in range(SIGNATURE_BINS):
+            if signature[b] is None:
+                for distance in range(1, SIGNATURE_BINS):
+                    borrowed = mins.get((b + distance) & _BIN_MASK)
+                    if borrowed is not None:
+                        signature[b] = borrowed + (distance << 32)
+                        break
+
+    return signature
+
+
+def band_keys(signature):
+    """LSH bucket keys; similar questions share at least one with high probability."""
+    return [hash((band, *signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]))
+            for band in range(SIGNATURE_BINS // BAND_ROWS)]
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            next_item = parent[item]
+            parent[item] = root
+            item = next_item
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # Keep the earliest question as the group representative
+            self.parent[max(first, second)] = min(first, second)
+
+
+def find_duplicates(bank, threshold=DEFAULT_THRESHOLD, near=True):
+    """
+    Scans a bank for duplicate questions. Returns a report dict:
+
+        groups     list of {'keep', 'duplicates', 'kind', 'answers_match',
+                   'questions'} where kind is 'exact' or 'near', 'keep' is
+                   the earliest question of the group and 'questions' holds
+                   the texts of keep + duplicates (indexes refer to the
+                   bank as scanned, before any collapse)
+        removable  number of entries collapse_duplicates would drop
+    """
+    exact_keys = {}  # normalized question -> first index
+    buckets = {}  # LSH band key -> first index that landed there
+    candidate_shingles = {}  # Popular bucket heads are compared against often
+    groups = _DisjointSet()
+    exact_members = set()
+
+    for index in range(len(bank)):
+        normalized = normalize_text(bank.question(index))
+
+        first = exact_keys.setdefault(normalized, index)
+        if first != index:
+            groups.union(first, index)
+            exact_members.add(index)
+            continue
+        if not near or not normalized:
+            continue
+
+        own_shingles = shingles(normalized)
+        for key in band_keys(minhash_signature(own_shingles)):
+            candidate = buckets.setdefault(key, index)
+            if candidate == index or groups.find(candidate) == groups.find(index):
+                continue
+
+            other_shingles = candidate_shingles.get(candidate)
+            if other_shingles is None:
+                if len(candidate_shingles) >= SHINGLE_CACHE_SIZE:
+                    candidate_shingles.clear()
+                other_shingles = shingles(normalize_text(bank.question(candidate)))
+                candidate_shingles[candidate] = other_shingles
+
+            if jaccard(own_shingles, other_shingles) >= threshold:
+                groups.union(candidate, index)
+
+    return _build_report(bank, groups, exact_members)
+
+
+def _build_report(bank, groups, exact_members):
+    members = {}
+    for index in list(groups.parent):
+        members.setdefault(groups.find(index), []).append(index)
+
+    report_groups = []
+    removable = 0
+    for keep in sorted(members):
+        duplicates = sorted(i for i in members[keep] if i != keep)
+        if not duplicates:
+            continue
+
+        answer = normalize_text(bank.answer(keep))
+        answers_match = all(normalize_text(bank.answer(i)) == answer for i in duplicates)
+        kind = 'exact' if all(i in exact_members for i in duplicates) else 'near'
+        report_groups.append({'keep': keep, 'duplicates': duplicates,
+                              'kind': kind, 'answers_match': answers_match,
+                              'questions': [bank.question(i) for i in [keep] + duplicates]})
+        if answers_match:
+            removable += len(duplicates)
+
+    return {'groups': report_groups, 'removable': removable}
+
+
+def dropped_indexes(report):
+    """Sorted indexes collapse_duplicates removes for a report."""
+    return sorted(i for group in report['groups'] if group['answers_match']
+                  for i in group['duplicates'])
+
+
+def collapse_duplicates(bank, report):
+    """
+    Returns a new QuestionBank without the duplicates of every group whose
+    answers match. Kept entries are copied without being decoded.
+    """
+    drop = dropped_indexes(report)
+    collapsed = QuestionBank()
+    start = 0
+    for index in drop:
+        collapsed.extend_from(bank, start, index)
+        start = index + 1
+    collapsed.extend_from(bank, start, len(bank))
+    return collapsed
+
+
+def format_report(report, limit=20):
+    """Human-readable summary of a duplicate report."""
+    groups = report['groups']
+    lines = [f"Found {len(groups)} duplicate groups; {report['removable']} entries can be collapsed."]
+
+    for group in groups[:limit]:
+        note = "" if group['answers_match'] else " (answers differ, kept)"
+        kept, *duplicates = group['questions']
+        lines.append(f"[{group['kind']}] #{group['keep'] + 1}: {kept}{note}")
+        for index, question in zip(group['duplicates'], duplicates):
+            lines.append(f"    #{index + 1}: {question}")
+
+    if len(groups) > limit:
+        lines.append(f"... and {len(groups) - limit} more groups.")
+    return "\n".join(lines)
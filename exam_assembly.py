@@ -0,0 +1,305 @@
+"""
+Constraint-based exam assembly with topic and difficulty quotas.
+
+Bank entries may carry optional metadata lines after the answer:
+
+    What does DNS stand for?
+    Domain Name System
+    Tags: networking, protocols
+    Difficulty: 0.4
+    ---
+
+An exam spec asks for per-tag quotas ("10 networking, 5 os") and optionally
+a target average difficulty between 0 and 1. Every quota is filled by
+distinct questions carrying its tag; a question with several tags counts
+toward the quota it was drawn for.
+
+A TagTable keeps one index bucket per tag, sorted by difficulty. Assembling
+an exam is one O(k) stratified sample per quota, scarcest tag first, plus a
+few bisect-guided swaps inside the same buckets to reach the difficulty
+target. Only when overlapping tags make that greedy draw run out of
+questions does the assembler fall back to an augmenting-path matching of
+quota slots to questions, so tight quotas still succeed whenever they can.
+"""
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+
+from bank_parser import QUESTION_DELIMITER, iter_bank_metadata
+
+DEFAULT_DIFFICULTY = 0.5  # Used for questions without a Difficulty line
+DEFAULT_TOLERANCE = 0.05  # Allowed distance from the target average difficulty
+REPAIR_ROUNDS = 4  # Difficulty swaps tried per question before giving up
+SWAP_PROBES = 8  # Random picks inside a candidate range before scanning it
+
+
+def parse_tags(value):
+    """'Networking, OS ' -> ('networking', 'os')"""
+    return tuple(dict.fromkeys(tag.strip().lower() for tag in value.split(',') if tag.strip()))
+
+
+def parse_quotas(text):
+    """Parses 'networking=10, os=5' into {'networking': 10, 'os': 5}."""
+    quotas = {}
+    for item in text.replace(';', ',').split(','):
+        if not item.strip():
+            continue
+        tag, separator, count = item.partition('=')
+        tag = tag.strip().lower()
+        try:
+            count = int(count)
+        except ValueError:
+            count = -1
+        if not separator or not tag or count < 0:
+            raise ValueError(f"Invalid quota '{item.strip()}'; expected tag=count.")
+        quotas[tag] = quotas.get(tag, 0) + count
+    return quotas
+
+
+class TagTable:
+    """
+    Per-question tags and difficulty, with one difficulty-sorted index
+    bucket per tag (and one for the whole bank under the key None).
+    """
+
+    def __init__(self, metadata=()):
+        self.tags = []  # Tag tuple of each entry
+        self.difficulty = array('d')
+        interned = {}
+
+        for number, record in enumerate(metadata, 1):
+            tags = parse_tags(record.get('tags', ''))
+            self.tags.append(interned.setdefault(tags, tags))
+
+            value = record.get('difficulty')
+            if value is None:
+                self.difficulty.append(DEFAULT_DIFFICULTY)
+                continue
+            try:
+                difficulty = float(value)
+            except ValueError:
+                difficulty = -1.0
+            if not 0.0 <= difficulty <= 1.0:
+                raise ValueError(f"Question {number}: difficulty must be between 0 and 1, got '{value}'.")
+            self.difficulty.append(difficulty)
+
+        self._build_buckets()
+
+    @classmethod
+    def from_file(cls, file_path, delimiter=QUESTION_DELIMITER):
+        return cls(iter_bank_metadata(file_path, delimiter))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def _build_buckets(self):
+        members = {None: range(len(self.tags))}
+        for index, tags in enumerate(self.tags):
+            for tag in tags:
+                members.setdefault(tag, []).append(index)
+
+        difficulty = self.difficulty
+        self.buckets = {}  # tag -> array of entry indexes, easiest first
+        self.bucket_difficulty = {}  # tag -> matching difficulties, for bisect
+        for tag, indexes in members.items():
+            ordered = array('I', sorted(indexes, key=difficulty.__getitem__))
+            self.buckets[tag] = ordered
+            self.bucket_difficulty[tag] = array('d', map(difficulty.__getitem__, ordered))
+
+    def without(self, dropped):
+        """A table with the (sorted) `dropped` entries removed, e.g. after dedup collapse."""
+        dropped = set(dropped)
+        table = TagTable()
+        for index, tags in enumerate(self.tags):
+            if index not in dropped:
+                table.tags.append(tags)
+                table.difficulty.append(self.difficulty[index])
+        table._build_buckets()
+        return table
+
+    def tag_counts(self):
+        """Number of questions per tag, most common first."""
+        counts = {tag: len(bucket) for tag, bucket in self.buckets.items() if tag is not None}
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+class ExamAssembler:
+    """Draws exams of `total` questions that satisfy a spec from a TagTable."""
+
+    def __init__(self, table, total, quotas=None, difficulty=None, tolerance=DEFAULT_TOLERANCE):
+        quotas = {tag.lower(): count for tag, count in (quotas or {}).items() if count > 0}
+        if total > len(table):
+            raise ValueError("Requested questions exceed bank size.")
+        if sum(quotas.values()) > total:
+            raise ValueError(f"Quotas add up to {sum(quotas.values())} questions but the exam has {total}.")
+        for tag, count in quotas.items():
+            available = len(table.buckets.get(tag, ()))
+            if available < count:
+                raise ValueError(f"Quota for '{tag}' needs {count} questions but only {available} are tagged.")
+        if difficulty is not None and not 0.0 <= difficulty <= 1.0:
+            raise ValueError("Target difficulty must be between 0 and 1.")
+
+        self.table = table
+        self.total = total
+        self.difficulty = difficulty
+        self.tolerance = tolerance
+
+        # Scarcest tags first, so they are not starved by overlapping quotas;
+        # the rest of the exam comes from the whole bank (key None)
+        self.plan = sorted(quotas.items(), key=lambda item: (len(table.buckets[item[0]]), item[0]))
+        free = total - sum(quotas.values())
+        if free:
+            self.plan.append((None, free))
+
+    def assemble(self, rng=random):
+        """Returns the entry indexes of one exam, in the order they should appear."""
+        slots = self._stratified(rng)
+        if slots is None:
+            slots = self._matching(rng)
+
+        if self.difficulty is not None:
+            self._repair_difficulty(slots, rng)
+
+        indexes = [index for _, index in slots]
+        rng.shuffle(indexes)
+        return indexes
+
+    def _stratified(self, rng):
+        """Greedy quota fill; returns [(tag, index), ...] or None when a bucket runs dry."""
+        tags = self.table.tags
+        slots = []
+        used = set()
+
+        for tag, count in self.plan:
+            bucket = self.table.buckets[tag]
+            taken = len(used) if tag is None else sum(1 for index in used if tag in tags[index])
+            if len(bucket) - taken < count:
+                return None
+
+            # Oversampling by the already-used members guarantees `count` fresh ones
+            picked = 0
+            for position in rng.sample(range(len(bucket)), min(len(bucket), count + taken)):
+                index = bucket[position]
+                if index not in used:
+                    used.add(index)
+                    slots.append((tag, index))
+                    picked += 1
+                    if picked == count:
+                        break
+
+        return slots
+
+    def _matching(self, rng):
+        """
+        Fills every quota slot with a distinct question via augmenting paths
+        (bipartite matching), which succeeds whenever any assignment exists.
+        """
+        slot_tags = [tag for tag, count in self.plan for _ in range(count)]
+        assignment = [None] * len(slot_tags)  # slot -> entry index
+        owner = {}  # entry index -> slot
+
+        for slot in range(len(slot_tags)):
+            if not self._augment(slot, slot_tags, assignment, owner, rng):
+                tag = slot_tags[slot]
+                raise ValueError(f"Not enough distinct questions to fill the quota for '{tag}'.")
+
+        return list(zip(slot_tags, assignment))
+
+    def _augment(self, root, slot_tags, assignment, owner, rng):
+        buckets = self.table.buckets
+        reached_from = {}  # entry index -> slot it was reached from
+        queue = [root]
+
+        for slot in queue:
+            bucket = buckets[slot_tags[slot]]
+            start = rng.randrange(len(bucket))
+            for offset in range(len(bucket)):
+                index = bucket[(start + offset) % len(bucket)]
+                if index in reached_from:
+                    continue
+                reached_from[index] = slot
+
+                holder = owner.get(index)
+                if holder is not None:
+                    queue.append(holder)
+                    continue
+
+                # Free question: shift every question along the path by one slot
+                while index is not None:
+                    slot = reached_from[index]
+                    previous = assignment[slot]
+                    assignment[slot] = index
+                    owner[index] = slot
+                    index = previous
+                return True
+
+        return False
+
+    def _repair_difficulty(self, slots, rng):
+        """Swaps questions within their own buckets until the average is on target."""
+        difficulty = self.table.difficulty
+        used = {index for _, index in slots}
+        target_sum = self.difficulty * len(slots)
+        allowed = self.tolerance * len(slots)
+        current = sum(difficulty[index] for _, index in slots)
+        stuck = set()  # Slots with no useful swap left
+
+        for _ in range(REPAIR_ROUNDS * len(slots)):
+            gap = target_sum - current
+            if abs(gap) <= allowed:
+                return
+
+            # Move the question furthest from the target in the wrong direction
+            candidates = [s for s in range(len(slots)) if s not in stuck]
+            if not candidates:
+                break
+            pick = min if gap > 0 else max
+            slot = pick(candidates, key=lambda s: difficulty[slots[s][1]])
+            tag, old = slots[slot]
+
+            new = self._swap_candidate(tag, difficulty[old], gap, used, rng)
+            if new is None:
+                stuck.add(slot)
+                continue
+            used.discard(old)
+            used.add(new)
+            slots[slot] = (tag, new)
+            current += difficulty[new] - difficulty[old]
+            stuck.clear()
+
+        if abs(target_sum - current) > allowed:
+            raise ValueError(f"Cannot reach an average difficulty of {self.difficulty:g} "
+                             f"(within {self.tolerance:g}) with these quotas.")
+
+    def _swap_candidate(self, tag, old_difficulty, gap, used, rng):
+        """
+        An unused question from the bucket whose difficulty moves the exam
+        sum toward the target: ideally by at most `gap`, otherwise the
+        smallest overshoot that still reduces the distance.
+        """
+        bucket = self.table.buckets[tag]
+        values = self.table.bucket_difficulty[tag]
+        if gap > 0:
+            low = bisect_right(values, old_difficulty)
+            high = bisect_right(values, old_difficulty + gap)
+            fallback = range(high, min(len(values), high + SWAP_PROBES))
+        else:
+            low = bisect_left(values, old_difficulty + gap)
+            high = bisect_left(values, old_difficulty)
+            fallback = range(low - 1, max(-1, low - 1 - SWAP_PROBES), -1)
+
+        if high > low:
+            for _ in range(SWAP_PROBES):
+                index = bucket[rng.randrange(low, high)]
+                if index not in used:
+                    return index
+            for position in range(low, high):
+                if bucket[position] not in used:
+                    return bucket[position]
+
+        for position in fallback:
+            if abs(gap - (values[position] - old_difficulty)) >= abs(gap):
+                break
+            if bucket[position] not in used:
+                return bucket[position]
+        return None
@@ -0,0 +1,333 @@
+"""
+Headless command-line entry point for generating exams.
+
+Nothing here imports tkinter, so it runs on display-less machines (e.g.
+from cron) and starts in a few tens of milliseconds.
+
+Examples:
+    python exam_cli.py --bank processed_question_bank.txt --count 600 \
+        --questions 20 --output-dir exams --seed 42
+    python exam_cli.py --bank processed_question_bank.txt --questions 20 \
+        --format key --output answer_key.txt
+    python exam_cli.py --bank processed_question_bank.txt --questions 20 \
+        --output exam.txt --with-key
+    python exam_cli.py --from-manifest exam.manifest.json --format key --output -
+    python exam_cli.py --bank processed_question_bank.txt --count 600 \
+        --questions 20 --format pdf --combined exams.pdf --seed 42
+"""
+import argparse
+import os
+import sys
+
+from bank_parser import BANK_FORMATS
+from dedup import format_report
+from exam_assembly import DEFAULT_TOLERANCE, parse_quotas
+from exam_generator import ExamGenerator
+from exam_render import (BINARY_FORMATS, FORMAT_EXTENSIONS, KEY_FORMATS, WRITERS, companion_paths,
+                         format_for_path, load_manifest, manifest_entries, replace_output,
+                         save_manifest)
+from exam_sampling import exam_seed, parse_exam_seed, seed_reproduces
+from instrumentation import PROFILE_MODES, configure_from_env, enable, profile
+from search_index import truncation_note
+from usage_history import DEFAULT_EXCLUDE_DAYS, DEFAULT_HALF_LIFE_DAYS, UsageHistory
+from variant_planner import DEFAULT_WINDOW, overlap_stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate exam variants from a '---' delimited question bank.")
+    parser.add_argument("--bank",
+                        help="Question bank file ('---', alternating lines, CSV, TSV or JSON lines); "
+                             "not needed to re-render a manifest that stores its questions")
+    parser.add_argument("--bank-format", choices=("auto",) + tuple(BANK_FORMATS), default="auto",
+                        help="Format of --bank (default: detected from the file)")
+    parser.add_argument("--load-workers", type=int, default=1,
+                        help="Processes used to parse a large '---' bank; 0 uses every core (default: 1)")
+    parser.add_argument("--count", type=int, default=1,
+                        help="Number of exam variants to generate (default: 1)")
+    parser.add_argument("--questions", type=int, default=None,
+                        help="Number of questions per exam (required unless --search or --from-manifest)")
+    parser.add_argument("--output-dir", default="generated_exams",
+                        help="Directory the exam files are written to")
+    parser.add_argument("--output", default=None, metavar="FILE",
+                        help="Write a single exam to FILE ('-' for stdout) instead of --output-dir")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None,
+                        help="'text' student copy, 'key' answer key, 'json', or the printable "
+                             "'html', 'pdf' and 'docx' (with '_key' for answer keys); by default "
+                             "taken from the --output/--combined file extension, else 'text'")
+    parser.add_argument("--with-key", action="store_true",
+                        help="With --output, also write the answer key (FILE_key.txt, or .html/.pdf/.docx "
+                             "for those formats) and FILE.manifest.json from the same selection")
+    parser.add_argument("--combined", default=None, metavar="FILE",
+                        help="Write the whole batch into the one document FILE, each exam on a new "
+                             "page, instead of --output-dir")
+    parser.add_argument("--from-manifest", default=None, metavar="MANIFEST",
+                        help="Re-render the exam recorded in MANIFEST in --format to --output, "
+                             "from the questions stored in it")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed that makes every variant reproducible; each exam header shows "
+                             "its exam seed SEED/VARIANT")
+    parser.add_argument("--exam-seed", default=None, metavar="SEED/VARIANT",
+                        help="Regenerate the single exam whose header shows this seed, e.g. 42/7 "
+                             "(same bank and options; not for --spread batches)")
+    parser.add_argument("--stream", action="store_true",
+                        help="With --output, sample the bank in one streaming pass instead of loading it")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes used to render and write exams (default: 1)")
+    parser.add_argument("--threads", action="store_true",
+                        help="Use a thread pool instead of a process pool for --workers")
+    parser.add_argument("--dedup", choices=("report", "collapse"), default=None,
+                        help="Check the bank for duplicate questions; 'collapse' also removes them")
+    parser.add_argument("--quota", action="append", default=[], metavar="TAG=N",
+                        help="Questions per exam drawn from a tag, e.g. networking=10 (repeatable)")
+    parser.add_argument("--difficulty", type=float, default=None,
+                        help="Target average difficulty of each exam, between 0 and 1")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed distance from --difficulty (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--spread", action="store_true",
+                        help="Plan the batch so variants overlap as little as possible")
+    parser.add_argument("--max-overlap", type=int, default=None,
+                        help="Most questions any two variants may share (implies --spread)")
+    parser.add_argument("--adjacent-overlap", type=int, default=None,
+                        help="Most questions neighbouring variants may share (implies --spread)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Variants this close in numbering count as neighbours (default: {DEFAULT_WINDOW})")
+    parser.add_argument("--history", default=None, metavar="FILE",
+                        help="Usage ledger (SQLite) to record exams in and to steer sampling away "
+                             "from recently used questions; not with --quota/--difficulty/--spread")
+    parser.add_argument("--term", default=None,
+                        help="Term the exams are recorded under in --history, e.g. 2026-fall")
+    parser.add_argument("--exclude-days", type=float, default=DEFAULT_EXCLUDE_DAYS,
+                        help="Never draw questions used this many days ago or less (default: off)")
+    parser.add_argument("--half-life-days", type=float, default=DEFAULT_HALF_LIFE_DAYS,
+                        help=f"Days for a used question to win back half its weight "
+                             f"(default: {DEFAULT_HALF_LIFE_DAYS})")
+    parser.add_argument("--search", metavar="QUERY", default=None,
+                        help="Search the bank instead of generating exams")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="Maximum number of --search results (default: 20)")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="Write timing spans to FILE (.jsonl for JSON lines, else Chrome trace)")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="Also capture a cProfile dump or tracemalloc report of the run")
+    parser.add_argument("--professor", default=os.environ.get('USERNAME', 'Default Professor'),
+                        help="Name printed in the exam header")
+    return parser
+
+
+def print_search_results(results):
+    for result in results:
+        print(f"#{result['index'] + 1} ({result['score']:.2f}) {result['question']}")
+        print(f"    Answer: {result['answer']}")
+    print(f"{len(results)} results.")
+    note = truncation_note(results)
+    if note:
+        print(note)
+    return 0
+
+
+def stdout_for(fmt):
+    """Standard output as a sink for `fmt`: its byte stream for PDF and DOCX."""
+    if fmt in BINARY_FORMATS:
+        sys.stdout.flush()
+        return sys.stdout.buffer
+    return sys.stdout
+
+
+def seed_note(seed, assembler, label="exam seed"):
+    """' (exam seed S/V)' for the summary line, or nothing when the seed would not reproduce the draw."""
+    return f" ({label} {seed})" if seed_reproduces(assembler) else ""
+
+
+def write_single_exam(generator, args, assembler, history=None):
+    """
+    --output: one exam, identical to variant 1 of a batch with the same
+    seed, or to the exam whose header shows --exam-seed.
+    """
+    seed = exam_seed(args.exam_seed or args.seed)
+    if args.with_key:
+        return write_exam_with_key(generator, args, assembler, seed, history)
+    if args.output == "-":
+        indexes = generator.write_exam(stdout_for(args.format), args.questions, args.professor,
+                                       assembler, args.format, seed=seed)
+    else:
+        with replace_output(args.output, args.format) as f:
+            indexes = generator.write_exam(f, args.questions, args.professor, assembler,
+                                           args.format, seed=seed)
+        print(f"Generated {args.output}{seed_note(seed, assembler)}.")
+
+    if history is not None:
+        generator.record_usage(history, [indexes], args.term)
+    return 0
+
+
+def write_exam_with_key(generator, args, assembler, seed, history=None):
+    """--with-key: student copy, answer key and manifest of one selection."""
+    key_format = KEY_FORMATS[args.format]
+    key_file, manifest_file = companion_paths(args.output, key_format)
+    with replace_output(args.output, args.format) as student, \
+            replace_output(key_file, key_format) as key:
+        manifest = generator.write_exam_set({args.format: student, key_format: key}, args.questions,
+                                            args.professor, assembler, seed=seed)
+    save_manifest(manifest_file, manifest)
+    if history is not None:
+        generator.record_usage(history, [manifest['indexes']], args.term)
+    print(f"Generated {args.output}, {key_file} and {manifest_file}{seed_note(seed, assembler)}.")
+    return 0
+
+
+def write_from_manifest(generator, args, manifest):
+    """--from-manifest: re-renders a recorded exam without sampling again."""
+    if args.output in (None, "-"):
+        generator.write_from_manifest(stdout_for(args.format), manifest, args.format)
+        return 0
+
+    with replace_output(args.output, args.format) as f:
+        generator.write_from_manifest(f, manifest, args.format)
+    print(f"Generated {args.output} from {args.from_manifest}.")
+    return 0
+
+
+def write_streamed_exam(generator, args):
+    """--stream: one exam reservoir-sampled from the bank file without loading it."""
+    bank_format = None if args.bank_format == "auto" else args.bank_format
+    seed = exam_seed(args.exam_seed or args.seed)
+    if args.output == "-":
+        generator.write_streamed_exam(stdout_for(args.format), args.bank, args.questions,
+                                      args.professor, args.format, seed, bank_format)
+        return 0
+
+    with replace_output(args.output, args.format) as f:
+        generator.write_streamed_exam(f, args.bank, args.questions, args.professor,
+                                      args.format, seed, bank_format)
+    print(f"Generated {args.output} (exam seed {seed}).")
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.trace:
+        enable(args.trace)
+    profile_mode = configure_from_env() if args.profile is None else args.profile
+
+    with profile(profile_mode):
+        return run(parser, args)
+
+
+def resolve_format(parser, args):
+    """Sets args.format from the output file's extension when not given; errors on a mismatch."""
+    path = args.output if args.output not in (None, "-") else args.combined
+    inferred = format_for_path(path, None) if path is not None else None
+    if args.format is None:
+        args.format = inferred or 'text'
+    elif inferred is not None and FORMAT_EXTENSIONS[args.format] != FORMAT_EXTENSIONS[inferred]:
+        parser.error(f"--format {args.format} writes {FORMAT_EXTENSIONS[args.format]} files, "
+                     f"but {path} asks for {inferred}")
+
+
+def run(parser, args):
+    resolve_format(parser, args)
+    if args.search is None and args.questions is None and args.from_manifest is None:
+        parser.error("--questions is required unless --search or --from-manifest is given")
+    spread = args.spread or args.max_overlap is not None or args.adjacent_overlap is not None
+    if spread and (args.quota or args.difficulty is not None):
+        parser.error("--quota/--difficulty cannot be combined with overlap planning")
+    if args.history is not None and (spread or args.quota or args.difficulty is not None):
+        parser.error("--history weighting cannot be combined with --quota/--difficulty or overlap planning")
+    if args.output is not None and (args.count != 1 or spread):
+        parser.error("--output writes a single exam; use --output-dir for batches")
+    if args.with_key and (args.output in (None, "-") or args.format not in KEY_FORMATS):
+        parser.error(f"--with-key needs --output FILE and one of the formats {', '.join(KEY_FORMATS)}")
+    if args.combined is not None and (args.output is not None or args.format == "json"):
+        parser.error("--combined writes a batch to one document; not with --output or --format json")
+    if args.exam_seed is not None:
+        if args.output is None:
+            parser.error("--exam-seed regenerates a single exam; give --output")
+        if args.history is not None:
+            parser.error("--exam-seed cannot redraw an exam picked with --history; "
+                         "use --from-manifest with its manifest")
+        try:
+            parse_exam_seed(args.exam_seed)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.stream and (args.output is None or args.with_key or args.history or args.quota
+                        or args.difficulty is not None or args.search or args.from_manifest):
+        parser.error("--stream only writes a plain single exam with --output")
+    if args.bank is None and args.from_manifest is None:
+        parser.error("--bank is required unless --from-manifest is given")
+    generator = ExamGenerator(dedup=args.dedup)
+
+    try:
+        manifest = None
+        if args.from_manifest is not None:
+            manifest = load_manifest(args.from_manifest)
+            if manifest_entries(manifest) is not None:
+                return write_from_manifest(generator, args, manifest)  # Needs no bank
+            if args.bank is None:
+                parser.error("this manifest holds only question indexes; give the --bank it was made from")
+        if args.stream:
+            return write_streamed_exam(generator, args)
+
+        bank_format = None if args.bank_format == "auto" else args.bank_format
+        if args.load_workers != 1 and bank_format in (None, 'delimited'):
+            num_loaded = generator.load_bank_parallel(args.bank, args.load_workers or None)
+        else:
+            num_loaded = generator.load_bank_robust(args.bank, fmt=bank_format)
+        if num_loaded == 0:
+            print(f"Error: Loaded 0 questions from {args.bank} "
+                  f"(read as {BANK_FORMATS[generator.bank_format]}).", file=sys.stderr)
+            return 1
+        if generator.duplicate_report is not None:
+            print(format_report(generator.duplicate_report), file=sys.stderr)
+
+        if args.search is not None:
+            return print_search_results(generator.search_bank(args.search, args.limit))
+        if args.from_manifest is not None:
+            return write_from_manifest(generator, args, manifest)
+
+        assembler = None
+        if args.quota or args.difficulty is not None:
+            assembler = generator.assembler(args.questions, parse_quotas(",".join(args.quota)),
+                                            args.difficulty, args.tolerance)
+
+        history = None
+        if args.history is not None:
+            history = UsageHistory(args.history)
+            assembler = generator.usage_sampler(args.questions, history, args.exclude_days,
+                                                args.half_life_days)
+
+        if args.output is not None:
+            return write_single_exam(generator, args, assembler, history)
+
+        planner = None
+        if spread:
+            planner = generator.planner(args.questions, args.max_overlap,
+                                        args.adjacent_overlap, args.window)
+
+        result = generator.generate_batch(args.count, args.questions, args.professor,
+                                          args.output_dir, args.seed,
+                                          workers=args.workers, use_processes=not args.threads,
+                                          assembler=assembler, planner=planner, fmt=args.format,
+                                          combined=args.combined)
+        if history is not None:
+            generator.record_usage(history, result['selections'], args.term)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.combined is not None:
+        print(f"Generated {args.count} exams in {args.combined}"
+              f"{seed_note(result['seed'], assembler, 'seed')}.")
+    else:
+        print(f"Generated {len(result['files'])} exams in {args.output_dir}"
+              f"{seed_note(result['seed'], assembler, 'seed')}.")
+    if planner is not None:
+        stats = overlap_stats(result['selections'], args.window)
+        print(f"Shared questions between variants: at most {stats['max']} "
+              f"({stats['adjacent_max']} for neighbours), {stats['mean']:.2f} on average.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+"""
+Printable exam exports: HTML, PDF and DOCX.
+
+Each exporter compiles what every exam shares when it is created: the
+HTML page skeleton and stylesheet, the PDF font metrics and resource
+objects, the DOCX package parts and paragraph templates. get_exporter()
+keeps one exporter per format for the life of the process, so a batch of
+thousands of exams (or each worker of a parallel batch) compiles them
+once. Documents are streamed: a PDF page or a few dozen HTML/DOCX
+paragraphs are built at a time and written out. write_document() puts
+any number of exams into one file, each starting on a new page.
+
+Only the standard library is used. PDFs use the built-in Helvetica
+fonts instead of embedding one, so characters outside Windows-1252 print
+as '?'. Output contains no timestamps: the same exam seed gives the same
+bytes.
+"""
+import functools
+import re
+import zipfile
+import zlib
+from array import array
+from html import escape as html_escape
+from xml.sax.saxutils import escape as xml_escape
+
+from exam_render import ANSWER_BLANK, WRITE_CHUNK_SIZE, _sink_writer
+
+TITLES = {False: "EXAM (STUDENT COPY)", True: "EXAM (ANSWER KEY)"}
+
+
+def exam_title(professor_name, key=False):
+    return f"{TITLES[key]} - Created by Professor {professor_name}"
+
+
+def _binary_writer(out):
+    """The bytes-writing function of a binary sink (file opened 'wb', BytesIO, socket)."""
+    if hasattr(out, 'sendall'):
+        return out.sendall
+    if hasattr(out, 'write') and not hasattr(out, 'encoding'):
+        return out.write
+    raise TypeError(f"Cannot write a binary document to {type(out).__name__!r}; "
+                    f"open the file in binary mode (see exam_render.open_output).")
+
+
+class _Exporter:
+    """Shared interface: write() for one exam, write_document() for many."""
+
+    extension = ""
+    binary = False  # Written to files opened in binary mode
+
+    def __init__(self, key=False):
+        self.key = key
+
+    def answer(self, pair):
+        return pair['answer'] if self.key else ANSWER_BLANK
+
+    def write(self, out, selected, professor_name, seed=None):
+        self.write_document(out, [(selected, professor_name, seed)])
+
+    def write_document(self, out, exams):
+        """Streams (selected, professor_name, seed) exams into one document."""
+        raise NotImplementedError
+
+
+# --- HTML ---
+HTML_STYLE = """\
+body { font-family: Arial, Helvetica, sans-serif; font-size: 12pt; margin: 2em; }
+h1 { font-size: 16pt; margin-bottom: 0.2em; }
+.seed { color: #666; font-size: 9pt; margin: 0; }
+.question { margin: 1.2em 0 0.3em; break-inside: avoid; page-break-inside: avoid; }
+.answer { margin: 0; }
+.exam + .exam { break-before: page; page-break-before: always; }
+@page { margin: 2cm; }
+"""
+HTML_PAGE_START = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+{style}</style>
+</head>
+<body>
+"""
+HTML_EXAM_START = '<section class="exam">\n<h1>{title}</h1>\n{seed_line}<hr>\n'
+HTML_SEED_LINE = '<p class="seed">Exam seed: {seed}</p>\n'
+HTML_QUESTION = ('<div class="question"><p><b>Question {number}:</b> {question}</p>'
+                 '<p class="answer">Answer: {answer}</p></div>\n')
+HTML_EXAM_END = "</section>\n"
+HTML_PAGE_END = "</body>\n</html>\n"
+
+
+class HtmlExporter(_Exporter):
+    extension = ".html"
+
+    def __init__(self, key=False):
+        super().__init__(key)
+        self._page_start = HTML_PAGE_START.format(title=TITLES[key], style=HTML_STYLE)
+        self._exam_start = HTML_EXAM_START.format
+        self._question = HTML_QUESTION.format
+
+    def write_document(self, out, exams):
+        write = _sink_writer(out)
+        pending = [self._page_start]
+        size = 0
+        for selected, professor_name, seed in exams:
+            seed_line = HTML_SEED_LINE.format(seed=html_escape(seed)) if seed is not None else ""
+            pending.append(self._exam_start(title=html_escape(exam_title(professor_name, self.key)),
+                                            seed_line=seed_line))
+            for number, pair in enumerate(selected, 1):
+                text = self._question(number=number, question=html_escape(pair['question']),
+                                      answer=html_escape(self.answer(pair)))
+                pending.append(text)
+                size += len(text)
+                if size >= WRITE_CHUNK_SIZE:
+                    write("".join(pending))
+                    pending = []
+                    size = 0
+            pending.append(HTML_EXAM_END)
+        pending.append(HTML_PAGE_END)
+        write("".join(pending))
+
+
+# --- PDF ---
+PAGE_WIDTH = 612  # US Letter, in points
+PAGE_HEIGHT = 792
+MARGIN = 72
+BODY_SIZE = 11
+TITLE_SIZE = 14
+SMALL_SIZE = 9
+LINE_SPACING = 1.35  # Leading as a multiple of the font size
+QUESTION_GAP = 10  # Points between questions
+PDF_COMPRESSION = 6
+
+# Advance widths (1/1000 em) of characters 32..126 of the standard fonts
+_HELVETICA_WIDTHS = (
+    "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 556 556 556 556 556 556 "
+    "556 556 556 556 278 278 584 584 584 556 1015 667 667 722 722 667 611 778 722 278 500 667 "
+    "556 833 722 778 667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556 333 556 "
+    "556 500 556 556 278 556 556 222 222 500 222 833 556 556 556 556 333 500 278 556 500 722 "
+    "500 500 500 334 260 334 584")
+_HELVETICA_BOLD_WIDTHS = (
+    "278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 556 556 556 556 556 556 "
+    "556 556 556 556 333 333 584 584 584 611 975 722 722 722 722 667 611 778 722 278 556 722 "
+    "611 833 722 778 667 778 722 667 611 722 667 944 667 667 611 333 278 333 584 556 333 556 "
+    "611 556 611 556 333 611 611 278 278 556 278 889 611 611 611 611 389 556 333 611 556 778 "
+    "556 556 500 389 280 389 584")
+_FONTS = {'F1': ("Helvetica", _HELVETICA_WIDTHS), 'F2': ("Helvetica-Bold", _HELVETICA_BOLD_WIDTHS)}
+_DEFAULT_WIDTH = 556  # Characters above 126, close enough for line breaking
+
+_CATALOG = 1  # Object numbers fixed by the writer
+_PAGES = 2
+_FIRST_FONT = 3
+
+
+@functools.lru_cache(maxsize=None)
+def font_widths(font):
+    """Advance widths of the 256 Windows-1252 codes of a standard font ('F1' or 'F2')."""
+    widths = array('H', [_DEFAULT_WIDTH]) * 256
+    for code, width in enumerate(_FONTS[font][1].split(), 32):
+        widths[code] = int(width)
+    return widths
+
+
+def _pdf_text(text):
+    """Text as a Windows-1252 byte string, unencodable characters as '?'."""
+    return text.encode('cp1252', 'replace')
+
+
+def _pdf_string(data):
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class _PdfLayout:
+    """Compiled fonts and page geometry shared by every document of an exporter."""
+
+    def __init__(self):
+        self.widths = {font: font_widths(font) for font in _FONTS}
+        self.font_objects = [
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+            % name.encode('ascii') for name, _ in _FONTS.values()]
+        resources = b" ".join(b"/%s %d 0 R" % (font.encode('ascii'), _FIRST_FONT + i)
+                              for i, font in enumerate(_FONTS))
+        self.page_object = (b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                            b"/Resources << /Font << " % (_PAGES, PAGE_WIDTH, PAGE_HEIGHT)
+                            + resources + b" >> >> /Contents %d 0 R >>")
+        self.text_width = PAGE_WIDTH - 2 * MARGIN
+
+    def wrap(self, data, font, size, indent=0):
+        """Splits an encoded line into lines that fit the text width."""
+        widths = self.widths[font]
+        limit = (self.text_width - indent) * 1000 / size
+        space = widths[32]
+        lines = []
+        line = []
+        used = 0
+        for word in data.split(b" "):
+            width = sum(map(widths.__getitem__, word))
+            while width > limit:  # A word longer than a line is broken anywhere
+                if line:
+                    lines.append(b" ".join(line))
+                    line, used = [], 0
+                cut = 1
+                taken = widths[word[0]]
+                while cut < len(word) and taken + widths[word[cut]] <= limit:
+                    taken += widths[word[cut]]
+                    cut += 1
+                lines.append(word[:cut])
+                word = word[cut:]
+                width -= taken
+            if line and used + space + width > limit:
+                lines.append(b" ".join(line))
+                line, used = [], 0
+            if line:
+                used += space
+            line.append(word)
+            used += width
+        lines.append(b" ".join(line))
+        return lines
+
+
+class _PdfDocument:
+    """Writes PDF objects to a sink as pages are finished; the page tree goes last."""
+
+    def __init__(self, write, layout):
+        self._write = write
+        self._layout = layout
+        self._pending = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+        self._size = len(self._pending[0])
+        self._offset = 0
+        self._xref = {}  # Object number -> byte offset
+        self._next_object = _FIRST_FONT + len(_FONTS)
+        self._pages = []
+        for number, body in enumerate(layout.font_objects, _FIRST_FONT):
+            self._object(number, body)
+
+    def _emit(self, data):
+        self._pending.append(data)
+        self._size += len(data)
+        if self._size >= WRITE_CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        data = b"".join(self._pending)
+        self._write(data)
+        self._offset += len(data)
+        self._pending = []
+        self._size = 0
+
+    def _object(self, number, body):
+        self._xref[number] = self._offset + self._size
+        self._emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def add_page(self, content):
+        stream = zlib.compress(content, PDF_COMPRESSION)
+        content_number = self._next_object
+        page_number = content_number + 1
+        self._next_object += 2
+        self._object(content_number, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream)
+                     + stream + b"\nendstream")
+        self._object(page_number, self._layout.page_object % content_number)
+        self._pages.append(page_number)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % number for number in self._pages)
+        self._object(_PAGES, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self._pages))
+        self._object(_CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES)
+        xref_start = self._offset + self._size
+        count = self._next_object
+        entries = [b"xref\n0 %d\n0000000000 65535 f \n" % count]
+        entries.extend(b"%010d 00000 n \n" % self._xref[number] for number in range(1, count))
+        entries.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                       % (count, _CATALOG, xref_start))
+        self._emit(b"".join(entries))
+        self._flush()
+
+
+class _PdfPage:
+    """Content stream of one page being laid out top to bottom."""
+
+    def __init__(self, footer):
+        self.y = PAGE_HEIGHT - MARGIN
+        self.ops = [b"BT\n"]
+        self.empty = True
+        self.footer = footer
+
+    def fits(self, height):
+        return self.y - height >= MARGIN
+
+    def text(self, data, font, size, x=MARGIN, same_line=False):
+        if not same_line:
+            self.y -= size * LINE_SPACING
+        self.ops.append(b"/%s %d Tf 1 0 0 1 %.2f %.2f Tm %s Tj\n"
+                        % (font.encode('ascii'), size, x, self.y, _pdf_string(data)))
+        self.empty = False
+
+    def rule(self):
+        self.y -= 6
+        self.ops.append(b"ET\n%d %.2f m %d %.2f l 0.5 w S\nBT\n"
+                        % (MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y))
+        self.y -= 6
+
+    def content(self, number):
+        footer = _pdf_text(f"{self.footer}Page {number}")
+        self.ops.append(b"/F1 %d Tf 1 0 0 1 %d %d Tm %s Tj\nET\n"
+                        % (SMALL_SIZE, MARGIN, MARGIN // 2, _pdf_string(footer)))
+        return b"".join(self.ops)
+
+
+class PdfExporter(_Exporter):
+    extension = ".pdf"
+    binary = True
+
+    def __init__(self, key=False):
+        super().__init__(key)
+        self.layout = _PdfLayout()
+        self._bold_widths = font_widths('F2')
+
+    def write_document(self, out, exams):
+        document = _PdfDocument(_binary_writer(out), self.layout)
+        for selected, professor_name, seed in exams:
+            self._write_exam(document, selected, professor_name, seed)
+        document.close()
+
+    def _write_exam(self, document, selected, professor_name, seed):
+        wrap = self.layout.wrap
+        footer = f"Exam seed {seed} - " if seed is not None else ""
+        page = _PdfPage(footer)
+        page_count = 0
+
+        for line in wrap(_pdf_text(exam_title(professor_name, self.key)), 'F2', TITLE_SIZE):
+            page.text(line, 'F2', TITLE_SIZE)
+        if seed is not None:
+            page.text(_pdf_text(f"Exam seed: {seed}"), 'F1', SMALL_SIZE)
+        page.rule()
+
+        line_height = BODY_SIZE * LINE_SPACING
+        for number, pair in enumerate(selected, 1):
+            label = b"Question %d: " % number
+            indent = sum(map(self._bold_widths.__getitem__, label)) * BODY_SIZE / 1000
+            question = wrap(_pdf_text(pair['question']), 'F1', BODY_SIZE, indent)
+            answer = wrap(_pdf_text("Answer: " + self.answer(pair)), 'F1', BODY_SIZE)
+            block = len(question) + len(answer)
+            # Keep a question on one page unless it is longer than a page
+            if not page.fits(block * line_height + QUESTION_GAP) and not page.empty:
+                page_count += 1
+                document.add_page(page.content(page_count))
+                page = _PdfPage(footer)
+            page.y -= QUESTION_GAP
+
+            for position, line in enumerate(question + answer):
+                if not page.fits(line_height):
+                    page_count += 1
+                    document.add_page(page.content(page_count))
+                    page = _PdfPage(footer)
+                if position == 0:
+                    page.text(label, 'F2', BODY_SIZE)
+                    page.text(line, 'F1', BODY_SIZE, MARGIN + indent, same_line=True)
+                elif position < len(question):
+                    page.text(line, 'F1', BODY_SIZE, MARGIN + indent)
+                else:
+                    page.text(line, 'F1', BODY_SIZE)
+
+        page_count += 1
+        document.add_page(page.content(page_count))
+
+
+# --- DOCX ---
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)  # Fixed, so equal exams give equal files
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>')
+DOCX_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>')
+DOCX_BODY_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+DOCX_BODY_END = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/><w:pgMar w:top="1440" w:right="1440" '
+    'w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+    '</w:body></w:document>')
+DOCX_TITLE = ('<w:p><w:r><w:rPr><w:b/><w:sz w:val="28"/></w:rPr>'
+              '<w:t xml:space="preserve">{text}</w:t></w:r></w:p>')
+DOCX_SEED_LINE = ('<w:p><w:r><w:rPr><w:color w:val="666666"/><w:sz w:val="18"/></w:rPr>'
+                  '<w:t xml:space="preserve">Exam seed: {seed}</w:t></w:r></w:p>')
+DOCX_RULE = ('<w:p><w:pPr><w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/>'
+             '</w:pBdr></w:pPr></w:p>')
+DOCX_QUESTION = ('<w:p><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="60"/></w:pPr>'
+                 '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Question {number}: </w:t></w:r>'
+                 '<w:r><w:t xml:space="preserve">{question}</w:t></w:r></w:p>'
+                 '<w:p><w:r><w:t xml:space="preserve">Answer: {answer}</w:t></w:r></w:p>')
+DOCX_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def _xml_text(text):
+    return xml_escape(_INVALID_XML.sub("", text))
+
+
+class _Unseekable:
+    """File-like wrapper so zipfile can stream into a socket or other unseekable sink."""
+
+    def __init__(self, write):
+        self._write = write
+
+    def write(self, data):
+        self._write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class DocxExporter(_Exporter):
+    extension = ".docx"
+    binary = True
+
+    def __init__(self, key=False):
+        super().__init__(key)
+        self._static_parts = [('[Content_Types].xml', DOCX_CONTENT_TYPES.encode('utf-8')),
+                              ('_rels/.rels', DOCX_RELATIONSHIPS.encode('utf-8'))]
+        self._title = DOCX_TITLE.format
+        self._question = DOCX_QUESTION.format
+
+    def _part(self, name):
+        info = zipfile.ZipInfo(name, date_time=_ZIP_DATE)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def write_document(self, out, exams):
+        write = _binary_writer(out)  # Rejects text sinks before anything is written
+        if not (hasattr(out, 'seekable') and out.seekable()):
+            out = _Unseekable(write)
+        with zipfile.ZipFile(out, 'w') as package:
+            for name, data in self._static_parts:
+                package.writestr(self._part(name), data)
+            with package.open(self._part('word/document.xml'), 'w') as document:
+                self._write_body(document, exams)
+
+    def _write_body(self, document, exams):
+        pending = [DOCX_BODY_START]
+        size = 0
+        for position, (selected, professor_name, seed) in enumerate(exams):
+            if position:
+                pending.append(DOCX_PAGE_BREAK)
+            pending.append(self._title(text=_xml_text(exam_title(professor_name, self.key))))
+            if seed is not None:
+                pending.append(DOCX_SEED_LINE.format(seed=_xml_text(seed)))
+            pending.append(DOCX_RULE)
+            for number, pair in enumerate(selected, 1):
+                text = self._question(number=number, question=_xml_text(pair['question']),
+                                      answer=_xml_text(self.answer(pair)))
+                pending.append(text)
+                size += len(text)
+                if size >= WRITE_CHUNK_SIZE:
+                    document.write("".join(pending).encode('utf-8'))
+                    pending = []
+                    size = 0
+        pending.append(DOCX_BODY_END)
+        document.write("".join(pending).encode('utf-8'))
+
+
+# Output format name -> (exporter class, answer key?)
+EXPORT_FORMATS = {
+    'html': (HtmlExporter, False),
+    'html_key': (HtmlExporter, True),
+    'pdf': (PdfExporter, False),
+    'pdf_key': (PdfExporter, True),
+    'docx': (DocxExporter, False),
+    'docx_key': (DocxExporter, True),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_exporter(fmt):
+    """The process-wide exporter of a format, compiled on first use."""
+    try:
+        exporter_class, key = EXPORT_FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}.")
+    return exporter_class(key)
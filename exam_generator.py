@@ -0,0 +1,665 @@
+"""
+Exam generation logic shared by the Professor Assistant apps.
+
+This module holds the decoupled (non-GUI) logic of V3.0 so it can be
+imported without tkinter.
+"""
+import random
+
+from bank_parser import QUESTION_DELIMITER, detect_format, iter_bank_file, iter_with_progress
+from bank_reindex import BankIndex
+from batch_generator import generate_batch
+from compiled_bank import COMPILED_EXTENSION, CompiledQuestionBank, ensure_compiled, source_digest
+from dedup import DEFAULT_THRESHOLD, collapse_duplicates, dropped_indexes, find_duplicates
+from exam_assembly import DEFAULT_TOLERANCE, ExamAssembler, TagTable
+from exam_render import WRITERS, make_manifest, manifest_entries, output_buffer, render
+from exam_sampling import exam_rng, exam_seed, reservoir_sample, sample_indexes, seed_reproduces
+from instrumentation import count, span
+from parallel_parse import parse_parallel
+from parse_cache import default_cache
+from question_store import QuestionBank
+from search_index import (SearchIndex, SearchResults, index_is_fresh, index_path_for, index_metadata,
+                          load_fresh_index)
+from usage_history import (DEFAULT_EXCLUDE_DAYS, DEFAULT_HALF_LIFE_DAYS, UsageSampler, question_key,
+                           usage_weight)
+from variant_planner import DEFAULT_WINDOW, VariantPlanner
+
+
+class ExamGenerator:
+    """Handles all data loading, parsing, and random selection logic."""
+
+    def __init__(self, delimiter=QUESTION_DELIMITER, cache=None, dedup=None, search=False):
+        self.question_bank = QuestionBank()
+        self.bank_path = None
+        self.bank_format = None  # Key of bank_parser.BANK_FORMATS for the loaded file
+        self.delimiter = delimiter
+        self.cache = cache  # ParseCache; the shared default one when None
+        self.dedup = dedup  # None, 'report' or 'collapse': duplicate check after every load
+        self.duplicate_report = None
+        self.search = search  # Build the search index on load instead of on first query
+        self.search_index = None
+        self._parsed_index = None  # Search index fed by the last parse, until the load finishes
+        self._tag_table = None  # Built from the bank's metadata lines on first use
+        self._owns_bank = True
+        self._bank_index = None  # Block checksums of the last incremental load
+        self.reload_stats = None
+        self._bank_digest = None  # SHA-256 of the bank file, computed for the first manifest
+        self._question_keys = None  # usage_history.question_key() of every entry, on first use
+        self._usage_sampler = None  # (history path, exclude days, half-life, sampler) between exams
+
+    def iter_bank(self, file_path, fmt=None):
+        """
+        Streams question/answer records from a bank file one at a time,
+        without loading the whole file into memory.
+        """
+        for question, answer in self._iter_pairs(file_path, fmt):
+            yield {'question': question, 'answer': answer}
+
+    def detect_format(self, file_path):
+        """The bank_parser.BANK_FORMATS key of a bank file, sniffed from its first few KB."""
+        try:
+            return detect_format(file_path, self.delimiter)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+    def _iter_pairs(self, file_path, fmt=None):
+        """Streams (question, answer) tuples, wrapping parse errors."""
+        try:
+            yield from iter_bank_file(file_path, self.delimiter, fmt)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+        except Exception as e:
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+    def load_bank_robust(self, file_path, progress=None, fmt=None):
+        """
+        Loads questions using a specific delimiter, making the parser
+        more robust than the V2.0 alternating line method. Banks in the
+        other bank_parser.BANK_FORMATS are detected and parsed in the same
+        single pass unless `fmt` names the format.
+        `progress`, if given, is called with the running record count.
+        """
+        self._close_bank()
+        fmt = fmt or self.detect_format(file_path)
+        pairs = self._iter_pairs(file_path, fmt)
+        index = self._index_while_parsing(file_path)
+        if index is not None:
+            pairs = _indexed(pairs, index)
+        with span("parse", loader="robust", path=file_path, format=fmt):
+            self.question_bank = QuestionBank(iter_with_progress(pairs, progress))
+
+        self.bank_format = fmt
+        self._parsed_index = index
+        return self._finish_load(file_path)
+
+    def load_bank_parallel(self, file_path, workers=None, progress=None):
+        """
+        Parses a large '---' bank across a process pool (`workers`
+        processes, all cores by default) into the same bank
+        load_bank_robust would build. Other formats get a normal parse.
+        """
+        if file_path.endswith(COMPILED_EXTENSION):
+            return self.load_bank_compiled(file_path, progress=progress)
+        if not self._is_delimited(file_path):
+            return self.load_bank_robust(file_path, progress)
+
+        self._close_bank()
+        try:
+            with span("parse", loader="parallel", path=file_path, workers=workers):
+                self.question_bank = parse_parallel(file_path, workers, self.delimiter, progress)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+        except Exception as e:
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+        self.bank_format = 'delimited'
+        return self._finish_load(file_path)
+
+    def _is_delimited(self, file_path):
+        return file_path.endswith(COMPILED_EXTENSION) or self.detect_format(file_path) == 'delimited'
+
+    def load_bank_compiled(self, file_path, compiled_path=None, progress=None):
+        """
+        Opens the compiled (.qbank) form of a bank with mmap, compiling it
+        first if it is missing or older than the source file. Falls back to
+        a normal parse when the compiled file cannot be written or the bank
+        is not in the '---' format.
+        """
+        if not self._is_delimited(file_path):
+            return self.load_bank_robust(file_path, progress)
+
+        self._close_bank()
+        try:
+            with span("parse", loader="compiled", path=file_path):
+                if file_path.endswith(COMPILED_EXTENSION):
+                    compiled_path = file_path
+                else:
+                    compiled_path = ensure_compiled(file_path, compiled_path, self.delimiter, progress)
+
+                self.question_bank = CompiledQuestionBank(compiled_path)
+                self.bank_format = 'delimited'
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+        except PermissionError:
+            return self.load_bank_robust(file_path, progress)
+        except Exception as e:
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+        return self._finish_load(file_path)
+
+    def load_bank_cached(self, file_path, progress=None):
+        """
+        Loads a bank through the content-addressed parse cache: reloading an
+        unchanged file reuses the earlier parse, while any edit is picked up.
+        Only '---' banks are cached; other formats get a normal parse.
+        """
+        if file_path.endswith(COMPILED_EXTENSION):
+            return self.load_bank_compiled(file_path, progress=progress)
+        if not self._is_delimited(file_path):
+            return self.load_bank_robust(file_path, progress)
+
+        self._close_bank()
+        cache = self.cache or default_cache()
+        try:
+            with span("parse", loader="cached", path=file_path):
+                self.question_bank = cache.load(file_path, self.delimiter, progress)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}")
+        except PermissionError:
+            return self.load_bank_robust(file_path, progress)
+        except Exception as e:
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+        self._owns_bank = False  # Shared with the cache's memo
+        self.bank_format = 'delimited'
+        return self._finish_load(file_path, cache)
+
+    def load_bank_incremental(self, file_path, progress=None):
+        """
+        Loads a bank and remembers its block boundaries and checksums, so
+        calling this again for the same file after it was appended to or
+        edited re-parses only the blocks that changed. `reload_stats` tells
+        which path was taken. Banks not in the '---' format are parsed in
+        full every time.
+        """
+        if not self._is_delimited(file_path):
+            return self.load_bank_robust(file_path, progress)
+
+        index = self._bank_index
+        try:
+            with span("parse", loader="incremental", path=file_path) as s:
+                if index is not None and index.matches(file_path, self.delimiter):
+                    self.question_bank, self.reload_stats = index.refresh(self.question_bank, progress)
+                else:
+                    self._close_bank()
+                    index = BankIndex(file_path, self.delimiter)
+                    self.question_bank = index.build(progress)
+                    self._bank_index = index
+                    self.reload_stats = {'mode': 'full', 'parsed': len(index.checksums), 'reused': 0}
+                s.set(**self.reload_stats)
+            self.bank_format = 'delimited'
+
+        except FileNotFoundError:
+            self._close_bank()
+            raise FileNotFoundError(f"File not found: {file_path}")
+        except Exception as e:
+            self._close_bank()
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+        return self._finish_load(file_path)
+
+    def find_duplicates(self, threshold=DEFAULT_THRESHOLD):
+        """Reports exact and near-duplicate questions in the loaded bank."""
+        return find_duplicates(self.question_bank, threshold)
+
+    def _finish_load(self, file_path, cache=None):
+        """
+        Runs the load-time duplicate check (its report is kept in `cache`
+        for banks loaded through it) and search index upkeep, then returns
+        the bank size.
+        """
+        self.bank_path = file_path
+        self.duplicate_report = None
+        self._tag_table = None
+        self._bank_digest = None
+        self._question_keys = None
+        self._usage_sampler = None
+        if self.dedup in ('report', 'collapse'):
+            with span("dedup", mode=self.dedup, cached=cache is not None) as s:
+                if cache is not None:
+                    self.duplicate_report = cache.duplicate_report(file_path, self.question_bank,
+                                                                   self.delimiter)
+                else:
+                    self.duplicate_report = find_duplicates(self.question_bank)
+                s.set(removable=self.duplicate_report['removable'])
+            if self.dedup == 'collapse':
+                self._collapse()
+
+        self._refresh_search_index()
+        count("questions_loaded", len(self.question_bank))
+        return len(self.question_bank)
+
+    # --- Full-text search ---
+    def _search_settings(self):
+        """Load settings that change entry numbering, recorded with a saved index."""
+        return {'delimiter': self.delimiter, 'collapsed': self.dedup == 'collapse'}
+
+    def _refresh_search_index(self):
+        index = self.search_index
+        stats = self.reload_stats
+        if index is not None and stats and stats['mode'] == 'append':
+            # Only the tail of the bank changed: re-index just that part
+            index.truncate(stats['kept_records'])
+            index.update(self.question_bank)
+            self._save_search_index()
+        else:
+            self.search_index = None
+            parsed, self._parsed_index = self._parsed_index, None
+            if parsed is not None and len(parsed) == len(self.question_bank):
+                self.search_index = parsed
+                self._save_search_index()
+            elif self.search:
+                self.ensure_search_index()
+
+    def _index_while_parsing(self, file_path):
+        """
+        With `search` on, a new index for the parser to feed record by
+        record, unless a fresh one is saved next to the bank or the load
+        will collapse duplicates (which renumbers the entries).
+        """
+        if not self.search or self.dedup == 'collapse':
+            return None
+        if index_is_fresh(file_path, self._search_settings()):
+            return None
+        return SearchIndex()
+
+    def _save_search_index(self):
+        if self.bank_path is None:
+            return
+        try:
+            # Reuse a digest this load already has rather than hash the file again
+            if self._bank_index is not None:
+                digest = self._bank_index.file_digest()
+            else:
+                digest = ('sha256', self.bank_digest())
+            metadata = index_metadata(self.bank_path, self._search_settings(), digest)
+            self.search_index.save(index_path_for(self.bank_path), metadata)
+        except OSError:
+            pass  # Read-only location: the index just isn't persisted
+
+    def ensure_search_index(self, progress=None):
+        """
+        Returns a search index for the loaded bank: the one saved next to
+        the bank file if it is still fresh, otherwise a newly built (and
+        saved) one.
+        """
+        index = self.search_index
+        if index is not None and len(index) == len(self.question_bank):
+            return index
+
+        index = None
+        if self.bank_path is not None:
+            index = load_fresh_index(self.bank_path, self._search_settings())
+
+        if index is None or len(index) != len(self.question_bank):
+            index = SearchIndex()
+            with span("search_index", entries=len(self.question_bank)):
+                index.update(self.question_bank, progress)
+            self.search_index = index
+            self._save_search_index()
+
+        self.search_index = index
+        return index
+
+    def search_bank(self, query, limit=20):
+        """
+        BM25-ranked search over questions and answers. Returns dicts with
+        'index', 'score', 'question' and 'answer', best match first, as
+        search_index.SearchResults (see its `truncated`).
+        """
+        hits = self.ensure_search_index().search(query, limit)
+        results = SearchResults(truncated=hits.truncated)
+        for index, score in hits:
+            question, answer = self.question_bank.pair(index)
+            results.append({'index': index, 'score': score, 'question': question, 'answer': answer})
+        return results
+
+    # --- Constrained assembly ---
+    def tag_table(self):
+        """
+        Tags and difficulty of every loaded question, read from the bank's
+        metadata lines on first use and kept until the next load.
+        """
+        if self._tag_table is not None:
+            return self._tag_table
+        if self.bank_path is None:
+            raise ValueError("No question bank loaded.")
+        if self.bank_path.endswith(COMPILED_EXTENSION):
+            raise ValueError("Compiled banks do not keep tags; load the source file instead.")
+        if self.bank_format != 'delimited':
+            raise ValueError("Only '---' delimited banks carry tags and difficulty.")
+
+        try:
+            with span("tag_table", path=self.bank_path):
+                table = TagTable.from_file(self.bank_path, self.delimiter)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {self.bank_path}")
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to read file due to format error: {e}")
+
+        if self.duplicate_report is not None and self.dedup == 'collapse':
+            table = table.without(dropped_indexes(self.duplicate_report))
+        if len(table) != len(self.question_bank):
+            raise ValueError("The bank file changed since it was loaded; reload it first.")
+
+        self._tag_table = table
+        return table
+
+    def assembler(self, num_questions, quotas=None, difficulty=None, tolerance=DEFAULT_TOLERANCE):
+        """An ExamAssembler for exams of `num_questions` with the given tag quotas."""
+        return ExamAssembler(self.tag_table(), num_questions, quotas, difficulty, tolerance)
+
+    def planner(self, num_questions, max_overlap=None, adjacent_overlap=None, window=DEFAULT_WINDOW):
+        """
+        A VariantPlanner that keeps batch variants from sharing more than
+        `max_overlap` questions (`adjacent_overlap` for variants seated
+        within `window` of each other) and spreads usage across the bank.
+        """
+        return VariantPlanner(len(self.question_bank), num_questions, max_overlap,
+                              adjacent_overlap, window)
+
+    # --- Usage history ---
+    def usage_sampler(self, num_questions, history, exclude_days=DEFAULT_EXCLUDE_DAYS,
+                      half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        """
+        A usage_history.UsageSampler that skips questions used within
+        `exclude_days` and favours those unused the longest. Pass it
+        wherever an assembler is accepted.
+        """
+        if num_questions > len(self.question_bank):
+            raise ValueError("Requested questions exceed bank size.")
+        settings = (history.path, exclude_days, half_life_days)
+        if self._usage_sampler is not None and self._usage_sampler[:3] == settings:
+            # Kept up to date by record_usage(); the history is only read once per load
+            sampler = self._usage_sampler[3]
+            sampler.resize(num_questions)
+            return sampler
+        with span("usage_weights", entries=len(self.question_bank)):
+            weights = history.key_weights(self.question_keys(), exclude_days, half_life_days)
+        sampler = UsageSampler(weights, num_questions)
+        self._usage_sampler = settings + (sampler,)
+        return sampler
+
+    def question_keys(self):
+        """usage_history.question_key() of every loaded question, hashed once per load."""
+        if self._question_keys is None:
+            bank = self.question_bank
+            with span("question_keys", entries=len(bank)):
+                self._question_keys = [question_key(bank.question(i)) for i in range(len(bank))]
+        return self._question_keys
+
+    def _collapse(self):
+        """Drops the duplicates in the current report whose answers match; returns how many."""
+        removable = self.duplicate_report['removable']
+        if removable:
+            old_bank = self.question_bank
+            self.question_bank = collapse_duplicates(old_bank, self.duplicate_report)
+            if self._owns_bank and isinstance(old_bank, CompiledQuestionBank):
+                old_bank.close()
+            self._owns_bank = True
+            self._bank_index = None  # Block-to-record mapping no longer holds
+            self.reload_stats = None
+        return removable
+
+    def collapse_duplicates(self):
+        """
+        Removes the duplicates the load-time report found from the loaded
+        bank (an in-memory copy replaces it) and from every later load, by
+        switching `dedup` to 'collapse'. Returns the number removed.
+        """
+        if self.duplicate_report is None or self.dedup == 'collapse':
+            return 0
+        self.dedup = 'collapse'
+        removed = self._collapse()
+        self._tag_table = None
+        self._question_keys = None
+        self._usage_sampler = None
+        self.search_index = None
+        if self.search:
+            self.ensure_search_index()
+        return removed
+
+    def record_usage(self, history, selections, term=None):
+        """
+        Logs every question of the given exams (lists of indexes) in
+        `history`, and lowers their weight in the kept usage sampler.
+        """
+        keys = self.question_keys()
+        used = [keys[i] for indexes in selections for i in indexes]
+        recorded = history.record_keys(used, term)
+
+        if self._usage_sampler is not None and self._usage_sampler[0] == history.path:
+            _, exclude_days, half_life_days, sampler = self._usage_sampler
+            weight = usage_weight(0.0, exclude_days, half_life_days)
+            used = set(used)  # Entries with the same question text were just used too
+            sampler.update({i: weight for i, key in enumerate(keys) if key in used})
+        return recorded
+
+    def replace_entries(self, edits):
+        """
+        Applies {index: (question, answer)} edits to the loaded bank, e.g.
+        after bank_editor.BankEditor wrote them to the file. Unchanged runs
+        of entries are copied without being decoded.
+        """
+        old_bank = self.question_bank
+        bank = QuestionBank()
+        start = 0
+        for index in sorted(edits):
+            bank.extend_from(old_bank, start, index)
+            bank.append(*edits[index])
+            start = index + 1
+        bank.extend_from(old_bank, start, len(old_bank))
+
+        if self._owns_bank and isinstance(old_bank, CompiledQuestionBank):
+            old_bank.close()
+        self.question_bank = bank
+        self._owns_bank = True
+        self._bank_index = None  # Block checksums no longer match the file
+        self.reload_stats = None
+        self.search_index = None
+        self._bank_digest = None
+        self._question_keys = None
+        self._usage_sampler = None
+        if self.search:
+            self.ensure_search_index()
+
+    def unload(self):
+        """Drops the loaded bank and everything derived from it."""
+        self._close_bank()
+        self.bank_path = None
+        self.duplicate_report = None
+
+    def _close_bank(self):
+        """Releases a memory-mapped bank before it is replaced."""
+        if self._owns_bank and isinstance(self.question_bank, CompiledQuestionBank):
+            self.question_bank.close()
+        self.question_bank = QuestionBank()
+        self.bank_format = None
+        self._owns_bank = True
+        self._bank_index = None
+        self.reload_stats = None
+        self.search_index = None
+        self._parsed_index = None
+        self._bank_digest = None
+        self._tag_table = None
+        self._question_keys = None
+        self._usage_sampler = None
+
+    def select(self, num_questions, assembler=None, rng=random):
+        """
+        Picks the question indexes of one exam at random, or through
+        `assembler` (see assembler()) when it has tag or difficulty quotas.
+        Plain sampling is O(num_questions) and reads no question text.
+        """
+        if num_questions > len(self.question_bank):
+            raise ValueError("Requested questions exceed bank size.")
+
+        with span("sample", questions=num_questions, constrained=assembler is not None):
+            if assembler is not None:
+                return assembler.assemble(rng)
+            return sample_indexes(len(self.question_bank), num_questions, rng)
+
+    @staticmethod
+    def seeded_rng(rng=None, seed=None):
+        """
+        (rng, exam seed) for one exam: `rng` as given, or else the RNG of
+        exam seed `seed` (a batch seed means its variant 0; a fresh seed
+        when None). See exam_sampling.
+        """
+        if rng is not None:
+            return rng, exam_seed(seed) if seed is not None else None
+        seed = exam_seed(seed)
+        return exam_rng(seed), seed
+
+    def write_exam(self, out, num_questions, professor_name, assembler=None, fmt='text',
+                   rng=None, seed=None):
+        """
+        Streams one exam into `out` (an open text file, buffer or socket)
+        without building the whole document first. `fmt` is a key of
+        exam_render.WRITERS. The exam is drawn with its own RNG from `seed`
+        (or `rng`) and the exam seed is printed in its header, unless the
+        assembler's draws do not follow from the seed alone (see
+        exam_sampling.seed_reproduces). Returns the selected indexes.
+        """
+        rng, seed = self.seeded_rng(rng, seed)
+        indexes = self.select(num_questions, assembler, rng)
+        seed = seed if seed_reproduces(assembler) else None
+        with span("render", format=fmt, questions=num_questions):
+            WRITERS[fmt](out, (self.question_bank[i] for i in indexes), professor_name, seed)
+        return indexes
+
+    def generate_content(self, num_questions, professor_name, assembler=None, fmt='text',
+                         rng=None, seed=None):
+        """
+        Generates exam content based on V1.0 logic and returns it as a
+        string; see write_exam() for the arguments. Pass the same `seed`
+        to get the same exam again.
+        """
+        rng, seed = self.seeded_rng(rng, seed)
+        indexes = self.select(num_questions, assembler, rng)
+        seed = seed if seed_reproduces(assembler) else None
+        with span("render", format=fmt, questions=num_questions):
+            return render([self.question_bank[i] for i in indexes], professor_name, fmt, seed)
+
+    def write_exam_set(self, outputs, num_questions, professor_name, assembler=None, rng=None,
+                       seed=None):
+        """
+        Writes several documents of one exam, e.g. {'text': student_file,
+        'key': key_file}, from a single selection whose entries are read
+        from the bank only once. Returns the exam's manifest (see
+        exam_render.make_manifest), which records the exam seed if it
+        reproduces the draw, and the selected questions in any case.
+        """
+        rng, seed = self.seeded_rng(rng, seed)
+        indexes = self.select(num_questions, assembler, rng)
+        seed = seed if seed_reproduces(assembler) else None
+        selected = [self.question_bank[i] for i in indexes]
+        for fmt, out in outputs.items():
+            with span("render", format=fmt, questions=num_questions):
+                WRITERS[fmt](out, selected, professor_name, seed)
+        return make_manifest(indexes, professor_name, self.bank_path, len(self.question_bank), seed,
+                             selected, self.bank_digest())
+
+    def bank_digest(self):
+        """Hex SHA-256 of the loaded bank's file, read once per load; None without a file."""
+        if self._bank_digest is None and self.bank_path is not None:
+            self._bank_digest = source_digest(self.bank_path).hex()
+        return self._bank_digest
+
+    def generate_exam_set(self, num_questions, professor_name, assembler=None, rng=None,
+                          formats=('text', 'key'), seed=None):
+        """
+        Returns ({fmt: document}, manifest) for one exam: by default its
+        student copy and answer key, built from the same selection.
+        """
+        buffers = {fmt: output_buffer(fmt) for fmt in formats}
+        manifest = self.write_exam_set(buffers, num_questions, professor_name, assembler, rng, seed)
+        return {fmt: buffer.getvalue() for fmt, buffer in buffers.items()}, manifest
+
+    def sample_file(self, file_path, num_questions, rng, fmt=None):
+        """
+        Draws `num_questions` question/answer dicts from a bank file in one
+        streaming pass (reservoir sampling), for banks too large to load.
+        Load-time duplicate collapsing does not apply.
+        """
+        with span("sample", questions=num_questions, streamed=True):
+            return reservoir_sample(self.iter_bank(file_path, fmt), num_questions, rng)
+
+    def write_streamed_exam(self, out, file_path, num_questions, professor_name, fmt='text',
+                            seed=None, bank_format=None):
+        """
+        write_exam() for a bank that is streamed from `file_path` instead
+        of loaded. Returns the exam seed. The same seed gives the same exam
+        for the same file, but not the one a loaded bank would give.
+        """
+        seed = exam_seed(seed)
+        selected = self.sample_file(file_path, num_questions, exam_rng(seed), bank_format)
+        with span("render", format=fmt, questions=num_questions):
+            WRITERS[fmt](out, selected, professor_name, seed)
+        return seed
+
+    def write_from_manifest(self, out, manifest, fmt='text'):
+        """
+        Re-renders an exam recorded by write_exam_set() without sampling
+        again. The questions stored in the manifest are used as they are;
+        a version 1 manifest, which holds only indexes, is rendered from
+        the loaded bank, which must be the one it was made from.
+        """
+        selected = manifest_entries(manifest)
+        if selected is None:
+            selected = self._manifest_selection(manifest)
+        with span("render", format=fmt, questions=len(selected)):
+            WRITERS[fmt](out, selected, manifest['professor'], manifest.get('seed'))
+
+    def _manifest_selection(self, manifest):
+        """The loaded entries a version 1 manifest refers to, after checking it matches the bank."""
+        bank_size = len(self.question_bank)
+        if manifest.get('bank_size') not in (None, bank_size):
+            raise ValueError("The manifest was made from a different bank; load that bank first.")
+        indexes = manifest['indexes']
+        if any(not 0 <= i < bank_size for i in indexes):
+            raise ValueError("The manifest refers to questions outside the loaded bank.")
+        return [self.question_bank[i] for i in indexes]
+
+    def render_manifest(self, manifest, fmt='text'):
+        """Like write_from_manifest() but returns the document as a string (bytes for PDF/DOCX)."""
+        buffer = output_buffer(fmt)
+        self.write_from_manifest(buffer, manifest, fmt)
+        return buffer.getvalue()
+
+    def generate_batch(self, count, num_questions, professor_name, output_dir, seed=None,
+                       workers=1, use_processes=True, progress=None, assembler=None,
+                       planner=None, fmt='text', combined=None):
+        """
+        Generates `count` exam variants into `output_dir` (or the one
+        document `combined`) in one pass, optionally across a worker pool.
+        See batch_generator.generate_batch.
+        """
+        with span("generate_batch", count=count, questions=num_questions):
+            return generate_batch(self.question_bank, count, num_questions,
+                                  professor_name, output_dir, seed, workers, use_processes,
+                                  progress=progress, assembler=assembler, planner=planner,
+                                  fmt=fmt, combined=combined)
+
+
+def _indexed(pairs, index):
+    """Passes (question, answer) pairs through, adding each to a SearchIndex."""
+    for question, answer in pairs:
+        index.add(question, answer)
+        yield question, answer
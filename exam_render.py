@@ -0,0 +1,298 @@
+"""
+Rendering of generated exams.
+
+Exams are written as a stream: write_exam() formats the header and each
+question from a template and hands the text to the output sink (an open
+file, a StringIO, a socket...) in chunks of about WRITE_CHUNK_SIZE
+characters, so neither the finished document nor ever-growing partial
+strings are held in memory. The render_* functions return the same text
+as a string for callers that want one. The printable formats (HTML, PDF,
+DOCX) are written by exam_export, which is only imported when one of
+them is used; PDF and DOCX are binary, so their files are opened with
+open_output(). replace_output() writes a file under a temporary name and
+only moves it into place once the whole document was written, so a
+failed exam never clobbers an existing file.
+
+A manifest records which bank entries an exam was built from, with the
+text of each and a digest of the bank file, so its student copy and
+answer key can be rendered again later exactly as they were, even after
+the bank was edited. Version 1 manifests held only the indexes and are
+rendered from the loaded bank.
+"""
+import contextlib
+import io
+import json
+import os
+
+ANSWER_BLANK = "______________________"
+WRITE_CHUNK_SIZE = 64 * 1024  # Characters gathered before each write to the sink
+MANIFEST_EXTENSION = ".manifest.json"
+MANIFEST_VERSION = 2
+RULE = "=" * 60
+
+SEED_LINE = "Exam seed: {seed}\n"  # Printed under the title when the exam seed is known
+
+# Templates are str.format() strings; 'question' is repeated once per entry
+# with number, question and answer, the others get professor and seed_line.
+STUDENT_COPY = {
+    'header': "EXAM (STUDENT COPY) - Created by Professor {professor}\n{seed_line}" + RULE + "\n\n",
+    'question': "Question {number}: {question}\nAnswer: " + ANSWER_BLANK + "\n\n",
+    'footer': "",
+}
+ANSWER_KEY = {
+    'header': "EXAM (ANSWER KEY) - Created by Professor {professor}\n{seed_line}" + RULE + "\n\n",
+    'question': "Question {number}: {question}\nAnswer: {answer}\n\n",
+    'footer': "",
+}
+TEMPLATES = {'text': STUDENT_COPY, 'key': ANSWER_KEY}
+
+
+def _sink_writer(out):
+    """The text-writing function of a sink; sockets get UTF-8 bytes via sendall()."""
+    if hasattr(out, 'write'):
+        return out.write
+    if hasattr(out, 'sendall'):
+        return lambda text: out.sendall(text.encode('utf-8'))
+    raise TypeError(f"Cannot write an exam to {type(out).__name__!r}; it needs write() or sendall().")
+
+
+def write_exam(out, selected, professor_name, template=STUDENT_COPY, chunk_size=WRITE_CHUNK_SIZE,
+               seed=None):
+    """
+    Streams the selected question/answer dicts through `template` into
+    `out`, with the exam seed (see exam_sampling) in the header if given.
+    """
+    write = _sink_writer(out)
+    question_format = template['question'].format
+    seed_line = SEED_LINE.format(seed=seed) if seed is not None else ""
+    pending = [template['header'].format(professor=professor_name, seed_line=seed_line)]
+    size = len(pending[0])
+
+    for number, pair in enumerate(selected, 1):
+        text = question_format(number=number, question=pair['question'], answer=pair['answer'])
+        pending.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            write("".join(pending))
+            pending = []
+            size = 0
+
+    pending.append(template['footer'].format(professor=professor_name, seed_line=seed_line))
+    write("".join(pending))
+
+
+def write_json(out, selected, professor_name, seed=None):
+    """Streams a machine-readable exam for scripts and other tools."""
+    exam = {'professor': professor_name}
+    if seed is not None:
+        exam['seed'] = seed
+    exam['questions'] = [{'number': i, 'question': pair['question'], 'answer': pair['answer']}
+                         for i, pair in enumerate(selected, 1)]
+    write = _sink_writer(out)
+    pending = []
+    size = 0
+    for piece in json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(exam):
+        pending.append(piece)
+        size += len(piece)
+        if size >= WRITE_CHUNK_SIZE:
+            write("".join(pending))
+            pending = []
+            size = 0
+    pending.append("\n")
+    write("".join(pending))
+
+
+def _template_writer(template):
+    def write(out, selected, professor_name, seed=None):
+        write_exam(out, selected, professor_name, template, seed=seed)
+    return write
+
+
+# Output format name -> writer(out, selected, professor_name, seed=None)
+WRITERS = {
+    'text': _template_writer(STUDENT_COPY),
+    'key': _template_writer(ANSWER_KEY),
+    'json': write_json,
+}
+FORMAT_EXTENSIONS = {'text': ".txt", 'key': ".txt", 'json': ".json"}
+
+
+def _export_writer(fmt):
+    def write(out, selected, professor_name, seed=None):
+        # Imported here: only printable output needs the exporters
+        from exam_export import get_exporter
+        get_exporter(fmt).write(out, selected, professor_name, seed)
+    return write
+
+
+# Printable formats, written by exam_export
+EXPORTED_FORMATS = {'html': ".html", 'html_key': ".html", 'pdf': ".pdf", 'pdf_key': ".pdf",
+                    'docx': ".docx", 'docx_key': ".docx"}
+WRITERS.update((fmt, _export_writer(fmt)) for fmt in EXPORTED_FORMATS)
+FORMAT_EXTENSIONS.update(EXPORTED_FORMATS)
+BINARY_FORMATS = {'pdf', 'pdf_key', 'docx', 'docx_key'}
+# Student copy format -> the answer key format written next to it
+KEY_FORMATS = {'text': 'key', 'html': 'html_key', 'pdf': 'pdf_key', 'docx': 'docx_key'}
+_FORMAT_BY_EXTENSION = {".txt": 'text', ".json": 'json', ".html": 'html', ".htm": 'html',
+                        ".pdf": 'pdf', ".docx": 'docx'}
+
+
+def format_for_path(path, default='text'):
+    """The student copy format an output file name asks for: exam.pdf -> 'pdf'."""
+    return _FORMAT_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), default)
+
+
+def open_output(path, fmt='text', buffering=-1):
+    """Opens a file for one output format: binary for PDF/DOCX, UTF-8 text otherwise."""
+    if fmt in BINARY_FORMATS:
+        return open(path, 'wb', buffering=buffering)
+    return open(path, 'w', encoding='utf-8', buffering=buffering)
+
+
+@contextlib.contextmanager
+def replace_output(path, fmt='text', buffering=-1):
+    """
+    open_output() for a temporary file next to `path` that replaces `path`
+    when the block finishes; on an error it is removed and `path` is untouched.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with open_output(temp_path, fmt, buffering) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def output_buffer(fmt='text'):
+    """An in-memory sink for one output format."""
+    return io.BytesIO() if fmt in BINARY_FORMATS else io.StringIO()
+
+
+def write_document(out, exams, fmt='text'):
+    """
+    Streams many exams, as (selected, professor_name, seed) tuples, into
+    one document; printable formats start each exam on a new page.
+    """
+    if fmt in EXPORTED_FORMATS:
+        from exam_export import get_exporter
+        get_exporter(fmt).write_document(out, exams)
+    elif fmt == 'json':
+        raise ValueError("JSON exams cannot be combined into one document.")
+    else:
+        for selected, professor_name, seed in exams:
+            WRITERS[fmt](out, selected, professor_name, seed)
+
+
+def render(selected, professor_name, fmt='text', seed=None):
+    """
+    Returns the whole document of one output format as a string (bytes
+    for PDF and DOCX).
+    """
+    buffer = output_buffer(fmt)
+    WRITERS[fmt](buffer, selected, professor_name, seed)
+    return buffer.getvalue()
+
+
+def render_student_copy(selected, professor_name):
+    """Formats the selected question/answer dicts as a student copy."""
+    return render(selected, professor_name, 'text')
+
+
+def render_answer_key(selected, professor_name):
+    """Formats the selected questions with their answers filled in (the V1.0 layout)."""
+    return render(selected, professor_name, 'key')
+
+
+def render_json(selected, professor_name):
+    return render(selected, professor_name, 'json')
+
+
+RENDERERS = {
+    'text': render_student_copy,
+    'key': render_answer_key,
+    'json': render_json,
+}
+
+
+def register_template(name, template, extension=".txt"):
+    """
+    Adds an output format rendered from a template dict with 'header',
+    'question' and optional 'footer' strings (see STUDENT_COPY); put
+    {seed_line} in the header to print the exam seed.
+    """
+    template = dict({'footer': ""}, **template)
+    TEMPLATES[name] = template
+    WRITERS[name] = _template_writer(template)
+    RENDERERS[name] = lambda selected, professor_name: render(selected, professor_name, name)
+    FORMAT_EXTENSIONS[name] = extension
+
+
+def companion_paths(output_file, fmt='key'):
+    """
+    Where the `fmt` document and the manifest of the exam written to
+    `output_file` go: exam.txt -> exam_key.txt, exam.manifest.json;
+    exam.pdf -> exam_key.pdf for 'pdf_key'.
+    """
+    stem, _ = os.path.splitext(output_file)
+    suffix = 'key' if fmt in KEY_FORMATS.values() else fmt
+    return f"{stem}_{suffix}{FORMAT_EXTENSIONS[fmt]}", stem + MANIFEST_EXTENSION
+
+
+def make_manifest(indexes, professor_name, bank_path=None, bank_size=None, seed=None,
+                  selected=None, bank_digest=None):
+    """
+    The selected bank indexes of one exam plus what is needed to check and
+    re-render them: the question/answer dicts in `selected` are stored as
+    [question, answer] pairs, `bank_digest` is the hex SHA-256 of the bank file.
+    """
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'bank': bank_path,
+        'bank_size': bank_size,
+        'bank_digest': bank_digest,
+        'seed': seed,
+        'professor': professor_name,
+        'indexes': list(indexes),
+    }
+    if selected is not None:
+        manifest['entries'] = [[pair['question'], pair['answer']] for pair in selected]
+    return manifest
+
+
+def manifest_entries(manifest):
+    """The question/answer dicts stored in a manifest, or None for one that holds only indexes."""
+    entries = manifest.get('entries')
+    if entries is None:
+        return None
+    return [{'question': question, 'answer': answer} for question, answer in entries]
+
+
+def save_manifest(path, manifest):
+    with replace_output(path, 'json') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {path}")
+    except ValueError as e:
+        raise ValueError(f"Invalid exam manifest {path}: {e}")
+
+    if manifest.get('version') not in (1, MANIFEST_VERSION) or not isinstance(manifest.get('indexes'), list):
+        raise ValueError(f"Invalid exam manifest {path}: unsupported version or no indexes.")
+    entries = manifest.get('entries')
+    if entries is not None and (
+            not isinstance(entries, list) or len(entries) != len(manifest['indexes'])
+            or any(not isinstance(pair, list) or len(pair) != 2 for pair in entries)):
+        raise ValueError(f"Invalid exam manifest {path}: malformed entries.")
+    return manifest
@@ -0,0 +1,102 @@
+"""
+Seeded, reproducible question sampling.
+
+Every exam draws from its own RNG, seeded by an exam seed string
+"<seed>/<variant>": variant v of a batch generated with seed s uses
+"s/v", and a single exam is variant 0. The exam seed is printed in the
+exam header, so any exam can be regenerated from it (e.g. for a grade
+appeal) given the same bank and options. Selectors whose draws also
+depend on changing state (usage_history.UsageSampler, whose weights move
+with every recorded exam) set `reproducible = False`, and their exams
+print no seed; their manifests record the selected questions instead.
+
+Selection never touches the bank text: k indexes are drawn from
+range(len(bank)) with random.sample, which takes O(k) time and memory for
+banks much larger than k, so memory-mapped banks only decode the chosen
+entries. Banks too large to load at all are streamed once through
+reservoir_sample().
+"""
+import itertools
+import math
+import random
+
+_END = object()
+
+
+def new_seed():
+    """Picks a fresh batch seed when the caller did not supply one."""
+    return random.SystemRandom().randrange(2 ** 63)
+
+
+def exam_seed(seed=None, variant=0):
+    """
+    The exam seed string of variant `variant` of `seed`; a fresh seed when
+    None. An exam seed string (one with a '/') is returned unchanged.
+    """
+    if isinstance(seed, str) and "/" in seed:
+        return seed
+    if seed is None:
+        seed = new_seed()
+    return f"{seed}/{variant}"
+
+
+def parse_exam_seed(text):
+    """'42/3' -> (42, 3); raises ValueError for anything else."""
+    seed, separator, variant = text.partition("/")
+    try:
+        if not separator:
+            raise ValueError
+        return int(seed), int(variant)
+    except ValueError:
+        raise ValueError(f"Invalid exam seed {text!r}; expected SEED/VARIANT, e.g. 42/0.")
+
+
+def seed_reproduces(assembler=None):
+    """Whether the exam seed alone gives the same draw again with `assembler`."""
+    return getattr(assembler, 'reproducible', True)
+
+
+def exam_rng(seed):
+    """The RNG of one exam, from its exam seed string."""
+    return random.Random(seed)
+
+
+def sample_indexes(bank_size, k, rng):
+    """k distinct indexes of a bank in O(k), without reading any entry."""
+    if k > bank_size:
+        raise ValueError("Requested questions exceed bank size.")
+    return rng.sample(range(bank_size), k)
+
+
+def _open_unit(rng):
+    """A uniform draw from (0, 1), so its logarithm is finite."""
+    value = rng.random()
+    while value == 0.0:
+        value = rng.random()
+    return value
+
+
+def reservoir_sample(records, k, rng):
+    """
+    k records drawn uniformly from an iterable of unknown length in one
+    pass (Li's Algorithm L: it skips ahead between replacements, so only
+    O(k log(n/k)) random numbers are drawn). The result is shuffled.
+    """
+    records = iter(records)
+    reservoir = list(itertools.islice(records, k))
+    if len(reservoir) < k:
+        raise ValueError("Requested questions exceed bank size.")
+    if k == 0:
+        return reservoir
+
+    weight = math.exp(math.log(_open_unit(rng)) / k)
+    while True:
+        skip = math.floor(math.log(_open_unit(rng)) / math.log1p(-weight))
+        record = next(itertools.islice(records, skip, None), _END)
+        if record is _END:
+            break
+        reservoir[rng.randrange(k)] = record
+        weight *= math.exp(math.log(_open_unit(rng)) / k)
+
+    rng.shuffle(reservoir)
+    return reservoir
@@ -0,0 +1,518 @@
+"""
+Local HTTP service that generates exams for other machines and scripts.
+
+Banks are registered by name when the service starts and stay loaded
+between requests. Sampling requests for the same bank that arrive in the
+same event loop tick are drawn together in one worker-thread job. Each
+exam is rendered on a worker thread and its chunks (about
+exam_render.WRITE_CHUNK_SIZE each) are sent with chunked transfer
+encoding as the writer produces them, so a large PDF never stalls the
+event loop. The renderer stays at most STREAM_DEPTH chunks ahead of the
+client, and every chunk waits for the client to drain before the next is
+sent. HTTP/1.0 clients get the whole exam with a Content-Length instead.
+At most `max_pending` requests are in progress at once; beyond that the
+service answers 503 with Retry-After instead of queueing without bound.
+
+Requests (GET query string, or a JSON object as a POST body):
+    GET /health
+    GET /exam?bank=NAME&questions=20&format=text&seed=42&professor=Smith
+
+Example:
+    python exam_service.py --bank cs=processed_question_bank.txt --port 8765
+    curl 'http://127.0.0.1:8765/exam?bank=cs&questions=20&seed=1'
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from exam_generator import ExamGenerator
+from exam_render import BINARY_FORMATS, WRITE_CHUNK_SIZE, WRITERS
+from exam_sampling import exam_rng, exam_seed, new_seed
+from instrumentation import count, span
+
+DEFAULT_HOST = "127.0.0.1"  # Local only unless --host says otherwise
+DEFAULT_PORT = 8765
+MAX_PENDING = 1024  # Requests in progress before new ones get 503
+MAX_BATCH = 256  # Sampling requests for one bank drawn in one job
+STREAM_DEPTH = 4  # Rendered chunks waiting for the client before the renderer pauses
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Every other format is plain text
+CONTENT_TYPES = {'json': "application/json; charset=utf-8",
+                 'html': "text/html; charset=utf-8", 'html_key': "text/html; charset=utf-8",
+                 'pdf': "application/pdf", 'pdf_key': "application/pdf",
+                 'docx': DOCX_TYPE, 'docx_key': DOCX_TYPE}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _RenderStream:
+    """
+    Sink an exam writer runs into on a worker thread. Output is gathered
+    into chunks of about WRITE_CHUNK_SIZE bytes and handed to the event
+    loop, which iterates over them (async for) while rendering goes on.
+    """
+
+    def __init__(self, loop, binary=False, depth=STREAM_DEPTH):
+        self.loop = loop
+        self.binary = binary
+        self.queue = asyncio.Queue(depth)
+        self.cancelled = False
+        self._pending = []
+        self._size = 0
+
+    # --- Worker thread side ---
+    def write(self, data):
+        if self.cancelled:
+            raise ConnectionAbortedError("The client went away.")
+        if not self.binary:
+            data = data.encode('utf-8')
+        self._pending.append(data)
+        self._size += len(data)
+        if self._size >= WRITE_CHUNK_SIZE:
+            self._hand_off()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _hand_off(self):
+        chunk = b"".join(self._pending)
+        self._pending = []
+        self._size = 0
+        if chunk:
+            self._put(chunk)
+
+    def _put(self, item):
+        # Blocks this thread while the client is STREAM_DEPTH chunks behind
+        asyncio.run_coroutine_threadsafe(self._offer(item), self.loop).result()
+
+    def produce(self, writer, *args):
+        """Runs writer(self, *args) and marks the end of the stream (or its error)."""
+        try:
+            writer(self, *args)
+            self._hand_off()
+        except BaseException as e:
+            if not self.cancelled:
+                self._put(e)
+            return
+        self._put(_END_OF_STREAM)
+
+    # --- Event loop side ---
+    async def _offer(self, item):
+        if not self.cancelled:
+            await self.queue.put(item)
+
+    async def __aiter__(self):
+        while True:
+            item = await self.queue.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def cancel(self):
+        """Stops the renderer after the client went away (or the exam was fully sent)."""
+        self.cancelled = True
+        while not self.queue.empty():
+            self.queue.get_nowait()  # Frees a renderer waiting for room
+
+
+_END_OF_STREAM = object()
+
+
+class SampleBatcher:
+    """
+    Coalesces the sampling requests for one bank: everything queued
+    during one event loop tick (up to `max_batch`) is drawn in one job
+    on a worker thread.
+    """
+
+    def __init__(self, generator, max_batch=MAX_BATCH):
+        self.generator = generator
+        self.max_batch = max_batch
+        self._pending = []
+
+    def select(self, num_questions, rng):
+        """A future for the question indexes of one exam."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush)  # Runs after the handlers of this tick
+        self._pending.append((num_questions, rng, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        return future
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        job = asyncio.get_running_loop().run_in_executor(None, self._draw, batch)
+        job.add_done_callback(lambda job: self._deliver(batch, job.result()))
+
+    def _draw(self, batch):
+        """Runs on a worker thread: one result or exception per request."""
+        select = self.generator.select
+        results = []
+        with span("service.sample_batch", size=len(batch)):
+            for num_questions, rng, future in batch:
+                try:
+                    results.append((select(num_questions, None, rng), None))
+                except Exception as e:
+                    results.append((None, e))
+        count("service_batches")
+        count("service_batched_requests", len(batch))
+        return results
+
+    @staticmethod
+    def _deliver(batch, results):
+        for (_, _, future), (indexes, error) in zip(batch, results):
+            if future.done():
+                continue  # The client went away
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(indexes)
+
+
+class ExamService:
+    """
+    Serves exams from named banks (`banks` maps name -> bank file). Each
+    bank is loaded on first use, or up front with preload().
+    """
+
+    def __init__(self, banks, max_pending=MAX_PENDING, max_batch=MAX_BATCH):
+        self.bank_paths = dict(banks)
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.pending = 0
+        self._generators = {}
+        self._loads = {}  # Name -> task of a load in progress, shared by its waiters
+        self._batchers = {}
+        self._server = None
+
+    # --- Banks ---
+    async def generator(self, name):
+        """The loaded ExamGenerator of a registered bank, loading it once if needed."""
+        generator = self._generators.get(name)
+        if generator is not None:
+            return generator
+        if name not in self.bank_paths:
+            raise HTTPError(404, f"Unknown bank {name!r}.")
+
+        load = self._loads.get(name)
+        if load is None:
+            load = asyncio.ensure_future(self._load(name))
+            self._loads[name] = load
+        try:
+            return await asyncio.shield(load)
+        finally:
+            if load.done():
+                self._loads.pop(name, None)
+
+    async def _load(self, name):
+        generator = ExamGenerator()
+        loop = asyncio.get_running_loop()
+        with span("service.load", bank=name):
+            await loop.run_in_executor(None, generator.load_bank_cached, self.bank_paths[name])
+        self._generators[name] = generator
+        self._batchers[name] = SampleBatcher(generator, self.max_batch)
+        return generator
+
+    async def preload(self):
+        for name in self.bank_paths:
+            await self.generator(name)
+
+    def bank_sizes(self):
+        return {name: len(self._generators[name].question_bank) if name in self._generators else None
+                for name in self.bank_paths}
+
+    # --- Requests ---
+    def _exam_options(self, params):
+        if 'bank' in params:
+            bank = params['bank']
+            if not isinstance(bank, str):
+                raise HTTPError(400, "'bank' must be a string.")
+        elif len(self.bank_paths) == 1:
+            bank = next(iter(self.bank_paths))
+        else:
+            raise HTTPError(400, "'bank' is required when several banks are served.")
+
+        fmt = params.get('format', 'text')
+        if not isinstance(fmt, str) or fmt not in WRITERS:
+            raise HTTPError(400, f"Unknown format {fmt!r}; expected one of {', '.join(sorted(WRITERS))}.")
+        try:
+            num_questions = int(params['questions'])
+            seed = new_seed() if params.get('seed') is None else int(params['seed'])
+            variant = int(params.get('variant', 0))
+        except KeyError:
+            raise HTTPError(400, "'questions' is required.")
+        except (TypeError, ValueError):
+            raise HTTPError(400, "'questions', 'seed' and 'variant' must be integers.")
+        if num_questions <= 0 or variant < 0:
+            raise HTTPError(400, "'questions' must be positive and 'variant' not negative.")
+
+        professor = str(params.get('professor', "Default Professor"))
+        return bank, num_questions, fmt, seed, variant, professor
+
+    async def exam(self, params):
+        """
+        Starts rendering one exam on a worker thread and returns its chunk
+        stream and headers. With the same seed, the first variant matches
+        the CLI's --output exam.
+        """
+        bank, num_questions, fmt, seed, variant, professor = self._exam_options(params)
+        generator = await self.generator(bank)
+        seed = exam_seed(seed, variant)
+        try:
+            indexes = await self._batchers[bank].select(num_questions, exam_rng(seed))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        loop = asyncio.get_running_loop()
+        stream = _RenderStream(loop, binary=fmt in BINARY_FORMATS)
+        bank_entries = generator.question_bank
+        loop.run_in_executor(None, stream.produce, self._render, fmt,
+                             [bank_entries[i] for i in indexes], professor, seed)
+        headers = {
+            'Content-Type': CONTENT_TYPES.get(fmt, "text/plain; charset=utf-8"),
+            'X-Exam-Seed': seed,
+            'X-Exam-Indexes': ",".join(map(str, indexes)),
+        }
+        return stream, headers
+
+    @staticmethod
+    def _render(sink, fmt, selected, professor, seed):
+        with span("service.render", format=fmt, questions=len(selected)):
+            WRITERS[fmt](sink, selected, professor, seed)
+
+    async def dispatch(self, method, target, body):
+        """Returns (status, chunks, headers) for one request."""
+        url = urlsplit(target)
+        if method not in ("GET", "POST"):
+            raise HTTPError(405, f"Method {method} is not allowed.")
+
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                posted = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "The request body is not valid JSON.")
+            if not isinstance(posted, dict):
+                raise HTTPError(400, "The request body must be a JSON object.")
+            params.update(posted)
+
+        if url.path == "/exam":
+            chunks, headers = await self.exam(params)
+            return 200, chunks, headers
+        if url.path == "/health":
+            body = json.dumps({'banks': self.bank_sizes(), 'pending': self.pending})
+            return 200, [body.encode('utf-8')], {'Content-Type': "application/json"}
+        raise HTTPError(404, f"No such endpoint {url.path!r}.")
+
+    # --- HTTP/1.1 over asyncio streams ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = self._keep_alive(version, headers)
+                await self._respond(writer, method, target, body, keep_alive,
+                                    chunked=version != "HTTP/1.0")
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            await self._send(writer, e.status, [str(e).encode('utf-8')], {}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HTTPError(400, "Incomplete request.")
+            return None  # Client closed an idle keep-alive connection
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request headers are too large.")
+
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body is too large.")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, version, headers, body
+
+    @staticmethod
+    def _keep_alive(version, headers):
+        connection = headers.get('connection', "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _respond(self, writer, method, target, body, keep_alive, chunked=True):
+        if self.pending >= self.max_pending:
+            count("service_rejected")
+            await self._send(writer, 503, [b"Too many requests in progress; retry shortly."],
+                             {'Retry-After': "1"}, keep_alive)
+            return
+
+        self.pending += 1
+        try:
+            with span("service.request", target=target):
+                try:
+                    status, chunks, headers = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, chunks, headers = e.status, [str(e).encode('utf-8')], {}
+                except Exception as e:
+                    status, chunks, headers = 500, [f"Error: {e}".encode('utf-8')], {}
+            await self._send(writer, status, chunks, headers, keep_alive, chunked)
+        finally:
+            self.pending -= 1
+
+    async def _send(self, writer, status, chunks, headers, keep_alive, chunked=True):
+        """
+        Sends one response. A list of chunks goes out with a Content-Length;
+        a _RenderStream is sent with chunked transfer encoding as it is
+        rendered, or gathered first when the client cannot take chunked
+        encoding (HTTP/1.0).
+        """
+        stream = chunks if isinstance(chunks, _RenderStream) else None
+        try:
+            if stream is not None and not chunked:
+                try:
+                    chunks = [chunk async for chunk in stream]
+                except Exception as e:
+                    status, chunks, headers = 500, [f"Error: {e}".encode('utf-8')], {}
+                stream = None
+
+            head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                    "Connection: " + ("keep-alive" if keep_alive else "close")]
+            if stream is not None:
+                head.append("Transfer-Encoding: chunked")
+            else:
+                head.append(f"Content-Length: {sum(map(len, chunks))}")
+            headers.setdefault('Content-Type', "text/plain; charset=utf-8")
+            head.extend(f"{name}: {value}" for name, value in headers.items())
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+
+            if stream is None:
+                writer.write(b"".join(chunks))
+                await writer.drain()
+                return
+            try:
+                async for chunk in stream:
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()  # Backpressure: wait while the client is behind
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # The status line is already out: end the connection without the last chunk
+                count("service_render_errors")
+                raise ConnectionAbortedError(f"Rendering failed: {e}")
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            if stream is not None:
+                stream.cancel()
+
+    # --- Server ---
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """Starts listening (on `unix_path` if given) and returns the asyncio server."""
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self.handle_connection, unix_path,
+                                                           limit=MAX_HEADER_BYTES)
+        else:
+            self._server = await asyncio.start_server(self.handle_connection, host, port,
+                                                      limit=MAX_HEADER_BYTES)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def parse_bank_option(text):
+    """'cs=banks/cs.txt' -> ('cs', 'banks/cs.txt'); a bare path is named after its file."""
+    name, separator, path = text.partition("=")
+    if not separator:
+        path = text
+        name = os.path.splitext(os.path.basename(text))[0]
+    return name, path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve exams over local HTTP.")
+    parser.add_argument("--bank", action="append", required=True, metavar="NAME=PATH",
+                        help="Question bank to serve, as NAME=PATH or PATH (repeatable)")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"TCP port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--unix", default=None, metavar="PATH",
+                        help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help=f"Requests in progress before answering 503 (default: {MAX_PENDING})")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Load each bank on its first request instead of at start-up")
+    return parser
+
+
+async def serve(args):
+    service = ExamService(map(parse_bank_option, args.bank), args.max_pending)
+    if not args.lazy:
+        await service.preload()
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving {', '.join(service.bank_paths)} on {where}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Timing spans, counters and one-off profiling for the exam pipeline.
+
+Tracing is off unless PROFESSOR_ASSISTANT_TRACE names an output file (or a
+caller invokes enable()). While it is off, span() hands back one shared
+no-op context manager and count() returns immediately, so instrumented hot
+paths cost a function call and an attribute check.
+
+Trace files ending in .jsonl get one JSON event per line, written as the
+events happen; anything else is written as a Chrome trace (load it in
+chrome://tracing or Perfetto) when tracing is disabled or at exit.
+
+PROFESSOR_ASSISTANT_PROFILE=cprofile|tracemalloc additionally wraps a
+whole run (see profile()) and saves a cProfile .prof dump or the top
+allocation sites next to the trace file.
+"""
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TRACE_ENV = "PROFESSOR_ASSISTANT_TRACE"
+PROFILE_ENV = "PROFESSOR_ASSISTANT_PROFILE"
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+DEFAULT_PROFILE_PATH = "professor_assistant_profile"
+TRACEMALLOC_TOP = 40  # Allocation sites listed in a tracemalloc report
+
+
+class _NullSpan:
+    """Stand-in returned by span() while tracing is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fields['error'] = exc_type.__name__
+        self.tracer.complete(self.name, self.start, time.perf_counter(), self.fields)
+        return False
+
+    def set(self, **fields):
+        """Attaches result values (record counts, sizes...) to the span."""
+        self.fields.update(fields)
+
+
+class Tracer:
+    """Collects span and counter events for one process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = path.endswith(".jsonl")
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8') if self.lines else None
+
+    def _record(self, event):
+        if os.getpid() != self.pid:
+            return  # Forked pool worker: only the process that enabled tracing writes
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(event) + "\n")
+            else:
+                self.events.append(event)
+
+    def _micros(self, moment):
+        return round((moment - self.origin) * 1e6, 1)
+
+    def complete(self, name, start, end, fields=None):
+        """Records a finished span from two perf_counter() readings."""
+        self._record({'name': name, 'ph': 'X', 'ts': self._micros(start),
+                      'dur': round((end - start) * 1e6, 1), 'pid': self.pid,
+                      'tid': threading.get_ident(), 'args': fields or {}})
+
+    def count(self, name, value):
+        with self._lock:
+            total = self.counters.get(name, 0) + value
+            self.counters[name] = total
+        self._record({'name': name, 'ph': 'C', 'ts': self._micros(time.perf_counter()),
+                      'pid': self.pid, 'args': {name: total}})
+
+    def close(self):
+        if os.getpid() != self.pid:
+            return
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                return
+            with open(self.path, 'w', encoding='utf-8') as out:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms',
+                           'otherData': {'counters': self.counters}}, out)
+
+
+_tracer = None
+
+
+def enable(path):
+    """Starts tracing to `path` (.jsonl for JSON lines, otherwise Chrome trace JSON)."""
+    global _tracer
+    disable()
+    _tracer = Tracer(path)
+    atexit.register(disable)
+    return _tracer
+
+
+def disable():
+    """Stops tracing and writes out any buffered events."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def configure_from_env():
+    """
+    Turns tracing on when PROFESSOR_ASSISTANT_TRACE is set and returns the
+    profile mode from PROFESSOR_ASSISTANT_PROFILE; an unknown mode is
+    reported on stderr and ignored. Called by the entry points.
+    """
+    path = os.environ.get(TRACE_ENV)
+    if path and _tracer is None:
+        enable(path)
+    mode = os.environ.get(PROFILE_ENV) or None
+    if mode is not None and mode not in PROFILE_MODES:
+        print(f"Ignoring {PROFILE_ENV}={mode!r}; expected one of {', '.join(PROFILE_MODES)}.",
+              file=sys.stderr)
+        return None
+    return mode
+
+
+def span(name, **fields):
+    """
+    Context manager timing a block of work:
+
+        with span("load_bank", path=file_path) as s:
+            ...
+            s.set(records=count)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, fields)
+
+
+def count(name, value=1):
+    """Adds to a running counter (exported as a Chrome trace counter track)."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def complete(name, start, end=None, **fields):
+    """Records a span whose start was captured earlier with time.perf_counter()."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.complete(name, start, time.perf_counter() if end is None else end, fields)
+
+
+@contextmanager
+def profile(mode, output=None):
+    """
+    One-off capture around a block. 'cprofile' saves a .prof file (open it
+    with pstats or snakeviz); 'tracemalloc' saves the top allocation sites
+    as text. A mode of None does nothing.
+    """
+    if not mode:
+        yield None
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'; expected one of {', '.join(PROFILE_MODES)}.")
+
+    base = output or (os.path.splitext(_tracer.path)[0] if _tracer is not None else DEFAULT_PROFILE_PATH)
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+        return
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(10)
+    try:
+        yield None
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+        with open(base + ".tracemalloc.txt", 'w', encoding='utf-8') as out:
+            out.write(f"current {current:,} bytes, peak {peak:,} bytes\n\n")
+            for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                out.write(f"{stat}\n")
@@ -0,0 +1,131 @@
+"""
+Parallel parsing of large '---' delimited bank files.
+
+The file is cut into byte ranges that each end right after a delimiter,
+so every range holds whole blocks and parses on its own. The ranges are
+parsed in a process pool into compact QuestionBanks and appended to one
+bank in file order, giving exactly the records a serial parse would.
+
+A cut is placed at the first delimiter of a line, searched from the start
+of that line, which is where the serial parser's line.split() splits too.
+Text is decoded per range with universal newlines, as open() does.
+"""
+import io
+import os
+
+from bank_parser import QUESTION_DELIMITER, iter_delimited_records
+from question_store import QuestionBank
+
+TARGET_CHUNK_SIZE = 32 << 20  # Bytes per range; also bounds each worker's memory
+MIN_PARALLEL_SIZE = 8 << 20  # Smaller files are faster to parse serially
+SCAN_SIZE = 1 << 16
+
+
+def _next_boundary(file, position, delimiter_bytes, size):
+    """
+    The offset just past the first delimiter that starts at or after the
+    line containing `position`, or `size` if there is none.
+    """
+    # Step back to the start of the line, so split() and we agree on matches
+    line_start = position
+    while line_start > 0:
+        start = max(0, line_start - SCAN_SIZE)
+        file.seek(start)
+        newline = file.read(line_start - start).rfind(b"\n")
+        if newline >= 0:
+            line_start = start + newline + 1
+            break
+        line_start = start
+
+    file.seek(line_start)
+    offset = line_start
+    pending = b""
+    while True:
+        chunk = file.read(SCAN_SIZE)
+        if not chunk:
+            return size
+        data = pending + chunk
+        found = data.find(delimiter_bytes)
+        if found >= 0:
+            return offset + found + len(delimiter_bytes)
+        keep = len(delimiter_bytes) - 1
+        pending = data[-keep:] if keep else b""
+        offset += len(data) - len(pending)
+
+
+def chunk_ranges(file_path, chunks, delimiter=QUESTION_DELIMITER):
+    """
+    Splits a bank file into at most `chunks` (start, stop) byte ranges of
+    whole delimiter blocks, in file order.
+    """
+    size = os.path.getsize(file_path)
+    delimiter_bytes = delimiter.encode('utf-8')
+    bounds = [0]
+
+    with open(file_path, 'rb') as file:
+        for number in range(1, chunks):
+            position = max(size * number // chunks, bounds[-1])
+            if position >= size:
+                break
+            boundary = _next_boundary(file, position, delimiter_bytes, size)
+            if boundary >= size:
+                break
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_range(file_path, start, stop, delimiter=QUESTION_DELIMITER):
+    """Parses bytes start..stop-1 of a bank file into a QuestionBank."""
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(stop - start)
+
+    lines = io.StringIO(data.decode('utf-8'), newline=None)
+    return QuestionBank(iter_delimited_records(lines, delimiter))
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def parse_parallel(file_path, workers=None, delimiter=QUESTION_DELIMITER, progress=None):
+    """
+    Parses a '---' bank across `workers` processes (all cores by default)
+    and returns one QuestionBank in file order. `progress` is called with
+    the running record count as ranges are merged.
+    """
+    workers = workers or default_workers()
+    size = os.path.getsize(file_path)
+    chunks = max(workers, -(-size // TARGET_CHUNK_SIZE))
+    ranges = chunk_ranges(file_path, chunks, delimiter)
+
+    bank = QuestionBank()
+    if workers == 1 or len(ranges) == 1 or size < MIN_PARALLEL_SIZE:
+        for start, stop in ranges:
+            part = parse_range(file_path, start, stop, delimiter)
+            bank.extend_from(part, 0, len(part))
+            if progress is not None:
+                progress(len(bank))
+        return bank
+
+    # Imported here: concurrent.futures is the slowest import of a headless run
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(parse_range, file_path, start, stop, delimiter)
+                   for start, stop in ranges]
+        try:
+            for future in futures:
+                part = future.result()
+                bank.extend_from(part, 0, len(part))
+                if progress is not None:
+                    progress(len(bank))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return bank
@@ -0,0 +1,188 @@
+"""
+Content-addressed cache of parsed question banks.
+
+A bank is cached under a key made from the SHA-256 of its bytes, the
+delimiter and the parser version, so an unchanged bank is never parsed
+twice while any edit produces a new key. Entries are stored as compiled
+banks (see compiled_bank.py) and opened with mmap.
+
+Two layers:
+    memo   in-process LRU of open banks, plus (path, size, mtime) -> key so
+           an untouched file is not even re-hashed
+    disk   one .qbank file per key, evicted least recently used first once
+           the directory grows past its size cap
+
+The duplicate report of a cached bank is kept under the same key (a
+.dedup.json file next to the entry), so reloading an unchanged bank does
+not repeat the MinHash scan either.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from bank_parser import PARSER_VERSION, QUESTION_DELIMITER
+from compiled_bank import COMPILED_EXTENSION, CompiledQuestionBank, compile_bank, source_digest
+from dedup import DEFAULT_THRESHOLD, find_duplicates
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "professor_assistant")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MEMO_ENTRIES = 8
+REPORT_EXTENSION = ".dedup.json"
+
+
+class ParseCache:
+    """On-disk LRU cache of compiled banks with an in-process memo layer."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES,
+                 memo_entries=DEFAULT_MEMO_ENTRIES):
+        self.cache_dir = cache_dir or os.environ.get("PROFESSOR_ASSISTANT_CACHE", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.memo_entries = memo_entries
+        self._banks = OrderedDict()  # key -> open CompiledQuestionBank
+        self._keys = {}  # (path, size, mtime_ns) -> key
+        self._reports = {}  # (key, threshold) -> duplicate report
+
+    def key_for(self, file_path, delimiter=QUESTION_DELIMITER, digest=None):
+        """Cache key of a bank: content hash + delimiter + parser version."""
+        digest = digest or source_digest(file_path)
+        key = hashlib.sha256()
+        key.update(digest)
+        key.update(f"\0{delimiter}\0{PARSER_VERSION}".encode('utf-8'))
+        return key.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + COMPILED_EXTENSION)
+
+    def report_path(self, key):
+        return os.path.join(self.cache_dir, key + REPORT_EXTENSION)
+
+    def duplicate_report(self, file_path, bank, delimiter=QUESTION_DELIMITER,
+                         threshold=DEFAULT_THRESHOLD):
+        """
+        dedup.find_duplicates() of a bank returned by load(), computed once
+        per content key and threshold and then read back from the cache.
+        """
+        key = self._keys.get(self._stat_key(file_path)) or self.key_for(file_path, delimiter)
+        report = self._reports.get((key, threshold))
+        if report is not None:
+            return report
+
+        path = self.report_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('threshold') == threshold:
+                report = stored['report']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # Missing or unreadable: scan again
+
+        if report is None:
+            report = find_duplicates(bank, threshold)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'threshold': threshold, 'report': report}, f, ensure_ascii=False)
+                os.replace(temp_path, path)
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass  # Read-only cache: the report just isn't persisted
+        self._reports[(key, threshold)] = report
+        while len(self._reports) > self.memo_entries:
+            del self._reports[next(iter(self._reports))]
+        return report
+
+    def _stat_key(self, file_path):
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+    def load(self, file_path, delimiter=QUESTION_DELIMITER, progress=None):
+        """
+        Returns a read-only bank for `file_path`, parsing it only when no
+        cached entry matches its current contents.
+        """
+        stat_key = self._stat_key(file_path)
+        key = self._keys.get(stat_key)
+        digest = None
+        if key is None:
+            digest = source_digest(file_path)
+            key = self.key_for(file_path, delimiter, digest)
+
+        bank = self._banks.get(key)
+        if bank is not None:
+            self._banks.move_to_end(key)
+            self._keys[stat_key] = key
+            return bank
+
+        path = self.entry_path(key)
+        if os.path.exists(path):
+            os.utime(path)  # Mark as recently used for disk eviction
+        else:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            compile_bank(file_path, path, delimiter, progress, digest=digest)
+            self.evict(keep=path)
+
+        bank = CompiledQuestionBank(path)
+        self._keys[stat_key] = key
+        self._remember(key, bank)
+        return bank
+
+    def _remember(self, key, bank):
+        self._banks[key] = bank
+        while len(self._banks) > self.memo_entries:
+            # Dropped, not closed: a generator may still be using the bank
+            self._banks.popitem(last=False)
+
+    def evict(self, keep=None, max_bytes=None):
+        """Deletes least recently used entries until the cache fits its size cap."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(COMPILED_EXTENSION)]
+        except FileNotFoundError:
+            return
+
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Still mapped on platforms that forbid deleting it
+            total -= size
+            key = os.path.basename(path)[:-len(COMPILED_EXTENSION)]
+            try:
+                os.remove(self.report_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Forgets the memo and deletes every cached entry."""
+        self._banks.clear()
+        self._keys.clear()
+        self._reports.clear()
+        self.evict(max_bytes=0)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The process-wide cache, so every ExamGenerator shares one memo."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
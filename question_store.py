@@ -0,0 +1,114 @@
+"""
+Compact, array-backed storage for loaded question banks.
+
+Instead of one dict per question, the bank keeps all text in a single
+UTF-8 buffer plus an offset table, and only builds a question/answer dict
+when an entry is actually read.
+"""
+import random
+from array import array
+from collections.abc import Sequence
+
+
+class QuestionBank(Sequence):
+    """
+    Columnar question bank: one concatenated text buffer and an offset
+    array. Entry i's question spans offsets[2i]..offsets[2i+1] and its
+    answer spans offsets[2i+1]..offsets[2i+2].
+    """
+
+    def __init__(self, records=()):
+        self._buffer = bytearray()
+        self._offsets = array('q', [0])
+        self.extend(records)
+
+    def append(self, question, answer):
+        """Adds one question/answer pair to the end of the bank."""
+        buffer = self._buffer
+        buffer += question.encode('utf-8')
+        self._offsets.append(len(buffer))
+        buffer += answer.encode('utf-8')
+        self._offsets.append(len(buffer))
+
+    def extend_from(self, other, start, stop):
+        """
+        Appends entries start..stop-1 of another bank by copying their
+        encoded text and shifted offsets, without decoding anything.
+        """
+        if start >= stop:
+            return
+        offsets = other._offsets
+        first = offsets[2 * start]
+        delta = len(self._buffer) - first
+        self._buffer += other._buffer[first:offsets[2 * stop]]
+        self._offsets.extend(map(delta.__add__, offsets[2 * start + 1:2 * stop + 1]))
+
+    def extend(self, records):
+        """Adds (question, answer) tuples or {'question', 'answer'} dicts."""
+        for record in records:
+            if isinstance(record, dict):
+                self.append(record['question'], record['answer'])
+            else:
+                self.append(*record)
+
+    def clear(self):
+        self._buffer = bytearray()
+        self._offsets = array('q', [0])
+
+    def truncate(self, count):
+        """Drops every entry from index `count` on, in place."""
+        if count < len(self):
+            del self._buffer[self._offsets[2 * count]:]
+            del self._offsets[2 * count + 1:]
+
+    def _text(self, slot):
+        start, end = self._offsets[slot], self._offsets[slot + 1]
+        return self._buffer[start:end].decode('utf-8')
+
+    def _check_index(self, index):
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("question index out of range")
+        return index
+
+    def question(self, index):
+        """Returns only the question text of entry `index`."""
+        return self._text(2 * self._check_index(index))
+
+    def answer(self, index):
+        """Returns only the answer text of entry `index`."""
+        return self._text(2 * self._check_index(index) + 1)
+
+    def pair(self, index):
+        """Returns entry `index` as a (question, answer) tuple."""
+        index = self._check_index(index)
+        return self._text(2 * index), self._text(2 * index + 1)
+
+    def __len__(self):
+        return (len(self._offsets) - 1) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        question, answer = self.pair(index)
+        return {'question': question, 'answer': answer}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            question, answer = self.pair(index)
+            yield {'question': question, 'answer': answer}
+
+    def sample_indexes(self, k, rng=random):
+        """Picks k distinct entry indexes without touching the text buffer."""
+        return rng.sample(range(len(self)), k)
+
+    def sample(self, k, rng=random):
+        """Picks k distinct entries, decoding only the selected ones."""
+        return [self[i] for i in self.sample_indexes(k, rng)]
+
+    def nbytes(self):
+        """Approximate memory used by the buffer and offset table."""
+        return len(self._buffer) + self._offsets.itemsize * len(self._offsets)
@@ -0,0 +1,290 @@
+"""
+Full-text search over a loaded question bank.
+
+An inverted index maps every normalized word to a postings array of
+(entry index, term frequency) pairs. Queries are tokenized the same way,
+every query word also matches longer words it is a prefix of (the
+MAX_PREFIX_EXPANSIONS that occur in the most entries, when there are
+more; the results say which words were cut short), and results are
+ranked with BM25. The index is extended incrementally as entries are
+added to the bank, and can be saved next to the bank file so it does not
+have to be rebuilt on the next launch.
+"""
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import os
+import tempfile
+from array import array
+from collections import Counter
+
+from bank_parser import PARSER_VERSION
+from dedup import normalize_text
+
+INDEX_EXTENSION = ".qidx"
+INDEX_MAGIC = b"PAIDX\x00\x01\n"
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 64  # Terms a single prefix may expand to, most frequent first
+_LAST_CHAR = chr(0x10FFFF)  # Sorts after every character a term can continue with
+
+
+def tokenize(text):
+    return normalize_text(text).split()
+
+
+def index_path_for(bank_path):
+    """Default location of the saved index for a bank file."""
+    return os.path.splitext(bank_path)[0] + INDEX_EXTENSION
+
+
+class SearchResults(list):
+    """
+    (entry index, score) pairs, best first, plus `truncated`: the query
+    words that matched more than MAX_PREFIX_EXPANSIONS indexed words, of
+    which only the most frequent were searched.
+    """
+
+    def __init__(self, items=(), truncated=()):
+        super().__init__(items)
+        self.truncated = sorted(truncated)
+
+
+def truncation_note(results):
+    """A line telling which query words were not expanded in full, or "" if none were cut."""
+    if not results.truncated:
+        return ""
+    words = ", ".join(f"'{word}'" for word in results.truncated)
+    return (f"Only the {MAX_PREFIX_EXPANSIONS} most common words starting with {words} "
+            "were searched; type more letters to narrow it down.")
+
+
+class SearchIndex:
+    """Inverted index with prefix matching and BM25 ranking."""
+
+    def __init__(self):
+        self.postings = {}  # term -> array('I') of doc, tf, doc, tf, ...
+        self.doc_lengths = array('I')
+        self.total_length = 0
+        self._sorted_terms = None  # Rebuilt lazily for prefix lookups
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, question, answer):
+        """Indexes the next entry of the bank (entries must arrive in order)."""
+        doc = len(self.doc_lengths)
+        terms = tokenize(question) + tokenize(answer)
+        postings = self.postings
+
+        for term, tf in Counter(terms).items():
+            entry = postings.get(term)
+            if entry is None:
+                postings[term] = array('I', (doc, tf))
+                self._sorted_terms = None
+            else:
+                entry.append(doc)
+                entry.append(tf)
+
+        self.doc_lengths.append(len(terms))
+        self.total_length += len(terms)
+
+    def truncate(self, count):
+        """Forgets entries from index `count` on, e.g. before re-indexing a changed tail."""
+        if count >= len(self.doc_lengths):
+            return
+        for term, entry in list(self.postings.items()):
+            # Postings are in entry order, so removed entries sit at the end
+            while entry and entry[-2] >= count:
+                del entry[-2:]
+            if not entry:
+                del self.postings[term]
+                self._sorted_terms = None
+
+        self.total_length -= sum(self.doc_lengths[count:])
+        del self.doc_lengths[count:]
+
+    def update(self, bank, progress=None):
+        """Indexes the bank entries that were added since the last update."""
+        for done, index in enumerate(range(len(self), len(bank)), 1):
+            self.add(*bank.pair(index))
+            if progress is not None and done % 5000 == 0:
+                progress(done)
+
+    def expand(self, token):
+        """
+        (terms, truncated): the indexed terms equal to or starting with
+        `token`. Past MAX_PREFIX_EXPANSIONS, `token` itself and the terms
+        found in the most entries are kept and `truncated` is True.
+        """
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+
+        start = bisect.bisect_left(terms, token)
+        stop = bisect.bisect_left(terms, token + _LAST_CHAR, start)
+        if stop - start <= MAX_PREFIX_EXPANSIONS:
+            return terms[start:stop], False
+
+        postings = self.postings
+        exact = [token] if terms[start] == token else []
+        longer = terms[start + len(exact):stop]
+        frequent = heapq.nlargest(MAX_PREFIX_EXPANSIONS - len(exact), longer,
+                                  key=lambda term: len(postings[term]))
+        return exact + frequent, True
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` (entry index, score) pairs, best first, as
+        SearchResults. Each query word matches itself and the indexed
+        words it is a prefix of.
+        """
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return SearchResults()
+
+        average_length = self.total_length / doc_count
+        doc_lengths = self.doc_lengths
+        scores = {}
+        truncated = []
+
+        for token in set(tokenize(query)):
+            terms, cut = self.expand(token)
+            if cut:
+                truncated.append(token)
+            for term in terms:
+                entry = self.postings[term]
+                df = len(entry) // 2
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                # Words that merely start with the query word count for less
+                weight = idf if term == token else idf * 0.5
+
+                for i in range(0, len(entry), 2):
+                    doc, tf = entry[i], entry[i + 1]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / average_length)
+                    scores[doc] = scores.get(doc, 0.0) + weight * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return SearchResults(heapq.nlargest(limit, scores.items(), key=lambda item: item[1]),
+                             truncated)
+
+    # --- Persistence ---
+    def save(self, path, metadata):
+        """
+        Writes the index with a JSON metadata line (used for staleness
+        checks) followed by the term list and flat postings arrays.
+        """
+        terms = sorted(self.postings)
+        offsets = array('q', [0])
+        for term in terms:
+            offsets.append(offsets[-1] + len(self.postings[term]))
+
+        header = dict(metadata, terms=len(terms), docs=len(self.doc_lengths),
+                      total_length=self.total_length)
+        fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp",
+                                         dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with open(fd, 'wb') as out:
+                out.write(INDEX_MAGIC)
+                out.write(json.dumps(header).encode('utf-8') + b"\n")
+                out.write(json.dumps(terms).encode('utf-8') + b"\n")
+                offsets.tofile(out)
+                self.doc_lengths.tofile(out)
+                for term in terms:
+                    self.postings[term].tofile(out)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def read_metadata(path):
+        with open(path, 'rb') as file:
+            if file.readline() != INDEX_MAGIC:
+                raise ValueError("Not a question bank search index.")
+            return json.loads(file.readline())
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as file:
+            if file.readline() != INDEX_MAGIC:
+                raise ValueError("Not a question bank search index.")
+            header = json.loads(file.readline())
+            terms = json.loads(file.readline())
+
+            offsets = array('q')
+            offsets.fromfile(file, len(terms) + 1)
+            index.doc_lengths.fromfile(file, header['docs'])
+            flat = array('I')
+            flat.fromfile(file, offsets[-1])
+
+        index.postings = {term: flat[offsets[i]:offsets[i + 1]] for i, term in enumerate(terms)}
+        index.total_length = header['total_length']
+        index._sorted_terms = terms
+        return index
+
+
+def file_digest(path, algorithm='sha256'):
+    """Hex digest of a file's bytes."""
+    with open(path, 'rb') as file:
+        return hashlib.file_digest(file, algorithm).hexdigest()
+
+
+def index_metadata(bank_path, extra=None, digest=None):
+    """
+    Identifies the exact bank contents an index was built from. `digest`
+    is an (algorithm, hex digest) pair the caller already has for the
+    file, e.g. from bank_reindex.BankIndex; otherwise it is hashed here.
+    """
+    stat = os.stat(bank_path)
+    algorithm, hexdigest = digest or ('sha256', file_digest(bank_path))
+    metadata = {
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_digest': hexdigest,
+        'digest_algorithm': algorithm,
+        'parser_version': PARSER_VERSION,
+    }
+    metadata.update(extra or {})
+    return metadata
+
+
+def index_is_fresh(bank_path, extra=None, index_path=None):
+    """
+    Whether the index saved for a bank was built from the bank's current
+    contents (and the same `extra` settings). The file is only hashed
+    when its modification time changed.
+    """
+    index_path = index_path or index_path_for(bank_path)
+    try:
+        saved = SearchIndex.read_metadata(index_path)
+    except (OSError, ValueError):
+        return False
+
+    stat = os.stat(bank_path)
+    if saved.get('parser_version') != PARSER_VERSION or saved.get('source_size') != stat.st_size:
+        return False
+    if any(saved.get(key) != value for key, value in (extra or {}).items()):
+        return False
+    if saved.get('source_mtime_ns') != stat.st_mtime_ns:
+        algorithm = saved.get('digest_algorithm', 'sha256')
+        recorded = saved.get('source_digest', saved.get('source_sha256'))
+        if algorithm not in ('sha256', 'blake2b') or recorded != file_digest(bank_path, algorithm):
+            return False
+    return True
+
+
+def load_fresh_index(bank_path, extra=None, index_path=None):
+    """
+    Returns the saved index for a bank if it was built from the bank's
+    current contents (and the same `extra` settings), otherwise None.
+    """
+    index_path = index_path or index_path_for(bank_path)
+    if not index_is_fresh(bank_path, extra, index_path):
+        return None
+    try:
+        return SearchIndex.load(index_path)
+    except (OSError, ValueError, EOFError):
+        return None
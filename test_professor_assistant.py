@@ -0,0 +1,260 @@
+"""
+Regression tests for the exam pipeline: parsing, reloading, seeds,
+manifests, variant planning and in-place bank edits.
+
+Run with `python -m pytest -q` from the repository root.
+"""
+import asyncio
+import json
+import os
+import random
+
+import pytest
+
+import parallel_parse
+import parse_cache
+from bank_editor import BankEditor
+from bank_parser import iter_bank_file
+from exam_cli import main as cli_main
+from exam_generator import ExamGenerator
+from exam_render import MANIFEST_VERSION, load_manifest, save_manifest
+from exam_service import ExamService
+from variant_planner import VariantPlanner, overlap_stats
+
+SAMPLE_BANK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_question_bank.txt")
+
+
+def baseline_split(text, delimiter="---"):
+    """The V3.0 loader this repo started from: split on the delimiter, first two non-empty lines."""
+    pairs = []
+    for pair in text.split(delimiter):
+        parts = [line.strip() for line in pair.split('\n') if line.strip()]
+        if len(parts) >= 2:
+            pairs.append((parts[0], parts[1]))
+    return pairs
+
+
+def write_bank(path, pairs):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("\n---\n".join(f"{question}\n{answer}" for question, answer in pairs) + "\n")
+    return str(path)
+
+
+def pairs_of(bank):
+    return [bank.pair(i) for i in range(len(bank))]
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keeps every parse cache write inside the test's temporary directory."""
+    monkeypatch.setattr(parse_cache, '_default_cache', parse_cache.ParseCache(str(tmp_path / "cache")))
+
+
+@pytest.fixture
+def bank_file(tmp_path):
+    pairs = [(f"Question {i}: what is {i} squared?", f"Answer {i * i}") for i in range(60)]
+    return write_bank(tmp_path / "bank.txt", pairs)
+
+
+# --- Streaming parser ---
+def test_streaming_parser_matches_baseline_split_on_sample_bank():
+    with open(SAMPLE_BANK, encoding='utf-8') as f:
+        expected = baseline_split(f.read())
+    assert list(iter_bank_file(SAMPLE_BANK)) == expected
+
+
+def test_streaming_parser_matches_baseline_split_on_irregular_blocks(tmp_path):
+    text = ("\n\n  First question?  \nFirst answer\n---\n"
+            "\n---\n"  # Empty block
+            "Lonely line\n---\n"  # No answer
+            "Second question?\n\n\nSecond answer\nExtra line\n---"
+            "Third question?\r\nThird answer\r\n---\r\n"
+            "Last question?\nLast answer")
+    path = tmp_path / "irregular.txt"
+    path.write_bytes(text.encode('utf-8'))
+    assert list(iter_bank_file(str(path))) == baseline_split(text)
+
+
+# --- Incremental reload ---
+def test_incremental_append_matches_full_load(bank_file):
+    generator = ExamGenerator()
+    generator.load_bank_incremental(bank_file)
+    with open(bank_file, 'a', encoding='utf-8') as f:
+        f.write("---\nAppended question?\nAppended answer\n")
+    generator.load_bank_incremental(bank_file)
+
+    full = ExamGenerator()
+    full.load_bank_robust(bank_file)
+    assert generator.reload_stats['mode'] == 'append'
+    assert pairs_of(generator.question_bank) == pairs_of(full.question_bank)
+
+
+def test_incremental_edit_matches_full_load(bank_file):
+    generator = ExamGenerator()
+    generator.load_bank_incremental(bank_file)
+    with open(bank_file, encoding='utf-8') as f:
+        text = f.read()
+    with open(bank_file, 'w', encoding='utf-8') as f:
+        f.write(text.replace("Question 10:", "Edited question 10:").replace("Answer 400\n", ""))
+    generator.load_bank_incremental(bank_file)
+
+    full = ExamGenerator()
+    full.load_bank_robust(bank_file)
+    assert generator.reload_stats['mode'] == 'diff'
+    assert pairs_of(generator.question_bank) == pairs_of(full.question_bank)
+
+
+# --- Parallel parse ---
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    pairs = [(f"Q{i}" + " word" * rng.randrange(1, 30), f"A{i} " + "x" * rng.randrange(1, 50))
+             for i in range(2000)]
+    path = write_bank(tmp_path / "large.txt", pairs)
+    # Force several byte ranges and the process pool on a small file
+    monkeypatch.setattr(parallel_parse, 'MIN_PARALLEL_SIZE', 0)
+    monkeypatch.setattr(parallel_parse, 'TARGET_CHUNK_SIZE', 4096)
+
+    ranges = parallel_parse.chunk_ranges(path, 16)
+    assert len(ranges) > 1
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+
+    parallel = parallel_parse.parse_parallel(path, workers=3)
+    assert pairs_of(parallel) == list(iter_bank_file(path)) == pairs
+
+
+# --- Seeds ---
+def test_cli_exam_seed_reproduces_batch_variant(bank_file, tmp_path):
+    batch_dir = tmp_path / "batch"
+    assert cli_main(["--bank", bank_file, "--questions", "5", "--count", "3", "--seed", "42",
+                     "--output-dir", str(batch_dir)]) == 0
+    variant = (batch_dir / "Exam_0002.txt").read_text(encoding='utf-8')
+    assert "Exam seed: 42/1" in variant
+
+    single = tmp_path / "single.txt"
+    assert cli_main(["--bank", bank_file, "--questions", "5", "--exam-seed", "42/1",
+                     "--output", str(single)]) == 0
+    assert single.read_text(encoding='utf-8') == variant
+
+
+def test_service_exam_matches_cli_output(bank_file, tmp_path):
+    out = tmp_path / "cli.txt"
+    assert cli_main(["--bank", bank_file, "--questions", "5", "--exam-seed", "9/2",
+                     "--professor", "Smith", "--output", str(out)]) == 0
+
+    async def fetch():
+        service = ExamService({'cs': bank_file})
+        stream, headers = await service.exam(
+            {'bank': 'cs', 'questions': 5, 'seed': 9, 'variant': 2, 'professor': "Smith"})
+        return b"".join([chunk async for chunk in stream]), headers
+
+    body, headers = asyncio.run(fetch())
+    assert headers['X-Exam-Seed'] == "9/2"
+    assert body.decode('utf-8') == out.read_text(encoding='utf-8')
+
+
+# --- Manifests ---
+def test_manifest_v2_renders_without_bank(bank_file, tmp_path):
+    generator = ExamGenerator()
+    generator.load_bank_robust(bank_file)
+    documents, manifest = generator.generate_exam_set(4, "Smith", seed="5/0")
+    path = str(tmp_path / "exam.manifest.json")
+    save_manifest(path, manifest)
+
+    loaded = load_manifest(path)
+    assert loaded['version'] == MANIFEST_VERSION == 2
+    assert ExamGenerator().render_manifest(loaded) == documents['text']
+
+
+def test_manifest_v1_renders_from_loaded_bank(bank_file, tmp_path):
+    generator = ExamGenerator()
+    generator.load_bank_robust(bank_file)
+    documents, manifest = generator.generate_exam_set(4, "Smith", seed="5/0")
+    v1 = {key: manifest[key] for key in ('bank', 'bank_size', 'seed', 'professor', 'indexes')}
+    v1['version'] = 1
+    path = tmp_path / "v1.manifest.json"
+    path.write_text(json.dumps(v1), encoding='utf-8')
+
+    loaded = load_manifest(str(path))
+    assert generator.render_manifest(loaded) == documents['text']
+
+    other = ExamGenerator()
+    other.load_bank_robust(SAMPLE_BANK)
+    with pytest.raises(ValueError):
+        other.render_manifest(loaded)
+
+
+def test_manifest_with_unknown_version_is_rejected(tmp_path):
+    path = tmp_path / "v9.manifest.json"
+    path.write_text(json.dumps({'version': 9, 'indexes': [0]}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_manifest(str(path))
+
+
+# --- Variant planner ---
+@pytest.mark.parametrize("max_overlap, adjacent_overlap, window",
+                         [(3, None, 1), (4, 1, 2), (3, 0, 2), (3, 1, 3)])
+def test_planner_respects_overlap_bounds(max_overlap, adjacent_overlap, window):
+    planner = VariantPlanner(60, 10, max_overlap, adjacent_overlap, window)
+    selections = planner.plan(8, seed=3)
+    assert len(selections) == 8
+    assert all(len(set(indexes)) == 10 and all(0 <= i < 60 for i in indexes) for indexes in selections)
+
+    stats = overlap_stats(selections, window)
+    assert stats['max'] <= max_overlap
+    if adjacent_overlap is not None:
+        assert stats['adjacent_max'] <= adjacent_overlap
+
+
+def test_planner_reports_unreachable_bounds():
+    with pytest.raises(ValueError, match="lowest bound the planner reached"):
+        VariantPlanner(20, 8, max_overlap=0).plan(6, seed=1)
+
+
+# --- Bank editor ---
+def test_editor_same_length_edit_is_written_in_place(bank_file):
+    generator = ExamGenerator()
+    generator.load_bank_robust(bank_file)
+    inode = os.stat(bank_file).st_ino
+    editor = BankEditor(generator)
+    editor.stage(3, "Question 3: what is 3 cubed??", "Answer 27")
+    assert editor.save() == 1
+
+    assert os.stat(bank_file).st_ino == inode
+    reloaded = ExamGenerator()
+    reloaded.load_bank_robust(bank_file)
+    assert reloaded.question_bank.pair(3) == ("Question 3: what is 3 cubed??", "Answer 27")
+    assert pairs_of(reloaded.question_bank) == pairs_of(generator.question_bank)
+
+
+def test_editor_resized_edits_rewrite_the_file(bank_file):
+    generator = ExamGenerator()
+    generator.load_bank_robust(bank_file)
+    inode = os.stat(bank_file).st_ino
+    editor = BankEditor(generator)
+    editor.stage(0, "A much longer first question than before?", "Longer answer")
+    editor.stage(40, "Q40?", "A")
+    assert editor.save() == 2
+    assert os.stat(bank_file).st_ino != inode
+
+    # A second save reuses the shifted offsets
+    editor.stage(41, "Question 41, edited after the rewrite?", "Answer 1681")
+    assert editor.save() == 1
+
+    reloaded = ExamGenerator()
+    reloaded.load_bank_robust(bank_file)
+    assert pairs_of(reloaded.question_bank) == pairs_of(generator.question_bank)
+    assert reloaded.question_bank.pair(0) == ("A much longer first question than before?", "Longer answer")
+    assert reloaded.question_bank.pair(41) == ("Question 41, edited after the rewrite?", "Answer 1681")
+
+
+def test_editor_refuses_a_file_changed_on_disk(bank_file):
+    generator = ExamGenerator()
+    generator.load_bank_robust(bank_file)
+    editor = BankEditor(generator)
+    editor.stage(2, "Edited?", "Yes")
+    with open(bank_file, encoding='utf-8') as f:
+        text = f.read()
+    with open(bank_file, 'w', encoding='utf-8') as f:
+        f.write(text.replace("Question 2:", "Changed elsewhere 2:"))
+    with pytest.raises(ValueError):
+        editor.save()
@@ -0,0 +1,256 @@
+"""
+Persistent record of which questions were used on which exams.
+
+Every use is appended to an SQLite log keyed by a hash of the normalized
+question text, so the history follows a question across bank edits,
+merges and re-ordering. A per-question summary (use count, last use) is
+kept alongside the log, so reading the history for a bank costs one row
+per distinct question however long the log grows.
+
+UsageSampler turns that summary into sampling weights: questions used
+within `exclude_days` are left out and the rest are down-weighted by how
+recently they were used. Draws go through a Vose alias table built once
+per sampler, so each draw is O(1) whatever the bank size. A sampler kept
+between exams is updated in place after each one: questions that were
+just used get their lower weight, and draws of them from the old table
+are thinned by rejection, so the table is only rebuilt once much of its
+weight is gone.
+"""
+import hashlib
+import heapq
+import math
+import os
+import random
+import sqlite3
+import time
+from array import array
+
+from dedup import normalize_text
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "professor_assistant",
+                                    "usage.sqlite3")
+DEFAULT_EXCLUDE_DAYS = 0  # Used this recently: never drawn
+DEFAULT_HALF_LIFE_DAYS = 180  # Weight lost to a use halves every half-life
+MIN_WEIGHT = 0.02  # Floor for recently used questions that are not excluded
+SECONDS_PER_DAY = 86400
+REJECTION_LIMIT = 8  # Alias draws per requested question before the exact fallback
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_log (
+    question_key TEXT NOT NULL,
+    term TEXT,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS question_usage (
+    question_key TEXT PRIMARY KEY,
+    uses INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def question_key(question):
+    """Stable hash of a question, ignoring case, punctuation and spacing."""
+    normalized = normalize_text(question).encode('utf-8')
+    return hashlib.blake2b(normalized, digest_size=8).hexdigest()
+
+
+def usage_weight(age_days, exclude_days=DEFAULT_EXCLUDE_DAYS, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Sampling weight of a question last used `age_days` ago (see UsageHistory.weights)."""
+    if age_days < exclude_days:
+        return 0.0
+    return max(MIN_WEIGHT, 1.0 - 0.5 ** (age_days / half_life_days))
+
+
+class UsageHistory:
+    """
+    SQLite-backed usage ledger. A connection is opened per call, so one
+    history can be shared between the UI thread and background workers.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, questions, term=None, when=None):
+        """Logs one use of each question text (e.g. everything on one exam)."""
+        return self.record_keys([question_key(question) for question in questions], term, when)
+
+    def record_keys(self, keys, term=None, when=None):
+        """record() for questions already hashed with question_key()."""
+        when = time.time() if when is None else when
+        with self._connect() as db:
+            db.executemany("INSERT INTO usage_log VALUES (?, ?, ?)",
+                           [(key, term, when) for key in keys])
+            db.executemany(
+                "INSERT INTO question_usage VALUES (?, 1, ?) "
+                "ON CONFLICT(question_key) DO UPDATE SET uses = uses + 1, "
+                "last_used = MAX(last_used, excluded.last_used)",
+                [(key, when) for key in keys])
+        return len(keys)
+
+    def summary(self):
+        """question key -> (uses, last used as a Unix time), for every used question."""
+        with self._connect() as db:
+            return {key: (uses, last_used) for key, uses, last_used
+                    in db.execute("SELECT question_key, uses, last_used FROM question_usage")}
+
+    def terms(self):
+        """Distinct terms in the log, most recent first."""
+        with self._connect() as db:
+            return [term for term, in db.execute(
+                "SELECT term FROM usage_log WHERE term IS NOT NULL "
+                "GROUP BY term ORDER BY MAX(used_at) DESC")]
+
+    def __len__(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0]
+
+    def weights(self, questions, exclude_days=DEFAULT_EXCLUDE_DAYS,
+                half_life_days=DEFAULT_HALF_LIFE_DAYS, now=None):
+        """
+        Sampling weight of each question text, in order: 1 if never used,
+        0 if used within `exclude_days`, otherwise 1 minus a penalty that
+        halves every `half_life_days` since the last use.
+        """
+        return self.key_weights(map(question_key, questions), exclude_days, half_life_days, now)
+
+    def key_weights(self, keys, exclude_days=DEFAULT_EXCLUDE_DAYS,
+                    half_life_days=DEFAULT_HALF_LIFE_DAYS, now=None):
+        """weights() for questions already hashed with question_key()."""
+        now = time.time() if now is None else now
+        usage = self.summary()
+        weights = array('d')
+        for key in keys:
+            used = usage.get(key) if usage else None
+            if used is None:
+                weights.append(1.0)
+            else:
+                age_days = max(0.0, now - used[1]) / SECONDS_PER_DAY
+                weights.append(usage_weight(age_days, exclude_days, half_life_days))
+        return weights
+
+
+class AliasTable:
+    """Vose alias table: O(n) to build, O(1) per weighted draw with replacement."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = math.fsum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("Cannot sample from weights that are all zero.")
+
+        scaled = [weight * n / total for weight in weights]
+        self.probability = array('d', [1.0]) * n
+        self.alias = array('q', range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large[-1]
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(large.pop())
+        # Leftovers are 1 up to rounding error and keep probability 1, unless
+        # rounding stranded an unusable entry: send its draws elsewhere
+        for index in small:
+            if weights[index] <= 0:
+                self.probability[index] = 0.0
+                self.alias[index] = next(i for i, weight in enumerate(weights) if weight > 0)
+
+    def __len__(self):
+        return len(self.probability)
+
+    def draw(self, rng=random):
+        column = int(rng.random() * len(self.probability))
+        if rng.random() < self.probability[column]:
+            return column
+        return self.alias[column]
+
+
+class UsageSampler:
+    """
+    Draws `num_questions` distinct indexes weighted by usage history.
+    Has the same assemble(rng) interface as exam_assembly.ExamAssembler,
+    so batches and single exams can use it in its place.
+    """
+
+    reproducible = False  # The weights move with every recorded exam (see exam_sampling)
+
+    def __init__(self, weights, num_questions):
+        self.weights = weights
+        self.available = sum(1 for weight in weights if weight > 0)
+        self.resize(num_questions)
+        self._rebuild()
+
+    def _rebuild(self):
+        self.table = AliasTable(self.weights)
+        self._table_weights = {}  # Index -> weight in the table, for weights lowered since
+        self._table_total = math.fsum(self.weights)
+        self._lowered = 0.0  # Weight removed since the table was built
+
+    def resize(self, num_questions):
+        """Sets the number of questions per draw; ValueError if too few are left."""
+        if num_questions > self.available:
+            raise ValueError(f"Only {self.available} questions are left after excluding "
+                             f"recently used ones; {num_questions} were requested.")
+        self.num_questions = num_questions
+
+    def update(self, changes):
+        """
+        Applies {index: new weight} after questions were used, without
+        reading the history again. Weights may only go down; the alias
+        table is rebuilt once half of its weight is gone.
+        """
+        for index, weight in changes.items():
+            old = self.weights[index]
+            if weight > old:
+                raise ValueError("Usage weights can only be lowered in place.")
+            if weight == old:
+                continue
+            self._table_weights.setdefault(index, old)
+            if old > 0 and weight <= 0:
+                self.available -= 1
+            self.weights[index] = weight
+            self._lowered += old - weight
+        if self._lowered * 2 > self._table_total and self.available:
+            self._rebuild()
+
+    def assemble(self, rng=random):
+        """
+        Distinct weighted draws from the alias table, rejecting repeats;
+        falls back to exact weighted sampling without replacement when
+        repeats dominate (k close to the number of usable questions).
+        """
+        k = self.num_questions
+        if k > self.available:
+            self.resize(k)  # Raises: used questions were excluded since
+        chosen = {}  # Insertion-ordered set
+        draw = self.table.draw
+        weights = self.weights
+        table_weights = self._table_weights
+        for _ in range(k * REJECTION_LIMIT):
+            index = draw(rng)
+            built = table_weights.get(index)
+            if built is not None and rng.random() * built >= weights[index]:
+                continue  # Lowered since the table was built: keep new weight / old weight of draws
+            chosen[index] = None
+            if len(chosen) == k:
+                return list(chosen)
+        return self._exact(rng)
+
+    def _exact(self, rng):
+        """Efraimidis-Spirakis: the k largest u ** (1 / w) keys."""
+        keys = ((rng.random() ** (1.0 / weight), index)
+                for index, weight in enumerate(self.weights) if weight > 0)
+        return [index for _, index in heapq.nlargest(self.num_questions, keys)]
@@ -0,0 +1,208 @@
+"""
+Overlap-minimizing planning of exam variant batches.
+
+Independent random samples give neighbouring students heavily overlapping
+exams. The planner instead builds the variants one after another and only
+accepts a question if it keeps the new variant's overlap with every earlier
+variant within a bound (a tighter one for the variants seated next to it),
+preferring the questions used least so far so usage stays balanced.
+
+All bookkeeping uses Python ints as bitsets: each question has a bitset of
+the variants holding it and the planner keeps a bitset of the variants the
+current one has reached its overlap limit with, so checking a candidate is
+a single C-level AND instead of a pass over earlier exams.
+"""
+import math
+import random
+from array import array
+
+DEFAULT_WINDOW = 1  # Variants numbered this close together are seated side by side
+
+
+def _set_bits(bits):
+    """Positions of the set bits of a non-negative int, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def variant_bits(indexes):
+    """Bitset (int) of the question indexes of one variant."""
+    bits = 0
+    for index in indexes:
+        bits |= 1 << index
+    return bits
+
+
+def overlap_stats(selections, window=DEFAULT_WINDOW):
+    """
+    Pairwise shared-question counts of a batch: {'max', 'mean',
+    'adjacent_max'}, where adjacent pairs are at most `window` apart.
+    """
+    sets = [variant_bits(indexes) for indexes in selections]
+    largest = adjacent = total = pairs = 0
+
+    for i, first in enumerate(sets):
+        for j in range(i + 1, len(sets)):
+            shared = (first & sets[j]).bit_count()
+            total += shared
+            largest = max(largest, shared)
+            if j - i <= window:
+                adjacent = max(adjacent, shared)
+        pairs += len(sets) - i - 1
+
+    return {'max': largest, 'mean': total / pairs if pairs else 0.0, 'adjacent_max': adjacent}
+
+
+def default_max_overlap(bank_size, num_questions):
+    """Expected overlap of two random variants, the starting bound when none is given."""
+    return math.ceil(num_questions * num_questions / bank_size)
+
+
+class _UsageTiers:
+    """Question indexes grouped by how many planned variants use them."""
+
+    def __init__(self, size):
+        self.tiers = [list(range(size))]
+        self.position = array('I', range(size))  # Index of each question inside its tier
+        self.usage = array('I', bytes(4 * size))
+
+    def swap(self, tier, i, j):
+        tier[i], tier[j] = tier[j], tier[i]
+        self.position[tier[i]] = i
+        self.position[tier[j]] = j
+
+    def bump(self, index):
+        """Moves a question up one tier after a variant took it."""
+        tiers, position = self.tiers, self.position
+        used = self.usage[index]
+        tier = tiers[used]
+        last = tier.pop()
+        if last != index:
+            tier[position[index]] = last
+            position[last] = position[index]
+
+        if len(tiers) == used + 1:
+            tiers.append([])
+        position[index] = len(tiers[used + 1])
+        tiers[used + 1].append(index)
+        self.usage[index] = used + 1
+
+
+def _reached_text(bound):
+    """The second half of a VariantPlanner error message."""
+    if bound is None:
+        return "the planner could not fill the variants under any overlap bound."
+    return f"the lowest bound the planner reached is {bound} (not necessarily the minimum possible)."
+
+
+class VariantPlanner:
+    """
+    Plans `count` variants of `num_questions` questions from a bank of
+    `bank_size`, so no two variants share more than `max_overlap`
+    questions and variants at most `window` apart share no more than
+    `adjacent_overlap`. With max_overlap None the lowest bound that works
+    is searched for, starting from the expected random overlap.
+    """
+
+    def __init__(self, bank_size, num_questions, max_overlap=None, adjacent_overlap=None,
+                 window=DEFAULT_WINDOW):
+        if num_questions > bank_size:
+            raise ValueError("Requested questions exceed bank size.")
+        self.bank_size = bank_size
+        self.num_questions = num_questions
+        self.max_overlap = max_overlap
+        self.adjacent_overlap = adjacent_overlap
+        self.window = window
+
+    def plan(self, count, seed=None):
+        """
+        Returns one list of question indexes per variant. Raises
+        ValueError, naming the lowest overlap the planner reached, when the
+        bounds cannot be met.
+        """
+        if self.max_overlap is not None:
+            selections = self._plan(count, self.max_overlap, seed)
+            if selections is None:
+                raise self._infeasible(count, seed)
+            return selections
+
+        # No two variants can share more than num_questions, so the search ends there
+        start = min(default_max_overlap(self.bank_size, self.num_questions), self.num_questions)
+        for bound in range(start, self.num_questions + 1):
+            selections = self._plan(count, bound, seed)
+            if selections is not None:
+                return selections
+        raise self._infeasible(count, seed)
+
+    def _infeasible(self, count, seed):
+        """
+        The ValueError for bounds that cannot be met, naming the smallest
+        bound this greedy planner reached with the same seed. That is not
+        necessarily the true minimum for the bank.
+        """
+        n = self.num_questions
+        adjacent = self.adjacent_overlap
+        if adjacent is not None and self._plan(count, n, seed) is None:
+            # The neighbour bound alone is out of reach
+            reached = next((a for a in range(adjacent + 1, n + 1)
+                            if self._plan(count, n, seed, adjacent_overlap=a) is not None), None)
+            return ValueError(f"Cannot keep the overlap between neighbouring variants at or below "
+                              f"{adjacent}; {_reached_text(reached)}")
+        reached = next((b for b in range(self.max_overlap + 1, n + 1)
+                        if self._plan(count, b, seed) is not None), None)
+        return ValueError(f"Cannot keep the overlap between variants at or below "
+                          f"{self.max_overlap}; {_reached_text(reached)}")
+
+    def _plan(self, count, max_overlap, seed, adjacent_overlap=None):
+        """One planning pass with fixed bounds; None when a variant cannot be filled."""
+        rng = random.Random(seed)
+        if adjacent_overlap is None:
+            adjacent_overlap = self.adjacent_overlap
+        adjacent_overlap = max_overlap if adjacent_overlap is None else min(adjacent_overlap, max_overlap)
+        usage = _UsageTiers(self.bank_size)
+        holders = [0] * self.bank_size  # Question -> bitset of variants holding it
+        selections = []
+
+        for variant in range(count):
+            nearby = range(max(0, variant - self.window), variant)
+            limits = {j: adjacent_overlap for j in nearby}
+            overlap = {}  # Earlier variant -> questions shared with this one so far
+            saturated = 0  # Bitset of earlier variants at their limit
+            for j, limit in limits.items():
+                if limit == 0:
+                    saturated |= 1 << j
+
+            chosen = []
+            for tier in usage.tiers:
+                # Partial Fisher-Yates: a random order within the tier, only as far as needed
+                for i in range(len(tier)):
+                    usage.swap(tier, i, rng.randrange(i, len(tier)))
+                    index = tier[i]
+                    if holders[index] & saturated:
+                        continue
+
+                    chosen.append(index)
+                    for j in _set_bits(holders[index]):
+                        shared = overlap.get(j, 0) + 1
+                        overlap[j] = shared
+                        if shared >= limits.get(j, max_overlap):
+                            saturated |= 1 << j
+
+                    if len(chosen) == self.num_questions:
+                        break
+                if len(chosen) == self.num_questions:
+                    break
+
+            if len(chosen) < self.num_questions:
+                return None
+
+            bit = 1 << variant
+            for index in chosen:
+                holders[index] |= bit
+                usage.bump(index)
+            rng.shuffle(chosen)
+            selections.append(chosen)
+
+        return selections